@@ -0,0 +1,67 @@
+// Drive the UI from the Python engine instead of the built-in JS rules.
+// Open Wizard.html?engine=ws://127.0.0.1:4001 while `python websocket_bridge.py` is running.
+// The server sends the full mirror state once, then only a diff after each command.
+(function () {
+    const engineUrl = new URLSearchParams(window.location.search).get('engine');
+    if (!engineUrl) return;
+
+    const mirror = { player: {}, rooms: {} };
+    const socket = new WebSocket(engineUrl);
+
+    function appendOutput(text, className) {
+        const outputDiv = document.getElementById('output');
+        if (!outputDiv) return;
+        const messageElement = document.createElement('div');
+        if (className) messageElement.className = className;
+        messageElement.style.whiteSpace = 'pre-wrap';
+        messageElement.textContent = text;
+        outputDiv.appendChild(messageElement);
+        outputDiv.scrollTop = outputDiv.scrollHeight;
+    }
+
+    function applyDiff(diff) {
+        Object.assign(mirror.player, diff.player || {});
+        for (const [roomId, fields] of Object.entries(diff.rooms || {})) {
+            mirror.rooms[roomId] = Object.assign(mirror.rooms[roomId] || {}, fields);
+        }
+    }
+
+    function renderHud() {
+        const { health, mana, spells = [], inventory = [] } = mirror.player;
+        const healthBar = document.querySelector('.health-bar .status-bar-fill');
+        const manaBar = document.querySelector('.mana-bar .status-bar-fill');
+        if (healthBar) healthBar.style.setProperty('--health-percent', `${health}%`);
+        if (manaBar) manaBar.style.setProperty('--mana-percent', `${mana}%`);
+        document.getElementById('healthValue').textContent = `${health}/100`;
+        document.getElementById('manaValue').textContent = `${mana}/100`;
+        document.getElementById('spellList').textContent = spells.join(', ');
+        document.getElementById('inventoryHud').textContent = inventory.join(', ');
+    }
+
+    socket.addEventListener('message', (event) => {
+        const message = JSON.parse(event.data);
+        if (message.error) {
+            appendOutput(message.error, 'hint-message');
+            return;
+        }
+        if (message.state) {
+            mirror.player = message.state.player;
+            mirror.rooms = message.state.rooms;
+        } else if (message.diff) {
+            applyDiff(message.diff);
+        }
+        appendOutput(message.text);
+        renderHud();
+    });
+    socket.addEventListener('close', () => appendOutput('Disconnected from the engine.', 'hint-message'));
+
+    window.processCommand = function (input) {
+        const commandInput = document.getElementById('commandInput');
+        input = input || commandInput.value.trim();
+        if (!input || socket.readyState !== WebSocket.OPEN) return;
+        appendOutput(`> ${input}`);
+        socket.send(input);
+        commandInput.value = '';
+    };
+    window.engineMirror = mirror;
+})();
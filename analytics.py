@@ -0,0 +1,161 @@
+import argparse
+import json
+import multiprocessing
+import os
+import struct
+import zlib
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+from events import read_events
+
+@dataclass
+class Rollup:
+    """Pre-aggregated counters; memory grows with distinct rooms and hints, not log size."""
+    room_turns: Counter = field(default_factory=Counter)
+    room_exits: Counter = field(default_factory=Counter)
+    room_deaths: Counter = field(default_factory=Counter)
+    room_no_effect: Counter = field(default_factory=Counter)
+    hint_fires: Counter = field(default_factory=Counter)
+    handler_turns: Counter = field(default_factory=Counter)
+    outcomes: Counter = field(default_factory=Counter)
+
+    def add(self, event: Dict[str, Any]) -> None:
+        room, outcome = event.get("room", "?"), event.get("outcome", "?")
+        self.room_turns[room] += 1
+        self.outcomes[outcome] += 1
+        self.handler_turns[event.get("handler", "unknown")] += 1
+        if outcome == "moved":
+            self.room_exits[room] += 1
+        elif outcome == "death":
+            self.room_deaths[room] += 1
+        elif outcome == "no_effect":
+            self.room_no_effect[room] += 1
+        if "hint" in event:
+            self.hint_fires[event["hint"]] += 1
+
+    def merge(self, other: "Rollup") -> "Rollup":
+        for name in self.__dataclass_fields__:
+            getattr(self, name).update(getattr(other, name))
+        return self
+
+    def tables(self) -> Dict[str, Dict[str, list]]:
+        """The rollup as column-oriented tables, one row per room, hint, handler or outcome."""
+        rooms = sorted(self.room_turns)
+        hints = sorted(self.hint_fires)
+        handlers = sorted(self.handler_turns)
+        outcomes = sorted(self.outcomes)
+        return {
+            "rooms": {
+                "room": rooms,
+                "turns": [self.room_turns[r] for r in rooms],
+                "exits": [self.room_exits[r] for r in rooms],
+                "deaths": [self.room_deaths[r] for r in rooms],
+                "no_effect": [self.room_no_effect[r] for r in rooms]
+            },
+            "hints": {"hint": hints, "fires": [self.hint_fires[h] for h in hints]},
+            "handlers": {"handler": handlers, "turns": [self.handler_turns[h] for h in handlers]},
+            "outcomes": {"outcome": outcomes, "turns": [self.outcomes[o] for o in outcomes]}
+        }
+
+def rollup(events: Iterable[Dict[str, Any]]) -> Rollup:
+    """Fold a stream of events into one Rollup in a single pass."""
+    result = Rollup()
+    for event in events:
+        result.add(event)
+    return result
+
+def rollup_file(path: Union[str, Path]) -> Rollup:
+    return rollup(read_events(path))
+
+def rollup_files(paths: Sequence[Union[str, Path]], workers: Optional[int] = None) -> Rollup:
+    """Roll up each log in its own process and merge the results."""
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        return sum_rollups(map(rollup_file, paths))
+    context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+    with ProcessPoolExecutor(workers, mp_context=context) as pool:
+        return sum_rollups(pool.map(rollup_file, paths))
+
+def sum_rollups(rollups: Iterable[Rollup]) -> Rollup:
+    total = Rollup()
+    for part in rollups:
+        total.merge(part)
+    return total
+
+# Columnar file: magic, header length, JSON header, then one zlib blob per column
+COLUMNAR_MAGIC = b"WTCOL1\n"
+
+def encode_column(values: list) -> bytes:
+    if all(isinstance(v, int) for v in values):
+        return zlib.compress(array("q", values).tobytes())
+    return zlib.compress("\0".join(values).encode())
+
+def write_columnar(path: Union[str, Path], tables: Dict[str, Dict[str, list]]) -> None:
+    """Write tables column by column so readers can fetch single columns."""
+    header: Dict[str, Any] = {}
+    blobs: List[bytes] = []
+    offset = 0
+    for table, columns in tables.items():
+        header[table] = {"rows": len(next(iter(columns.values()), [])), "columns": {}}
+        for name, values in columns.items():
+            blob = encode_column(values)
+            kind = "int" if all(isinstance(v, int) for v in values) else "str"
+            header[table]["columns"][name] = [kind, offset, len(blob)]
+            blobs.append(blob)
+            offset += len(blob)
+    encoded = json.dumps(header, separators=(",", ":")).encode()
+    with open(path, "wb") as f:
+        f.write(COLUMNAR_MAGIC + struct.pack("!I", len(encoded)) + encoded)
+        for blob in blobs:
+            f.write(blob)
+
+def read_columnar(path: Union[str, Path], table: str,
+                  columns: Optional[Sequence[str]] = None) -> Dict[str, list]:
+    """Read the requested columns of one table, seeking past everything else."""
+    with open(path, "rb") as f:
+        if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f"{path} is not a columnar rollup file")
+        size, = struct.unpack("!I", f.read(4))
+        header = json.loads(f.read(size))
+        data_start = f.tell()
+        result = {}
+        for name, (kind, offset, length) in header[table]["columns"].items():
+            if columns is not None and name not in columns:
+                continue
+            f.seek(data_start + offset)
+            raw = zlib.decompress(f.read(length))
+            if kind == "int":
+                result[name] = array("q", raw).tolist()
+            else:
+                result[name] = raw.decode().split("\0") if header[table]["rows"] else []
+        return result
+
+def format_summary(total: Rollup, top: int = 5) -> str:
+    """Where players die, where they get stuck and which hints fire most."""
+    lines = [f"{sum(total.outcomes.values())} turns: " +
+             ", ".join(f"{n} {outcome}" for outcome, n in total.outcomes.most_common())]
+    lines.append("Deaths by room: " + ", ".join(f"{room} {n}" for room, n in total.room_deaths.most_common(top)))
+    stuck = sorted(total.room_turns, key=lambda r: total.room_turns[r] / (total.room_exits[r] or 1), reverse=True)
+    lines.append("Turns per visit: " + ", ".join(
+        f"{room} {total.room_turns[room] / (total.room_exits[room] or 1):.1f}" for room in stuck[:top]))
+    lines.append("Hints: " + ", ".join(f"{n}x {hint[:40]!r}" for hint, n in total.hint_fires.most_common(top)))
+    return "\n".join(lines)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Roll up per-turn event logs (.jsonl or .jsonl.gz).")
+    parser.add_argument("logs", nargs="+", type=Path)
+    parser.add_argument("--out", type=Path, default=Path("rollups.wtcol"), help="columnar rollup file to write")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+    
+    total = rollup_files(args.logs, args.workers)
+    write_columnar(args.out, total.tables())
+    print(format_summary(total))
+    print(f"Rollups written to {args.out}")
+
+if __name__ == '__main__':
+    main()
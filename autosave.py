@@ -0,0 +1,83 @@
+import threading
+from typing import Callable, List, Optional
+from game_data import GameState
+from save_store import FileSaveStore, SaveBackend
+from tracing import TRACER
+
+class AutosaveService:
+    """Background autosave of game states through a single writer thread.
+
+    `submit` only records the latest snapshot (GameState is immutable, so
+    holding a reference is a free snapshot) and returns immediately. The
+    writer thread coalesces bursts of submissions into one write of the most
+    recent state, writes it through the save backend (atomic JSON files by
+    default), and reports failures asynchronously via `on_error` and
+    `drain_errors`.
+    """
+
+    def __init__(self, filename: str = "autosave.json",
+                 on_error: Optional[Callable[[str], None]] = None,
+                 backend: Optional[SaveBackend] = None):
+        self.filename = filename
+        self.on_error = on_error
+        self.backend = backend or FileSaveStore()
+        self.saves_written = 0
+        self._pending: Optional[GameState] = None
+        self._writing = False
+        self._closed = False
+        self._errors: List[str] = []
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="autosave-writer", daemon=True)
+
+    def start(self) -> 'AutosaveService':
+        self._thread.start()
+        return self
+
+    def submit(self, state: GameState) -> None:
+        """Queue a state for saving; replaces any snapshot not yet written."""
+        with self._cond:
+            if self._closed:
+                return
+            self._pending = state
+            self._cond.notify_all()
+
+    def drain_errors(self) -> List[str]:
+        """Return and clear the save failures reported since the last call."""
+        with self._cond:
+            errors, self._errors = self._errors, []
+        return errors
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every submitted state is on disk; False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending is None and not self._writing, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Write any pending state and stop the writer thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or self._closed)
+                if self._pending is None:
+                    return
+                state, self._pending = self._pending, None
+                self._writing = True
+            
+            with TRACER.span("autosave", filename=self.filename):
+                result = self.backend.save_game_state(state, self.filename)
+            
+            with self._cond:
+                self._writing = False
+                if result.error:
+                    self._errors.append(result.error)
+                else:
+                    self.saves_written += 1
+                self._cond.notify_all()
+            if result.error and self.on_error:
+                self.on_error(result.error)
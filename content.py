@@ -0,0 +1,176 @@
+import json
+import threading
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+from game_data import (
+    GameState, Room, Item, Spell, Result, safe_call,
+    parse_room, parse_item, parse_spell, build_puzzle_index
+)
+
+# Content kind -> (file name, parser for one entry)
+CONTENT_FILES: Dict[str, Tuple[str, Callable[[dict], Any]]] = {
+    "rooms": ("rooms.json", parse_room),
+    "items": ("items.json", parse_item),
+    "spells": ("spells.json", parse_spell)
+}
+
+@dataclass(frozen=True)
+class ContentVersion:
+    """One immutable, numbered snapshot of the tower content."""
+    number: int
+    rooms: Dict[str, Room]
+    items: Dict[str, Item]
+    spells: Dict[str, Spell]
+    raw: Dict[str, Dict[str, dict]]
+    stamps: Dict[str, Tuple[int, int]]
+
+    def as_tuple(self) -> Tuple[Dict[str, Room], Dict[str, Item], Dict[str, Spell]]:
+        return self.rooms, self.items, self.spells
+
+def file_stamp(path: Path) -> Tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+def _reparse(entries: Dict[str, dict], parse: Callable[[dict], Any],
+             old_raw: Dict[str, dict], old_objects: Dict[str, Any]) -> Dict[str, Any]:
+    """Parse only entries whose source changed; reuse the old dict if none did."""
+    parsed = {key: old_objects[key] if old_raw.get(key) == data else parse(data)
+              for key, data in entries.items()}
+    unchanged = parsed.keys() == old_objects.keys() and all(
+        parsed[key] is old_objects[key] for key in parsed)
+    return old_objects if unchanged else parsed
+
+def load_content(data_dir: Path, previous: Optional[ContentVersion] = None) -> Result[ContentVersion]:
+    """Load content, re-parsing only the files and entries that changed since `previous`.
+    
+    Unchanged rooms, items and spells are the very same objects in both
+    versions, so a reload costs in proportion to what was edited.
+    """
+    def load() -> ContentVersion:
+        parsed: Dict[str, Dict[str, Any]] = {}
+        raw: Dict[str, Dict[str, dict]] = {}
+        stamps: Dict[str, Tuple[int, int]] = {}
+        for kind, (filename, parse) in CONTENT_FILES.items():
+            path = data_dir / filename
+            stamps[kind] = file_stamp(path)
+            if previous and previous.stamps[kind] == stamps[kind]:
+                parsed[kind], raw[kind] = getattr(previous, kind), previous.raw[kind]
+                continue
+            raw[kind] = json.loads(path.read_text())
+            parsed[kind] = _reparse(raw[kind], parse,
+                                    previous.raw[kind] if previous else {},
+                                    getattr(previous, kind) if previous else {})
+        
+        if previous and all(parsed[kind] is getattr(previous, kind) for kind in CONTENT_FILES):
+            return replace(previous, stamps=stamps)
+        return ContentVersion(
+            number=previous.number + 1 if previous else 0,
+            raw=raw,
+            stamps=stamps,
+            **parsed
+        )
+    return safe_call(load)
+
+def upgrade_state(state: GameState, old: ContentVersion, new: ContentVersion) -> GameState:
+    """Move a live session from one content version to the next.
+    
+    Rooms the session never changed are taken from the new content as is;
+    rooms changed by play keep their items and guardian, combined with the
+    new static definition if that changed too.
+    """
+    def kept_items(room: Room) -> Room:
+        items = [item_id for item_id in room.items if item_id in new.items]
+        return room if len(items) == len(room.items) else replace(room, items=items)
+    
+    rooms: Dict[str, Room] = {}
+    for room_id, room in new.rooms.items():
+        live = state.rooms.get(room_id)
+        original = old.rooms.get(room_id)
+        if live is None or live is original:
+            rooms[room_id] = room
+        elif room is original:
+            rooms[room_id] = kept_items(live)
+        else:
+            rooms[room_id] = kept_items(replace(room, items=live.items, guardian=live.guardian))
+    
+    # Never pull the floor out from under a player whose room was removed
+    current = state.player.current_room
+    if current not in rooms:
+        rooms[current] = kept_items(state.rooms[current])
+    
+    # Items and spells the new content removed are gone from the player too
+    player = state.player
+    inventory = [item_id for item_id in player.inventory if item_id in new.items]
+    spells = {spell_id for spell_id in player.spells if spell_id in new.spells}
+    if len(inventory) != len(player.inventory) or len(spells) != len(player.spells):
+        player = replace(player, inventory=inventory, spells=spells)
+    
+    return replace(state, player=player, rooms=rooms, items=new.items, spells=new.spells,
+                   puzzle_index=build_puzzle_index(new.rooms), name_index=None)
+
+class ContentWatcher:
+    """Polls the content files and atomically publishes new content versions.
+
+    Readers just take `current`; a reload swaps in a complete new version with
+    one reference assignment, so nobody sees half-loaded content. Broken edits
+    are reported through `on_error` and the previous version stays live.
+    """
+
+    def __init__(self, data_dir: Path = Path("data"), interval: float = 1.0,
+                 on_error: Optional[Callable[[str], None]] = None):
+        self.data_dir = Path(data_dir)
+        self.interval = interval
+        self.on_error = on_error
+        result = load_content(self.data_dir)
+        if result.error:
+            raise RuntimeError(f"Error loading game data: {result.error}")
+        self.current: ContentVersion = result.value
+        # What the last reported failure was for, so a broken edit is reported once
+        self._failed: Optional[Any] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self) -> bool:
+        """Reload if any content file changed; True when a new version was published."""
+        try:
+            stamps = {kind: file_stamp(self.data_dir / filename)
+                      for kind, (filename, _) in CONTENT_FILES.items()}
+        except OSError as e:
+            self._report(str(e), str(e))
+            return False
+        if stamps == self.current.stamps:
+            self._failed = None
+            return False
+        if stamps == self._failed:
+            return False
+        
+        result = load_content(self.data_dir, self.current)
+        if result.error:
+            self._report(result.error, stamps)
+            return False
+        self._failed = None
+        published = result.value.number != self.current.number
+        self.current = result.value
+        return published
+
+    def _report(self, error: str, failed: Any) -> None:
+        if failed == self._failed:
+            return
+        self._failed = failed
+        if self.on_error:
+            self.on_error(error)
+
+    def start(self) -> 'ContentWatcher':
+        self._thread = threading.Thread(target=self._run, name="content-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.poll()
@@ -0,0 +1,95 @@
+import gzip
+import json
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, IO, Iterator, Optional, Tuple, Union
+from game_data import GameState
+from game_engine import COMMAND_HANDLERS, parse_command
+
+def room_signature(state: GameState, room_id: str) -> Tuple[Tuple[str, ...], Optional[int]]:
+    room = state.rooms[room_id]
+    return tuple(room.items), room.guardian.health if room.guardian else None
+
+def turn_outcome(before: GameState, after: GameState, finished: bool) -> str:
+    """death, victory, moved, changed or no_effect, as seen from the player's room.
+    
+    Guardians move every turn, so state identity says nothing about whether
+    the command itself did anything; the player, flags and room are compared.
+    """
+    if finished:
+        return "death" if after.player.health <= 0 else "victory"
+    room_id = before.player.current_room
+    if after.player.current_room != room_id:
+        return "moved"
+    changed = (after.player != before.player or after.game_flags != before.game_flags or
+               room_signature(after, room_id) != room_signature(before, room_id))
+    return "changed" if changed else "no_effect"
+
+def turn_event(session: str, turn: int, before: GameState, command: str, after: GameState,
+               response: str, finished: bool) -> Dict[str, Any]:
+    """One flat, JSON-ready record of a turn; hint turns also carry the hint text."""
+    action, _ = parse_command(command)
+    event = {
+        "ts": round(time.time(), 3),
+        "session": session,
+        "turn": turn,
+        "room": before.player.current_room,
+        "command": command,
+        "handler": action if action in COMMAND_HANDLERS else "unknown",
+        "outcome": turn_outcome(before, after, finished),
+        "health": after.player.health,
+        "mana": after.player.mana
+    }
+    if action == "hint":
+        event["hint"] = response.strip()
+    return event
+
+def open_log(path: Union[str, Path], mode: str = "rt") -> IO[str]:
+    """Open a log file, transparently gzip-compressed when it ends in .gz."""
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, mode, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+def worker_log_path(path: Union[str, Path], worker: int) -> Path:
+    """The log of one worker process, so processes never interleave writes in one file."""
+    path = Path(path)
+    return path.with_name(f"{path.stem}.{worker}{path.suffix}")
+
+class EventLog:
+    """Appends one JSON line per turn for a play session, or for every session of a server."""
+
+    def __init__(self, path: Union[str, Path], session: Optional[str] = None):
+        self.path = Path(path)
+        self.session = session or uuid.uuid4().hex
+        # Turns logged so far, per session
+        self.turns: Dict[str, int] = {}
+        self._file = open_log(self.path, "at")
+
+    def record(self, before: GameState, command: str, after: GameState, response: str, finished: bool,
+               session: Optional[str] = None) -> None:
+        """Log one turn; a log shared by many sessions names the session of each."""
+        session = session or self.session
+        turn = self.turns[session] = self.turns.get(session, 0) + 1
+        event = turn_event(session, turn, before, command, after, response, finished)
+        self._file.write(json.dumps(event, separators=(",", ":")) + "\n")
+
+    def end(self, session: str) -> None:
+        """Forget a finished session's turn count."""
+        self.turns.pop(session, None)
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+def read_events(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Stream events from a log one line at a time, skipping lines that do not parse."""
+    with open_log(path) as lines:
+        for line in lines:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
@@ -0,0 +1,236 @@
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+import traceback
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+import game_engine
+from game_data import Direction, GameState, load_game_data
+from game_engine import COMMAND_HANDLERS, COMMAND_SYNONYMS, run_turn
+
+Script = Tuple[str, ...]
+Arc = Tuple[int, int]
+ENGINE_FILE = os.path.abspath(game_engine.__file__)
+NOISE = ("", " ", "on", "the", "guardian", "at", "xyzzy", "on on", ";", "\t", "ＦＩＲＥＢＡＬＬ", "-1")
+
+def vocabulary(state: GameState) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Verbs (commands and synonyms) and argument words (content ids, directions, noise)."""
+    verbs = tuple(sorted(set(COMMAND_HANDLERS) | set(COMMAND_SYNONYMS))) + ("", "dance")
+    words = (tuple(d.value for d in Direction) + tuple(state.rooms) + tuple(state.items) +
+             tuple(state.spells) + NOISE)
+    return verbs, words
+
+def random_command(rng: random.Random, verbs: Tuple[str, ...], words: Tuple[str, ...]) -> str:
+    return " ".join([rng.choice(verbs)] + rng.choices(words, k=rng.choice((0, 1, 1, 1, 2, 3))))
+
+def mutate(rng: random.Random, script: Script, verbs: Tuple[str, ...], words: Tuple[str, ...],
+           corpus: List[Script]) -> Script:
+    """Insert, replace, delete or splice commands (at most 64 per script)."""
+    commands = list(script)
+    choice = rng.random()
+    if not commands or choice < 0.4:
+        commands.insert(rng.randint(0, len(commands)), random_command(rng, verbs, words))
+    elif choice < 0.7:
+        commands[rng.randrange(len(commands))] = random_command(rng, verbs, words)
+    elif choice < 0.85:
+        del commands[rng.randrange(len(commands))]
+    else:
+        other = rng.choice(corpus)
+        commands = commands[:rng.randint(0, len(commands))] + list(other[rng.randint(0, len(other)):])
+    return tuple(commands[:64])
+
+class ArcTracer:
+    """Records (previous line, line) arcs executed inside game_engine.py."""
+
+    def __init__(self):
+        self.arcs: Set[Arc] = set()
+
+    def _local(self, frame, event, arg):
+        if event == "line":
+            self.arcs.add((self._last, frame.f_lineno))
+            self._last = frame.f_lineno
+        return self._local
+
+    def _global(self, frame, event, arg):
+        if frame.f_code.co_filename != ENGINE_FILE:
+            return None
+        self._last = -frame.f_code.co_firstlineno
+        return self._local
+
+    def __enter__(self) -> "ArcTracer":
+        self.arcs = set()
+        sys.settrace(self._global)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        sys.settrace(None)
+
+@dataclass(frozen=True)
+class Crash:
+    signature: Tuple[str, str, int]  # exception type, file and line where it was raised
+    message: str
+    script: Script
+
+def crash_signature(error: BaseException) -> Tuple[str, str, int]:
+    frame = traceback.extract_tb(error.__traceback__)[-1]
+    return type(error).__name__, Path(frame.filename).name, frame.lineno
+
+def run_script(initial: GameState, script: Script) -> Tuple[int, Optional[Crash]]:
+    """Play a script from a fresh game; returns turns played and the crash, if any."""
+    state = initial
+    for turn, command in enumerate(script, start=1):
+        try:
+            state, _, finished = run_turn(state, command)
+        except Exception as e:
+            return turn, Crash(crash_signature(e), f"{type(e).__name__}: {e}", script[:turn])
+        if finished:
+            return turn, None
+    return len(script), None
+
+def shrink(initial: GameState, crash: Crash) -> Crash:
+    """Minimize a crashing script: drop commands (ddmin-style), then words, keeping the signature."""
+    def still_crashes(script: Script) -> Optional[Crash]:
+        _, found = run_script(initial, script)
+        return found if found and found.signature == crash.signature else None
+    
+    best = crash
+    chunk = max(len(best.script) // 2, 1)
+    while chunk >= 1:
+        start, reduced = 0, False
+        while start < len(best.script):
+            candidate = best.script[:start] + best.script[start + chunk:]
+            found = still_crashes(candidate) if candidate else None
+            if found:
+                best, reduced = found, True
+            else:
+                start += chunk
+        if not reduced:
+            chunk //= 2
+    
+    for index in range(len(best.script)):
+        words = best.script[index].split(" ")
+        position = len(words) - 1
+        while position >= 0:
+            candidate_words = words[:position] + words[position + 1:]
+            candidate = best.script[:index] + (" ".join(candidate_words),) + best.script[index + 1:]
+            found = still_crashes(candidate)
+            if found:
+                best, words = found, candidate_words
+            position -= 1
+    return best
+
+@dataclass(frozen=True)
+class RoundResult:
+    turns: int
+    arcs: FrozenSet[Arc]
+    corpus: Tuple[Script, ...]  # scripts that reached arcs this worker had not seen
+    crashes: Tuple[Crash, ...]
+
+def fuzz_round(seed: int, seconds: float, corpus: Tuple[Script, ...], known_arcs: FrozenSet[Arc],
+               initial: GameState, trace_every: int = 4) -> RoundResult:
+    """Mutate the corpus for a fixed time, keeping scripts that reach new arcs.
+    
+    Tracing costs about ten times a plain run, so only every `trace_every`-th
+    script is traced for coverage; every script is still checked for crashes.
+    """
+    rng = random.Random(seed)
+    verbs, words = vocabulary(initial)
+    pool = list(corpus) or [()]
+    seen = set(known_arcs)
+    fresh: List[Script] = []
+    crashes: Dict[Tuple[str, str, int], Crash] = {}
+    tracer = ArcTracer()
+    turns = executions = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        script = mutate(rng, rng.choice(pool), verbs, words, pool)
+        executions += 1
+        traced = executions % trace_every == 0
+        if traced:
+            with tracer:
+                played, crash = run_script(initial, script)
+        else:
+            played, crash = run_script(initial, script)
+        turns += played
+        if crash and crash.signature not in crashes:
+            crashes[crash.signature] = crash
+        if traced and not tracer.arcs <= seen:
+            seen |= tracer.arcs
+            pool.append(script)
+            fresh.append(script)
+    return RoundResult(turns, frozenset(seen), tuple(fresh), tuple(crashes.values()))
+
+# Set in each worker process by the pool initializer
+_INITIAL: Optional[GameState] = None
+
+def _init_worker(initial: GameState) -> None:
+    global _INITIAL
+    _INITIAL = initial
+
+def _worker_round(args: Tuple[int, float, Tuple[Script, ...], FrozenSet[Arc]]) -> RoundResult:
+    return fuzz_round(*args, _INITIAL)
+
+@dataclass(frozen=True)
+class FuzzReport:
+    turns: int
+    seconds: float
+    arcs: int
+    corpus: int
+    crashes: Tuple[Crash, ...]
+
+def fuzz(initial: GameState, seconds: float = 10.0, workers: Optional[int] = None, seed: int = 0,
+         round_seconds: float = 1.0, on_round: Optional[Callable[[int, int, int], None]] = None) -> FuzzReport:
+    """Fuzz across processes in rounds; coverage and corpus are merged between rounds.
+    
+    Each distinct crash (by exception type and raising line) is shrunk once.
+    """
+    workers = workers or os.cpu_count() or 1
+    corpus: Tuple[Script, ...] = ()
+    arcs: FrozenSet[Arc] = frozenset()
+    crashes: Dict[Tuple[str, str, int], Crash] = {}
+    turns = 0
+    started = time.perf_counter()
+    rounds = max(int(seconds / round_seconds), 1)
+    context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+    with context.Pool(workers, initializer=_init_worker, initargs=(initial,)) as pool:
+        for number in range(rounds):
+            jobs = [(seed * 1_000_003 + number * workers + w, round_seconds, corpus, arcs) for w in range(workers)]
+            for result in pool.map(_worker_round, jobs):
+                turns += result.turns
+                arcs |= result.arcs
+                corpus += result.corpus
+                for crash in result.crashes:
+                    crashes.setdefault(crash.signature, crash)
+            if on_round:
+                on_round(number + 1, turns, len(arcs))
+    elapsed = time.perf_counter() - started
+    return FuzzReport(turns, elapsed, len(arcs), len(corpus),
+                      tuple(shrink(initial, crash) for crash in crashes.values()))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Coverage-guided fuzzer for engine commands.")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    result = load_game_data()
+    if result.error:
+        print(f"Error loading game data: {result.error}")
+        sys.exit(1)
+    report = fuzz(GameState.new_game(*result.value), args.seconds, args.workers, args.seed,
+                  on_round=lambda n, turns, arcs: print(f"round {n}: {turns} turns, {arcs} arcs"))
+    print(f"{report.turns} turns in {report.seconds:.1f}s ({report.turns / report.seconds:,.0f}/s), "
+          f"{report.arcs} arcs in game_engine.py, corpus of {report.corpus} scripts")
+    for crash in report.crashes:
+        print(f"\nCRASH {crash.message} ({crash.signature[1]}:{crash.signature[2]})")
+        for command in crash.script:
+            print(f"  {command!r}")
+    sys.exit(1 if report.crashes else 0)
+
+if __name__ == '__main__':
+    main()
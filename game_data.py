@@ -1,10 +1,15 @@
 from dataclasses import dataclass, field, replace
-from typing import Dict, List, Set, Optional, Callable, Any, TypeVar, Generic
+from typing import Dict, List, Set, Optional, Callable, Any, TypeVar, Generic, Iterable, Tuple
 from enum import Enum
 import json
+import os
+import tempfile
 from pathlib import Path
-from functools import reduce
+from functools import reduce, cached_property
+from itertools import count
 from operator import or_
+from names import NameIndex
+from save_schema import SAVE_VERSION, migrate_save
 
 # Type variables for generic functions
 T = TypeVar('T')
@@ -58,6 +63,21 @@ def safe_call(f: Callable[..., T], *args, **kwargs) -> Result[T]:
     except Exception as e:
         return Result.failure(str(e))
 
+# Effect kinds that item and spell content may declare
+EFFECT_KINDS = frozenset({"heal", "restore_mana", "teach_spell", "damage", "buff_flag"})
+
+@dataclass(frozen=True)
+class Effect:
+    kind: str
+    amount: Optional[int] = None
+    spell: Optional[str] = None
+    flag: Optional[str] = None
+    message: Optional[str] = None
+
+def damage_after_defense(power: int, defense: int) -> int:
+    """Damage dealt by an attack of `power` against `defense`; every hit does at least 1."""
+    return max(1, power - defense)
+
 @dataclass(frozen=True)
 class Spell:
     id: str
@@ -68,12 +88,13 @@ class Spell:
     defense: int = 0
     effect: Optional[str] = None
     description: str = ""
+    effects: Tuple[Effect, ...] = ()
 
     def can_cast(self, mana: int) -> bool:
         return mana >= self.mana_cost
 
     def calculate_damage(self, target_defense: int) -> int:
-        return max(1, self.damage - target_defense)
+        return damage_after_defense(self.damage, target_defense)
 
 @dataclass(frozen=True)
 class Item:
@@ -82,6 +103,7 @@ class Item:
     type: ItemType
     effect: Optional[int] = None
     description: str = ""
+    effects: Tuple[Effect, ...] = ()
 
     def apply_effect(self, current_value: int, max_value: int) -> int:
         if self.effect is None:
@@ -174,12 +196,110 @@ class Player:
     def add_flag(self, flag: str) -> 'Player':
         return replace(self, flags=self.flags | {flag})
 
+    def remove_flag(self, flag: str) -> 'Player':
+        return replace(self, flags=self.flags - {flag})
+
     def update_health(self, new_health: int) -> 'Player':
         return replace(self, health=max(0, min(100, new_health)))
 
     def update_mana(self, new_mana: int) -> 'Player':
         return replace(self, mana=max(0, min(100, new_mana)))
 
+@dataclass(frozen=True)
+class PuzzleIndex:
+    """Load-time reverse index from item ids to the puzzles that require them.
+
+    Item ids are interned to bit positions so each puzzle's requirements are a
+    single int mask; readiness is one AND against the inventory mask.
+    Puzzles are keyed by the id of the room that holds them.
+    """
+    item_bits: Dict[str, int]
+    requirements: Dict[str, int]
+    by_item: Dict[str, Tuple[str, ...]]
+
+    def mask_of(self, item_ids: Iterable[str]) -> int:
+        return reduce(or_, (self.item_bits.get(item_id, 0) for item_id in item_ids), 0)
+
+    def puzzles_needing(self, item_id: str) -> Tuple[str, ...]:
+        return self.by_item.get(item_id, ())
+
+    def is_ready(self, room_id: str, mask: int) -> bool:
+        required = self.requirements.get(room_id)
+        return required is not None and required & mask == required
+
+    def ready_after(self, item_id: str, mask: int) -> List[str]:
+        """Puzzles affected by `item_id` that are satisfiable with `mask`."""
+        return [room_id for room_id in self.puzzles_needing(item_id) if self.is_ready(room_id, mask)]
+
+    def solvable(self, mask: int) -> List[str]:
+        return [room_id for room_id, required in self.requirements.items() if required & mask == required]
+
+# Indexes of the most recent rooms dicts, keyed on the dict itself
+_puzzle_indexes: Dict[int, Tuple[Dict[str, Room], PuzzleIndex]] = {}
+
+def build_puzzle_index(rooms: Dict[str, Room]) -> PuzzleIndex:
+    """Intern puzzle item ids and build requirement masks and the reverse index.
+    
+    Built once per loaded rooms dict; games started from the same content share it.
+    """
+    cached = _puzzle_indexes.get(id(rooms))
+    if cached and cached[0] is rooms:
+        return cached[1]
+    item_bits: Dict[str, int] = {}
+    requirements: Dict[str, int] = {}
+    by_item: Dict[str, List[str]] = {}
+    for room in rooms.values():
+        if room.puzzle is None:
+            continue
+        mask = 0
+        for item_id in room.puzzle.required_items:
+            bit = item_bits.setdefault(item_id, 1 << len(item_bits))
+            mask |= bit
+            by_item.setdefault(item_id, []).append(room.id)
+        requirements[room.id] = mask
+    index = PuzzleIndex(
+        item_bits=item_bits,
+        requirements=requirements,
+        by_item={item_id: tuple(room_ids) for item_id, room_ids in by_item.items()}
+    )
+    if len(_puzzle_indexes) >= 16:
+        del _puzzle_indexes[next(iter(_puzzle_indexes))]
+    _puzzle_indexes[id(rooms)] = (rooms, index)
+    return index
+
+@dataclass(frozen=True)
+class ContentNames:
+    """Name indexes over everything a player can refer to by display name."""
+    items: NameIndex
+    spells: NameIndex
+    guardians: NameIndex
+
+# Indexes of the most recent content versions and packs, keyed on the content objects
+_content_names: Dict[Tuple[int, int, frozenset], Tuple[Dict[str, Item], Dict[str, Spell], ContentNames]] = {}
+
+def build_content_names(rooms: Dict[str, Room], items: Dict[str, Item], spells: Dict[str, Spell]) -> ContentNames:
+    """Index item, spell and guardian names once per loaded content, not per game."""
+    guardian_names = frozenset(room.guardian.name for room in rooms.values() if room.guardian)
+    key = (id(items), id(spells), guardian_names)
+    cached = _content_names.get(key)
+    if cached and cached[0] is items and cached[1] is spells:
+        return cached[2]
+    names = ContentNames(
+        items=NameIndex({item_id: item.name for item_id, item in items.items()}),
+        spells=NameIndex({spell_id: spell.name for spell_id, spell in spells.items()}),
+        guardians=NameIndex({name: name for name in guardian_names})
+    )
+    if len(_content_names) >= 16:
+        del _content_names[next(iter(_content_names))]
+    _content_names[key] = (items, spells, names)
+    return names
+
+# Process-wide counter stamping every GameState with a unique version
+_state_versions = count()
+
+def next_state_version() -> int:
+    return next(_state_versions)
+
 @dataclass(frozen=True)
 class GameState:
     player: Player
@@ -188,6 +308,23 @@ class GameState:
     spells: Dict[str, Spell]
     visited_rooms: Set[str] = field(default_factory=set)
     game_flags: Set[str] = field(default_factory=set)
+    # Not an init field, so every construction - including each replace() made
+    # by the update helpers - bumps it; equal versions mean the same state.
+    version: int = field(default_factory=next_state_version, init=False, compare=False, repr=False)
+    # Puzzles are static content, so replace() carries the index over unchanged
+    puzzle_index: Optional[PuzzleIndex] = field(default=None, compare=False, repr=False)
+    name_index: Optional[ContentNames] = field(default=None, compare=False, repr=False)
+
+    def __setstate__(self, state: dict) -> None:
+        # Versions are only unique within one process, so a state unpickled
+        # from another process is stamped afresh
+        self.__dict__.update(state, version=next_state_version())
+
+    def __post_init__(self):
+        if self.puzzle_index is None:
+            object.__setattr__(self, "puzzle_index", build_puzzle_index(self.rooms))
+        if self.name_index is None:
+            object.__setattr__(self, "name_index", build_content_names(self.rooms, self.items, self.spells))
 
     @classmethod
     def new_game(cls, rooms: Dict[str, Room], items: Dict[str, Item], spells: Dict[str, Spell]) -> 'GameState':
@@ -224,9 +361,28 @@ class GameState:
     def has_game_flag(self, flag: str) -> bool:
         return flag in self.game_flags
 
+    @cached_property
+    def inventory_mask(self) -> int:
+        """Bitmask of the puzzle-relevant items the player carries."""
+        return self.puzzle_index.mask_of(self.player.inventory)
+
+    def is_puzzle_ready(self, room_id: str) -> bool:
+        """Check whether the player holds everything the room's puzzle requires."""
+        return self.puzzle_index.is_ready(room_id, self.inventory_mask)
+
+    def ready_puzzles(self) -> List[str]:
+        """Rooms whose puzzle is satisfiable now and not yet solved."""
+        return [room_id for room_id in self.puzzle_index.solvable(self.inventory_mask)
+                if not self.has_game_flag(f"{room_id}_puzzle_solved")]
+
+    def transient(self) -> 'TransientGameState':
+        """Open a transient view for batching several edits into one new state."""
+        return TransientGameState(self)
+
     def to_dict(self) -> dict:
         """Convert game state to a dictionary for saving."""
         return {
+            "version": SAVE_VERSION,
             "player": {
                 "current_room": self.player.current_room,
                 "inventory": list(self.player.inventory),
@@ -241,8 +397,14 @@ class GameState:
 
     @classmethod
     def from_dict(cls, data: dict, rooms: Dict[str, Room], 
-                  items: Dict[str, Item], spells: Dict[str, Spell]) -> 'GameState':
-        """Create a game state from a saved dictionary."""
+                  items: Dict[str, Item], spells: Dict[str, Spell],
+                  puzzle_index: Optional[PuzzleIndex] = None) -> 'GameState':
+        """Create a game state from a saved dictionary of any supported format version.
+        
+        Pass the content's `puzzle_index` when `rooms` is a session's own
+        copy, so the index is not rebuilt for it.
+        """
+        data = migrate_save(data)
         player = Player(
             current_room=data["player"]["current_room"],
             inventory=data["player"]["inventory"],
@@ -257,9 +419,62 @@ class GameState:
             items=items,
             spells=spells,
             visited_rooms=set(data["visited_rooms"]),
-            game_flags=set(data["game_flags"])
+            game_flags=set(data["game_flags"]),
+            puzzle_index=puzzle_index
         )
 
+class TransientGameState:
+    """Write-ahead buffer of edits against a GameState within a single command.
+
+    Handlers collect player, room, flag and visit edits here and call
+    `persistent()` once at the end, so a multi-step update allocates a single
+    new GameState (and a single rooms dict) instead of one per step.
+    """
+
+    def __init__(self, base: GameState):
+        self.base = base
+        self.player = base.player
+        self._rooms: Dict[str, Room] = {}
+        self._game_flags: Set[str] = set()
+        self._visited_rooms: Set[str] = set()
+
+    def room(self, room_id: str) -> Room:
+        """Read a room, including edits made earlier in this transaction."""
+        return self._rooms.get(room_id) or self.base.rooms[room_id]
+
+    def get_current_room(self) -> Room:
+        return self.room(self.player.current_room)
+
+    def update_player(self, player_update: Callable[[Player], Player]) -> 'TransientGameState':
+        self.player = player_update(self.player)
+        return self
+
+    def update_room(self, room_id: str, room_update: Callable[[Room], Room]) -> 'TransientGameState':
+        self._rooms[room_id] = room_update(self.room(room_id))
+        return self
+
+    def add_game_flags(self, new_flags: Set[str]) -> 'TransientGameState':
+        self._game_flags |= new_flags
+        return self
+
+    def visit_room(self, room_id: str) -> 'TransientGameState':
+        self._visited_rooms.add(room_id)
+        return self
+
+    def persistent(self) -> GameState:
+        """Produce the new immutable state; returns the base state if nothing changed."""
+        base = self.base
+        changes: Dict[str, Any] = {}
+        if self.player is not base.player:
+            changes["player"] = self.player
+        if self._rooms:
+            changes["rooms"] = {**base.rooms, **self._rooms}
+        if not self._game_flags <= base.game_flags:
+            changes["game_flags"] = base.game_flags | self._game_flags
+        if not self._visited_rooms <= base.visited_rooms:
+            changes["visited_rooms"] = base.visited_rooms | self._visited_rooms
+        return replace(base, **changes) if changes else base
+
 # Pure functions for game data operations
 def load_json_file(path: Path) -> Result[dict]:
     return safe_call(lambda: json.loads(path.read_text()))
@@ -287,6 +502,12 @@ def parse_room(data: dict) -> Room:
         puzzle=puzzle
     )
 
+def parse_effect(data: dict) -> Effect:
+    """Parse and validate a declared effect."""
+    if data.get("kind") not in EFFECT_KINDS:
+        raise ValueError(f"Unknown effect kind: {data.get('kind')}")
+    return Effect(**data)
+
 def parse_item(data: dict) -> Item:
     """Parse an item dictionary into an Item instance."""
     return Item(
@@ -294,7 +515,8 @@ def parse_item(data: dict) -> Item:
         name=data["name"],
         type=ItemType(data["type"]),
         effect=data.get("effect"),
-        description=data["description"]
+        description=data["description"],
+        effects=tuple(parse_effect(e) for e in data.get("effects", []))
     )
 
 def parse_spell(data: dict) -> Spell:
@@ -307,24 +529,25 @@ def parse_spell(data: dict) -> Spell:
         damage=data["damage"],
         defense=data["defense"],
         effect=data.get("effect"),
-        description=data["description"]
+        description=data["description"],
+        effects=tuple(parse_effect(e) for e in data.get("effects", []))
     )
 
-def load_game_data() -> Result[tuple[Dict[str, Room], Dict[str, Item], Dict[str, Spell]]]:
-    """Load the game's static data (rooms, items, spells) from JSON files."""
-    data_dir = Path("data")
+def load_game_data(data_dir: Path = Path("data")) -> Result[tuple[Dict[str, Room], Dict[str, Item], Dict[str, Spell]]]:
+    """Load the game's static data (rooms, items, spells) from the JSON files in `data_dir`."""
+    data_dir = Path(data_dir)
     
     def load_and_parse_rooms() -> Result[Dict[str, Room]]:
         return (load_json_file(data_dir / "rooms.json")
-                .map(lambda data: {k: parse_room(v) for k, v in data.items()}))
+                .bind(lambda data: safe_call(lambda: {k: parse_room(v) for k, v in data.items()})))
     
     def load_and_parse_items() -> Result[Dict[str, Item]]:
         return (load_json_file(data_dir / "items.json")
-                .map(lambda data: {k: parse_item(v) for k, v in data.items()}))
+                .bind(lambda data: safe_call(lambda: {k: parse_item(v) for k, v in data.items()})))
     
     def load_and_parse_spells() -> Result[Dict[str, Spell]]:
         return (load_json_file(data_dir / "spells.json")
-                .map(lambda data: {k: parse_spell(v) for k, v in data.items()}))
+                .bind(lambda data: safe_call(lambda: {k: parse_spell(v) for k, v in data.items()})))
     
     # Use functional composition to load and parse all data
     return (load_and_parse_rooms()
@@ -332,9 +555,23 @@ def load_game_data() -> Result[tuple[Dict[str, Room], Dict[str, Item], Dict[str,
                   .bind(lambda items: load_and_parse_spells()
                         .map(lambda spells: (rooms, items, spells)))))
 
+def write_atomically(path: Path, text: str) -> None:
+    """Write text to a temp file beside `path` and rename it into place."""
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
 def save_game_state(state: GameState, filename: str = "save.json") -> Result[None]:
     """Save the current game state to a file."""
-    return safe_call(lambda: Path(filename).write_text(
+    return safe_call(lambda: write_atomically(
+        Path(filename),
         json.dumps(state.to_dict(), indent=2)
     ))
 
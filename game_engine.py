@@ -1,38 +1,18 @@
 from dataclasses import dataclass, replace
-from typing import Dict, List, Set, Optional, Tuple, Callable, TypeVar, Generic
-from functools import reduce, partial
-from operator import or_, and_
-from itertools import chain
+from collections import OrderedDict, deque
+from threading import Lock
+from typing import Dict, List, Set, Optional, Tuple, Callable, Iterable
 from game_data import (
-    GameState, Player, Room, Item, Spell, Direction,
-    ItemType, Guardian, Hazard, Puzzle, Result
+    GameState, TransientGameState, Room, Spell, Direction,
+    ItemType, Result, Effect, damage_after_defense
 )
+from names import tokenize
+from tracing import TRACER
 
 # Type aliases for clarity
-T = TypeVar('T')
 CommandResult = Tuple[GameState, str]
 CommandHandler = Callable[[GameState, str], CommandResult]
 
-# Pure functions for game state transformations
-def update_player(state: GameState, player_update: Callable[[Player], Player]) -> GameState:
-    """Apply a pure function to update the player state."""
-    return replace(state, player=player_update(state.player))
-
-def update_room(state: GameState, room_id: str, room_update: Callable[[Room], Room]) -> GameState:
-    """Apply a pure function to update a room."""
-    return replace(
-        state,
-        rooms={**state.rooms, room_id: room_update(state.rooms[room_id])}
-    )
-
-def update_game_flags(state: GameState, new_flags: Set[str]) -> GameState:
-    """Add new game flags."""
-    return replace(state, game_flags=state.game_flags | new_flags)
-
-def update_visited_rooms(state: GameState, new_room: str) -> GameState:
-    """Add a room to visited rooms."""
-    return replace(state, visited_rooms=state.visited_rooms | {new_room})
-
 # Pure functions for game mechanics
 def validate_direction(direction: str) -> Result[Direction]:
     """Validate and convert a direction string to a Direction enum."""
@@ -59,10 +39,10 @@ def move_player(state: GameState, direction: str) -> CommandResult:
         return state, result.error
     
     next_room_id = result.value
-    new_state = update_player(
-        update_visited_rooms(state, next_room_id),
-        lambda p: replace(p, current_room=next_room_id)
-    )
+    new_state = (state.transient()
+                 .visit_room(next_room_id)
+                 .update_player(lambda p: replace(p, current_room=next_room_id))
+                 .persistent())
     return new_state, format_room_entry(state.rooms[next_room_id], state)
 
 def format_room_entry(room: Room, state: GameState) -> str:
@@ -86,7 +66,8 @@ def look_around(state: GameState, target: Optional[str] = None) -> CommandResult
     if not target:
         return state, format_room_description(state.get_current_room(), state)
     
-    item = state.get_item(target)
+    visible = state.get_current_room().items + state.player.inventory
+    item = state.get_item(target) or state.get_item(state.name_index.items.resolve(target, visible) or "")
     if item:
         return state, f"{item.name}\n{item.description}"
     
@@ -116,6 +97,7 @@ def format_room_description(room: Room, state: GameState) -> str:
 def take_item(state: GameState, item_id: str) -> CommandResult:
     """Take an item from the current room."""
     current_room = state.get_current_room()
+    item_id = state.name_index.items.resolve(item_id, current_room.items) or item_id
     
     if item_id not in current_room.items:
         return state, "You can't take that."
@@ -124,16 +106,111 @@ def take_item(state: GameState, item_id: str) -> CommandResult:
     if not item:
         return state, "That item doesn't exist."
     
-    new_state = update_room(
-        update_player(state, lambda p: p.add_item(item_id)),
-        current_room.id,
-        lambda r: replace(r, items=[i for i in r.items if i != item_id])
-    )
+    new_state = (state.transient()
+                 .update_player(lambda p: p.add_item(item_id))
+                 .update_room(current_room.id,
+                              lambda r: replace(r, items=[i for i in r.items if i != item_id]))
+                 .persistent())
     
     return new_state, f"You take the {item.name}."
 
+def resolve_target(state: GameState, target: Optional[str]) -> Optional[str]:
+    """Map a reference to the guardian in this room (by name or 'guardian') to 'guardian'."""
+    guardian = state.get_current_room().guardian
+    if target and guardian and (tokenize(target) == ("guardian",) or
+                                state.name_index.guardians.resolve(target, (guardian.name,))):
+        return "guardian"
+    return target
+
+def split_cast_args(state: GameState, args: str) -> List[str]:
+    """Split 'cast' arguments into spell and target; spell names may span several words."""
+    for separator in (" at ", " on "):
+        if separator in args:
+            return args.split(separator, 1)
+    words = args.split()
+    for cut in range(len(words), 0, -1):
+        if state.name_index.spells.resolve(" ".join(words[:cut]), state.player.spells):
+            return [" ".join(words[:cut])] + ([" ".join(words[cut:])] if words[cut:] else [])
+    return args.split(maxsplit=1)
+
+@dataclass(frozen=True)
+class EffectContext:
+    """What an effect is applied from: the item or spell name, its power and target."""
+    source_name: str
+    power: int = 0
+    target: Optional[str] = None
+    spell: Optional[Spell] = None
+
+EffectHandler = Callable[[TransientGameState, Effect, EffectContext], Result[Optional[str]]]
+
+def apply_heal(tx: TransientGameState, effect: Effect, ctx: EffectContext) -> Result[Optional[str]]:
+    amount = effect.amount if effect.amount is not None else ctx.power
+    tx.update_player(lambda p: p.update_health(p.health + amount))
+    return Result.success(effect.message or "You feel revitalized!")
+
+def apply_restore_mana(tx: TransientGameState, effect: Effect, ctx: EffectContext) -> Result[Optional[str]]:
+    amount = effect.amount if effect.amount is not None else ctx.power
+    tx.update_player(lambda p: p.update_mana(p.mana + amount))
+    return Result.success(effect.message or "Your magical energy is restored!")
+
+def apply_teach_spell(tx: TransientGameState, effect: Effect, ctx: EffectContext) -> Result[Optional[str]]:
+    if tx.player.knows_spell(effect.spell):
+        return Result.success(None)
+    spell = tx.base.get_spell(effect.spell)
+    tx.update_player(lambda p: p.add_spell(effect.spell))
+    return Result.success(effect.message or f"You learn the {spell.name if spell else effect.spell} spell!")
+
+def apply_damage(tx: TransientGameState, effect: Effect, ctx: EffectContext) -> Result[Optional[str]]:
+    if ctx.target != "guardian":
+        return Result.failure("You need to target a guardian!")
+    
+    current_room = tx.get_current_room()
+    guardian = current_room.guardian
+    if not guardian:
+        return Result.failure("There is no guardian here!")
+    
+    if effect.amount is None and ctx.spell is not None:
+        damage = ctx.spell.calculate_damage(guardian.defense)
+    else:
+        damage = damage_after_defense(effect.amount if effect.amount is not None else ctx.power, guardian.defense)
+    new_guardian = guardian.take_damage(damage)
+    
+    if not new_guardian.is_alive():
+        tx.update_room(current_room.id, lambda r: replace(r, guardian=None))
+        tx.add_game_flags({f"{current_room.id}_cleared"})
+        return Result.success(effect.message or f"You defeat the {guardian.name}!")
+    
+    tx.update_room(current_room.id, lambda r: replace(r, guardian=new_guardian))
+    return Result.success(f"You hit the {guardian.name} for {damage} damage!")
+
+def apply_buff_flag(tx: TransientGameState, effect: Effect, ctx: EffectContext) -> Result[Optional[str]]:
+    tx.update_player(lambda p: p.add_flag(effect.flag))
+    return Result.success(effect.message or f"You cast {ctx.source_name}!")
+
+# Dispatch table from declared effect kind to its handler
+EFFECT_HANDLERS: Dict[str, EffectHandler] = {
+    "heal": apply_heal,
+    "restore_mana": apply_restore_mana,
+    "teach_spell": apply_teach_spell,
+    "damage": apply_damage,
+    "buff_flag": apply_buff_flag
+}
+
+def apply_effects(tx: TransientGameState, effects: Tuple[Effect, ...], ctx: EffectContext) -> Result[List[str]]:
+    """Apply declared effects in order; the first failure aborts the whole command."""
+    messages = []
+    for effect in effects:
+        result = EFFECT_HANDLERS[effect.kind](tx, effect, ctx)
+        if result.error:
+            return Result.failure(result.error)
+        if result.value:
+            messages.append(result.value)
+    return Result.success(messages)
+
 def use_item(state: GameState, item_id: str, target: Optional[str] = None) -> CommandResult:
     """Use an item from inventory."""
+    item_id = state.name_index.items.resolve(item_id, state.player.inventory) or item_id
+    target = resolve_target(state, target)
     if not state.player.has_item(item_id):
         return state, "You don't have that item."
     
@@ -143,47 +220,32 @@ def use_item(state: GameState, item_id: str, target: Optional[str] = None) -> Co
     
     current_room = state.get_current_room()
     
-    # Handle different item types using pattern matching
-    if item.type == ItemType.POTION:
-        if item_id == "health_potion":
-            new_state = update_player(
-                state,
-                lambda p: p.update_health(item.apply_effect(p.health, 100))
-            )
-            return new_state, "You feel revitalized!"
-        
-        elif item_id == "mana_potion":
-            new_state = update_player(
-                state,
-                lambda p: p.update_mana(item.apply_effect(p.mana, 100))
-            )
-            return new_state, "Your magical energy is restored!"
-    
-    elif item.type == ItemType.TOME:
-        # Handle tome usage - no target needed
-        if item_id == "tome_basic" and not state.player.knows_spell("fireball"):
-            new_state = update_player(state, lambda p: p.add_spell("fireball"))
-            return new_state, "You learn the Fireball spell!"
-        
-        elif item_id == "tome_advanced" and not state.player.knows_spell("shield"):
-            new_state = update_player(state, lambda p: p.add_spell("shield"))
-            return new_state, "You learn the Shield spell!"
-        
-        return state, "You already know the spells in this tome."
+    # Apply the item's declared effects
+    tx = state.transient()
+    result = apply_effects(tx, item.effects, EffectContext(item.name, item.effect or 0, target))
+    if result.error:
+        return state, result.error
+    if result.value:
+        return tx.persistent(), "\n".join(result.value)
     
     # Handle puzzle items
-    if current_room.puzzle and item_id in current_room.puzzle.required_items:
-        if current_room.puzzle.can_solve(state.player.inventory):
-            new_state = update_player(
-                update_game_flags(state, {f"{current_room.id}_puzzle_solved"}),
-                lambda p: p.add_spell(current_room.puzzle.reward)
-            )
+    if current_room.id in state.puzzle_index.puzzles_needing(item_id):
+        if state.is_puzzle_ready(current_room.id):
+            new_state = (state.transient()
+                         .add_game_flags({f"{current_room.id}_puzzle_solved"})
+                         .update_player(lambda p: p.add_spell(current_room.puzzle.reward))
+                         .persistent())
             return new_state, f"You solve the puzzle and learn the {current_room.puzzle.reward} spell!"
     
+    if item.type == ItemType.TOME:
+        return state, "You already know the spells in this tome."
+    
     return state, "You can't use that item here."
 
 def cast_spell(state: GameState, spell_id: str, target: Optional[str] = None) -> CommandResult:
     """Cast a spell at a target."""
+    spell_id = state.name_index.spells.resolve(spell_id, state.player.spells) or spell_id
+    target = resolve_target(state, target)
     if not state.player.knows_spell(spell_id):
         return state, "You don't know that spell."
     
@@ -194,53 +256,16 @@ def cast_spell(state: GameState, spell_id: str, target: Optional[str] = None) ->
     if not spell.can_cast(state.player.mana):
         return state, "Not enough mana!"
     
-    current_room = state.get_current_room()
+    if not spell.effects:
+        return state, "You can't cast that spell here."
     
-    if spell_id == "fireball":
-        if not target or target != "guardian":
-            return state, "You need to target a guardian!"
-        
-        if not current_room.guardian:
-            return state, "There is no guardian here!"
-        
-        # Calculate damage and update guardian
-        damage = spell.calculate_damage(current_room.guardian.defense)
-        new_guardian = current_room.guardian.take_damage(damage)
-        
-        # Update game state
-        new_state = update_player(
-            state,
-            lambda p: p.update_mana(p.mana - spell.mana_cost)
-        )
-        
-        if not new_guardian.is_alive():
-            # Guardian defeated
-            new_state = update_game_flags(
-                update_room(
-                    new_state,
-                    current_room.id,
-                    lambda r: replace(r, guardian=None)
-                ),
-                {f"{current_room.id}_cleared"}
-            )
-            return new_state, f"You defeat the {current_room.guardian.name}!"
-        else:
-            # Guardian damaged
-            new_state = update_room(
-                new_state,
-                current_room.id,
-                lambda r: replace(r, guardian=new_guardian)
-            )
-            return new_state, f"You hit the {current_room.guardian.name} for {damage} damage!"
-    
-    elif spell_id == "shield":
-        new_state = update_player(
-            state,
-            lambda p: p.add_flag("shield_active").update_mana(p.mana - spell.mana_cost)
-        )
-        return new_state, "You cast Shield!"
-    
-    return state, "You can't cast that spell here."
+    # Pay the mana cost and apply the spell's declared effects in one transaction
+    tx = state.transient().update_player(lambda p: p.update_mana(p.mana - spell.mana_cost))
+    result = apply_effects(tx, spell.effects, EffectContext(spell.name, spell.damage, target, spell))
+    if result.error:
+        return state, result.error
+    
+    return tx.persistent(), "\n".join(result.value)
 
 def show_inventory(state: GameState) -> CommandResult:
     """Show the player's inventory."""
@@ -326,6 +351,12 @@ def get_hint(state: GameState) -> CommandResult:
             "Hint: Try 'go north' to enter the tower."
         ),
         
+        # Any room whose puzzle the player can now solve
+        lambda: (
+            current_room.id in state.ready_puzzles() and
+            "Hint: You carry everything the puzzle here needs. Try using those items!"
+        ),
+        
         # Default hint
         lambda: "Hint: Explore, look around, and try using or taking items you find!"
     ]
@@ -340,8 +371,8 @@ COMMAND_HANDLERS: Dict[str, CommandHandler] = {
     "look": lambda state, args: look_around(state, args),
     "examine": lambda state, args: look_around(state, args),
     "take": lambda state, args: take_item(state, args),
-    "use": lambda state, args: use_item(state, *args.split(" on ")),
-    "cast": lambda state, args: cast_spell(state, *args.split()),
+    "use": lambda state, args: use_item(state, *args.split(" on ", 1)),
+    "cast": lambda state, args: cast_spell(state, *split_cast_args(state, args)) if args else (state, "Cast which spell?"),
     "inventory": lambda state, _: show_inventory(state),
     "status": lambda state, _: show_status(state),
     "hint": lambda state, _: get_hint(state)
@@ -365,20 +396,76 @@ COMMAND_SYNONYMS: Dict[str, str] = {
     "mana": "status"
 }
 
+# Commands whose response is a pure function of the state; safe to memoize
+READ_ONLY_COMMANDS = frozenset({"look", "examine", "inventory", "status", "hint"})
+
+class ResponseMemo:
+    """Bounded LRU of read-only command responses keyed on (command, args, version).
+
+    State versions are unique per GameState in a process (unpickled states
+    are re-stamped), so an entry can never be served for a different state;
+    repeated queries between state changes are free.
+    """
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[str, str, int], str]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key: Tuple[str, str, int], compute: Callable[[], str]) -> str:
+        """The memoized response, computed on a miss; the command's span says which it was."""
+        with self._lock:
+            hit = key in self._entries
+            if hit:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                response = self._entries[key]
+        if hit:
+            with TRACER.span(key[0], memo="hit"):
+                return response
+        with TRACER.span(key[0], memo="miss"):
+            response = compute()
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = response
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return response
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+READ_ONLY_MEMO = ResponseMemo()
+
+def parse_command(command: str) -> Tuple[str, str]:
+    """Split a command into its canonical action (synonyms resolved) and arguments."""
+    parts = command.lower().strip().split(maxsplit=1)
+    if not parts:
+        return "", ""
+    return COMMAND_SYNONYMS.get(parts[0], parts[0]), parts[1] if len(parts) > 1 else ""
+
 def process_command(state: GameState, command: str) -> CommandResult:
     """Process a game command and return the new state and response."""
-    # Split command into action and arguments using pure functions
-    parts = command.lower().strip().split(maxsplit=1)
-    action = COMMAND_SYNONYMS.get(parts[0], parts[0])
-    args = parts[1] if len(parts) > 1 else ""
+    with TRACER.span("parse"):
+        action, args = parse_command(command)
+    if not action:
+        return state, "Please enter a command. Try 'help' for a list of commands."
     
     # Get command handler using pure function
     handler = COMMAND_HANDLERS.get(action)
     if not handler:
         return state, "I don't understand that command. Try 'help' for a list of commands."
     
+    # Serve read-only commands from the memo while the state is unchanged
+    if action in READ_ONLY_COMMANDS:
+        return state, READ_ONLY_MEMO.lookup((action, args, state.version), lambda: handler(state, args)[1])
+    
     # Execute command
-    return handler(state, args)
+    with TRACER.span(action):
+        return handler(state, args)
 
 def find_path_to_player(
     start_room: str,
@@ -408,34 +495,174 @@ def find_path_to_player(
     
     return bfs([[start_room]], {start_room})
 
+def reverse_exits(rooms: Dict[str, Room]) -> Dict[str, List[str]]:
+    """Map each room to the rooms that have an exit leading into it."""
+    incoming: Dict[str, List[str]] = {room_id: [] for room_id in rooms}
+    for room in rooms.values():
+        for next_room in room.exits.values():
+            incoming.setdefault(next_room, []).append(room.id)
+    return incoming
+
+def next_steps_toward(
+    targets: Iterable[str],
+    incoming: Dict[str, List[str]],
+    allowed: Optional[Set[str]] = None
+) -> Dict[str, str]:
+    """Multi-source BFS from every target at once over reversed exits.
+    
+    Returns, for each room that can reach a target, the next room on a
+    shortest path to the nearest target (targets map to themselves), so one
+    search serves every guardian no matter how many targets there are.
+    Rooms outside `allowed`, when given, are never entered.
+    """
+    step = {room_id: room_id for room_id in targets}
+    queue = deque(step)
+    while queue:
+        room_id = queue.popleft()
+        for previous in incoming.get(room_id, ()):
+            if previous not in step and (allowed is None or previous in allowed):
+                step[previous] = room_id
+                queue.append(previous)
+    return step
+
+def advance_guardians(state: GameState, step: Dict[str, str], room_ids: Iterable[str]) -> GameState:
+    """Move the pursuing guardians found in `room_ids` one step along `step`.
+    
+    A guardian only moves into a room that held no guardian at the start of
+    the tick and that no other guardian claimed this tick.
+    """
+    tx = state.transient()
+    claimed: Set[str] = set()
+    for room_id in room_ids:
+        guardian = state.rooms[room_id].guardian
+        if not guardian or guardian.ai_type != "pursuit":
+            continue
+        next_room_id = step.get(room_id, room_id)
+        if next_room_id == room_id or next_room_id in claimed or state.rooms[next_room_id].guardian:
+            continue
+        claimed.add(next_room_id)
+        tx.update_room(room_id, lambda r: replace(r, guardian=None))
+        tx.update_room(next_room_id, lambda r, guardian=guardian: replace(r, guardian=guardian))
+    
+    # Unchanged ticks keep the same state
+    return tx.persistent()
+
+def move_guardians(
+    state: GameState,
+    targets: Iterable[str],
+    incoming: Optional[Dict[str, List[str]]] = None
+) -> GameState:
+    """Move every pursuing guardian one step toward its nearest target room."""
+    with TRACER.span("guardians"):
+        if incoming is None:
+            with TRACER.span("reverse_exits"):
+                incoming = reverse_exits(state.rooms)
+        with TRACER.span("pathfind"):
+            steps = next_steps_toward(targets, incoming)
+        with TRACER.span("advance"):
+            return advance_guardians(state, steps, state.rooms)
+
 def update_guardians(state: GameState) -> GameState:
-    """Update guardian positions using functional transformations."""
-    def should_move_guardian(room: Room) -> bool:
-        return (room.guardian and
-                room.guardian.ai_type == "pursuit" and
-                room.id != state.player.current_room)
-    
-    def move_guardian(room: Room) -> Optional[Tuple[str, Room]]:
-        if not should_move_guardian(room):
-            return None
-        
-        path = find_path_to_player(room.id, state.player.current_room, state.rooms)
-        if len(path) <= 1:
-            return None
+    """Move pursuing guardians one step toward the player."""
+    return move_guardians(state, [state.player.current_room])
+
+# Turn helpers shared by the CLI, the session table and the fuzzer
+def get_victory_message() -> str:
+    """Get the victory message."""
+    return """
+    🎉 Congratulations! 🎉
+    
+    You have defeated the Archmage and become the new master of the tower!
+    Your journey to master the arcane arts is complete.
+    
+    Thank you for playing the Wizard's Tower Trial!
+    """
+
+def get_game_over_message() -> str:
+    """Get the game over message."""
+    return "\nYou have been defeated! Game over."
+
+def format_room_display(state: GameState) -> str:
+    """Format the current room display."""
+    current_room = state.get_current_room()
+    messages = [
+        f"\n{current_room.name}",
+        "=" * len(current_room.name),
+        current_room.description
+    ]
+    
+    if current_room.items:
+        messages.extend([
+            "\nItems here:",
+            *[f"- {state.items[item_id].name}" for item_id in current_room.items]
+        ])
+    
+    messages.extend([
+        "\nExits:",
+        *[f"- {direction.value}: {state.rooms[room_id].name}"
+          for direction, room_id in current_room.exits.items()]
+    ])
+    
+    if current_room.guardian:
+        messages.extend([
+            f"\nA {current_room.guardian.name} blocks your path!",
+            f"Health: {current_room.guardian.health}"
+        ])
+    
+    return "\n".join(messages)
+
+def is_game_over(state: GameState) -> bool:
+    """Check if the game is over."""
+    return state.player.health <= 0
+
+def is_victory(state: GameState) -> bool:
+    """Check if the player has won."""
+    return (state.player.current_room == "tower_crown" and
+            state.has_game_flag("archmage_defeated"))
+
+# Moves the guardians once per turn; sessions pass their zone scheduler's update
+GuardianUpdate = Callable[[GameState], GameState]
+
+def run_turn(state: GameState, command: str,
+             guardians: GuardianUpdate = update_guardians) -> Tuple[GameState, List[str], bool]:
+    """Run a regular command and the guardian update without terminal I/O."""
+    with TRACER.span("turn", command=command):
+        # Process regular command
+        new_state, response = process_command(state, command)
+        messages = [f"\n{response}"]
         
-        next_room_id = path[1]
-        next_room = state.rooms[next_room_id]
-        return (
-            (room.id, replace(room, guardian=None)),
-            (next_room_id, replace(next_room, guardian=room.guardian))
-        )
-    
-    # Collect all guardian movements
-    movements = list(filter(None, map(move_guardian, state.rooms.values())))
-    
-    # Apply all movements to create new room state
-    new_rooms = dict(state.rooms)
-    for old_room, new_room in chain.from_iterable(movements):
-        new_rooms[old_room] = new_room
-    
-    return replace(state, rooms=new_rooms) 
\ No newline at end of file
+        # Update guardians, unless a Time Stop cast on an earlier turn freezes them for this one
+        if state.player.has_flag("time_stopped"):
+            new_state = replace(new_state, player=new_state.player.remove_flag("time_stopped"))
+        else:
+            new_state = guardians(new_state)
+    
+    # Check game state
+    if is_game_over(new_state):
+        return new_state, messages + [get_game_over_message()], True
+    
+    if is_victory(new_state):
+        return new_state, messages + [get_victory_message()], True
+    
+    return new_state, messages, False
+
+def split_commands(line: str) -> List[str]:
+    """Split an input line into its ';'-separated commands."""
+    return [part.strip() for part in line.split(';') if part.strip()]
+
+# Called after each turn with (state before, command, state after, response, finished)
+TurnObserver = Callable[[GameState, str, GameState, str, bool], None]
+
+def run_batch(state: GameState, commands: List[str], on_turn: Optional[TurnObserver] = None,
+              guardians: GuardianUpdate = update_guardians) -> Tuple[GameState, List[str], bool]:
+    """Run several regular commands in one go, stopping at game over or victory."""
+    messages: List[str] = []
+    for command in commands:
+        new_state, turn_messages, finished = run_turn(state, command, guardians)
+        if on_turn:
+            on_turn(state, command, new_state, "".join(turn_messages), finished)
+        state = new_state
+        messages.extend(turn_messages)
+        if finished:
+            return state, messages, True
+    return state, messages, False
@@ -0,0 +1,343 @@
+import argparse
+import multiprocessing
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Pattern, Tuple
+from game_data import GameState, Room, Item, Spell, load_game_data
+from game_engine import process_command, update_guardians
+
+STEP_KEYWORDS = ("Given", "When", "Then", "And", "But")
+
+@dataclass(frozen=True)
+class Step:
+    keyword: str
+    text: str
+    line: int
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    line: int
+    steps: Tuple[Step, ...]
+
+@dataclass(frozen=True)
+class Feature:
+    name: str
+    background: Tuple[Step, ...]
+    scenarios: Tuple[Scenario, ...]
+
+def parse_feature(text: str) -> Feature:
+    """Parse the Gherkin subset used by the feature files: Background, Scenario and steps."""
+    name = ""
+    background: List[Step] = []
+    scenarios: List[Tuple[str, int, List[Step]]] = []
+    current: Optional[List[Step]] = None
+    keyword = "Given"
+    for number, raw in enumerate(text.splitlines(), start=1):
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        head, _, rest = line.partition(":")
+        if head == "Feature":
+            name = rest.strip()
+        elif head == "Background":
+            current = background
+        elif head == "Scenario":
+            current = []
+            scenarios.append((rest.strip(), number, current))
+        elif current is not None and line.split(" ", 1)[0] in STEP_KEYWORDS:
+            word, step_text = line.split(" ", 1)
+            keyword = keyword if word in ("And", "But") else word
+            current.append(Step(keyword, step_text.strip(), number))
+    return Feature(
+        name=name,
+        background=tuple(background),
+        scenarios=tuple(Scenario(title, line, tuple(steps)) for title, line, steps in scenarios)
+    )
+
+@lru_cache(maxsize=None)
+def cached_content() -> Tuple[Dict[str, Room], Dict[str, Item], Dict[str, Spell]]:
+    """Shipped content, loaded once per process (and inherited by forked workers)."""
+    result = load_game_data()
+    if result.error:
+        raise RuntimeError(f"Error loading game data: {result.error}")
+    return result.value
+
+class StepFailure(AssertionError):
+    pass
+
+def check(condition: bool, message: str) -> None:
+    if not condition:
+        raise StepFailure(message)
+
+@dataclass
+class ScenarioContext:
+    """The world one scenario runs in: its current state and the last command's outcome."""
+    state: GameState = field(default_factory=lambda: GameState.new_game(*cached_content()))
+    previous: Optional[GameState] = None
+    message: str = ""
+    subject: Optional[str] = None
+    # "a room with items" is settled by the first item the scenario then takes
+    room_with_items: bool = False
+    new_spell: Optional[str] = None
+    pursuer: Optional[str] = None
+
+    def act(self, command: str) -> None:
+        self.previous = self.state
+        self.state, self.message = process_command(self.state, command)
+
+    def tick(self) -> None:
+        """The guardians' half of a turn, which run_turn plays after every command."""
+        self.previous = self.state
+        self.state = update_guardians(self.state)
+
+    def update_player(self, **changes) -> None:
+        self.state = replace(self.state, player=replace(self.state.player, **changes))
+
+    def room_named(self, name: str) -> Room:
+        name = name.lower()
+        room = next((room for room in self.state.rooms.values()
+                     if room.name.lower() == name or room.id == name), None)
+        check(room is not None, f"No room named {name!r}")
+        return room
+
+    def item_named(self, name: str) -> str:
+        name = name.lower()
+        item_id = next((item.id for item in self.state.items.values()
+                        if item.name.lower() == name or item.id == name.replace(" ", "_")), None)
+        check(item_id is not None, f"No item named {name!r}")
+        self.subject = item_id
+        return item_id
+
+    def guardian_health(self, state: GameState) -> int:
+        guardian = state.get_current_room().guardian
+        return guardian.health if guardian else 0
+
+    def pursuer_distance(self, state: GameState) -> Optional[int]:
+        """Exits between the pursuing guardian and the player; None once it is gone or cut off."""
+        start = next((room.id for room in state.rooms.values()
+                      if room.guardian and room.guardian.name == self.pursuer), None)
+        distance = {start: 0}
+        queue = deque(distance if start else [])
+        while queue:
+            room_id = queue.popleft()
+            if room_id == state.player.current_room:
+                return distance[room_id]
+            for next_room in state.rooms[room_id].exits.values():
+                if next_room not in distance:
+                    distance[next_room] = distance[room_id] + 1
+                    queue.append(next_room)
+        return None
+
+def defeat_guardian(ctx: ScenarioContext) -> None:
+    check(ctx.state.get_current_room().guardian is not None, "There is no guardian here")
+    for _ in range(20):
+        if ctx.state.get_current_room().guardian is None:
+            return
+        ctx.update_player(mana=100)
+        ctx.act("cast fireball guardian")
+    raise StepFailure("The guardian survived 20 fireballs")
+
+def take_item_named(ctx: ScenarioContext, name: str) -> None:
+    item_id = ctx.item_named(name)
+    if ctx.room_with_items:
+        room = next((room for room in ctx.state.rooms.values() if item_id in room.items), None)
+        check(room is not None, f"No room holds the {name}")
+        ctx.update_player(current_room=room.id)
+        ctx.room_with_items = False
+    ctx.act(f"take {item_id}")
+
+def learned_new_spell(ctx: ScenarioContext) -> None:
+    learned = ctx.state.player.spells - ctx.previous.player.spells
+    check(len(learned) == 1, f"Learned {sorted(learned)}")
+    ctx.new_spell = next(iter(learned))
+
+def spell_took_effect(ctx: ScenarioContext) -> None:
+    # Failed commands hand back the state they were given
+    check(ctx.state is not ctx.previous, ctx.message)
+    spell = ctx.state.get_spell(ctx.new_spell)
+    missing = [e.flag for e in spell.effects if e.kind == "buff_flag" and not ctx.state.player.has_flag(e.flag)]
+    check(not missing, f"Flags not set: {missing}")
+
+def stand_next_to_guardian(ctx: ScenarioContext) -> None:
+    for room in ctx.state.rooms.values():
+        neighbours = [ctx.state.rooms[room_id].guardian for room_id in room.exits.values()]
+        pursuer = next((g for g in neighbours if g and g.ai_type == "pursuit"), None)
+        if pursuer and not room.guardian:
+            ctx.update_player(current_room=room.id)
+            ctx.pursuer = pursuer.name
+            return
+    raise StepFailure("No room is next to a pursuing guardian")
+
+def move_away(ctx: ScenarioContext) -> None:
+    room = ctx.state.get_current_room()
+    direction = next((d for d, room_id in room.exits.items() if not ctx.state.rooms[room_id].guardian), None)
+    check(direction is not None, "Every exit is guarded")
+    # A whole turn: the guardians move after the player
+    ctx.act(f"go {direction.value}")
+    ctx.tick()
+
+def came_closer(ctx: ScenarioContext) -> None:
+    before, after = ctx.pursuer_distance(ctx.previous), ctx.pursuer_distance(ctx.state)
+    check(before is not None and after is not None and after < before,
+          f"The {ctx.pursuer} went from {before} to {after} exits away")
+
+def stopped_pursuing(ctx: ScenarioContext) -> None:
+    ctx.tick()
+    check(ctx.pursuer_distance(ctx.state) is None, f"The {ctx.pursuer} is still pursuing")
+
+StepFunction = Callable[..., None]
+
+# Step phrases (matched against the whole step text) and what they do. Phrases
+# for behaviour the engine does not have (guardian attacks, consumable potions,
+# timed effects, hazards firing, quicksaves) are left undefined rather than failing.
+STEP_DEFINITIONS: List[Tuple[Pattern, StepFunction]] = [(re.compile(f"^{pattern}$", re.IGNORECASE), fn) for pattern, fn in [
+    # Setup
+    (r"I am a novice wizard", lambda ctx: None),
+    (r"I am standing at the tower entrance", lambda ctx: ctx.update_player(current_room="entrance")),
+    (r"I have (\d+) health points", lambda ctx, n: ctx.update_player(health=int(n))),
+    (r"I have (\d+) mana points", lambda ctx, n: ctx.update_player(mana=int(n))),
+    (r"I know the (\w+) spell", lambda ctx, spell: ctx.update_player(spells=ctx.state.player.spells | {spell.lower()})),
+    (r"I am in a room with items", lambda ctx: setattr(ctx, "room_with_items", True)),
+    (r"I am in a room connected to a guardian's room", stand_next_to_guardian),
+    (r"I am in (?:the )?(.+)", lambda ctx, name: ctx.update_player(current_room=ctx.room_named(name).id)),
+    (r"I (?:have|find) (?:the|an?) (.+)", lambda ctx, name: ctx.update_player(
+        inventory=ctx.state.player.inventory + [ctx.item_named(name)])),
+    (r"I encounter the (.+)", lambda ctx, name: check(
+        getattr(ctx.state.get_current_room().guardian, "name", None) == name, f"{name} is not here")),
+    
+    # Actions
+    (r"I (?:try to )?go (\w+)(?: from the \w+)?", lambda ctx, direction: ctx.act(f"go {direction}")),
+    (r"I cast (\w+) at the guardian", lambda ctx, spell: ctx.act(f"cast {spell.lower()} guardian")),
+    (r"I defeat the guardian", defeat_guardian),
+    (r"I take an? (.+)", take_item_named),
+    (r"I use the (.+)", lambda ctx, name: ctx.act(f"use {ctx.item_named(name)}")),
+    (r"I check my status", lambda ctx: ctx.act("status")),
+    (r"I cast the new spell", lambda ctx: ctx.act(f"cast {ctx.new_spell}")),
+    (r"the guardian detects me", lambda ctx: ctx.tick()),
+    (r"I move to a different room", move_away),
+    
+    # Outcomes
+    (r"I should enter the (.+)", lambda ctx, name: check(
+        ctx.state.get_current_room().name == name, f"Expected {name}, got {ctx.state.get_current_room().name}")),
+    (r"I should see the (\w+)'s description", lambda ctx, room: check(
+        ctx.room_named(room).description in ctx.message, "Room description not shown")),
+    (r"I should be able to go (\w+) to (?:return to )?the (\w+)", lambda ctx, direction, room: check(
+        room in (ctx.state.get_current_room().exits.get(d) for d in ctx.state.get_current_room().exits
+                 if d.value == direction), f"No exit {direction} to {room}")),
+    (r"I should be told I cannot go that way", lambda ctx: check("cannot go that way" in ctx.message, ctx.message)),
+    (r"I should remain in the (\w+)", lambda ctx, room: check(
+        ctx.state.player.current_room == room, f"Moved to {ctx.state.player.current_room}")),
+    (r"the guardian should take damage", lambda ctx: check(
+        ctx.guardian_health(ctx.state) < ctx.guardian_health(ctx.previous), "The guardian took no damage")),
+    (r"my mana should decrease by the spell's cost", lambda ctx: check(
+        ctx.previous.player.mana - ctx.state.player.mana == ctx.state.get_spell(ctx.new_spell).mana_cost,
+        f"Mana went from {ctx.previous.player.mana} to {ctx.state.player.mana}")),
+    (r"my mana should decrease by (\d+)", lambda ctx, n: check(
+        ctx.previous.player.mana - ctx.state.player.mana == int(n),
+        f"Mana went from {ctx.previous.player.mana} to {ctx.state.player.mana}")),
+    (r"my health should increase by (\d+)", lambda ctx, n: check(
+        ctx.state.player.health - ctx.previous.player.health == int(n),
+        f"Health went from {ctx.previous.player.health} to {ctx.state.player.health}")),
+    (r"I should receive a victory message", lambda ctx: check("defeat" in ctx.message, ctx.message)),
+    (r"the path upward should be revealed", lambda ctx: check(
+        ctx.state.get_current_room().guardian is None and
+        any(d.value == "up" for d in ctx.state.get_current_room().exits), "The way up is still blocked")),
+    (r"I should learn the (.+) spell", lambda ctx, spell: check(
+        spell.lower().replace(" ", "_") in ctx.state.player.spells, f"Known spells: {sorted(ctx.state.player.spells)}")),
+    (r"I should learn a new spell", learned_new_spell),
+    (r"the spell should be added to my known spells", lambda ctx: check(
+        ctx.new_spell in ctx.state.player.spells, f"Known spells: {sorted(ctx.state.player.spells)}")),
+    (r"it should have the appropriate effect", spell_took_effect),
+    (r"(?:it|the guardian) should (?:re)?calculate (?:a|its) path(?: to my location)?", lambda ctx: check(
+        ctx.pursuer_distance(ctx.previous) is not None, f"The {ctx.pursuer} has no path to me")),
+    (r"it should (?:move towards|continue pursuing) me", came_closer),
+    (r"it should stop pursuing me", stopped_pursuing),
+    (r"it should be added to my inventory", lambda ctx: check(
+        ctx.subject in ctx.state.player.inventory, f"{ctx.subject} not in inventory")),
+    (r"I should see my current health and mana", lambda ctx: check(
+        "Health:" in ctx.message and "Mana:" in ctx.message, ctx.message)),
+    (r"I should see my current location", lambda ctx: check(
+        ctx.state.get_current_room().name in ctx.message, ctx.message)),
+    (r"I should see my known spells", lambda ctx: check("Spells Known" in ctx.message, ctx.message))
+]]
+
+def find_step(text: str) -> Optional[Tuple[StepFunction, Tuple[str, ...]]]:
+    for pattern, fn in STEP_DEFINITIONS:
+        match = pattern.match(text)
+        if match:
+            return fn, match.groups()
+    return None
+
+@dataclass(frozen=True)
+class ScenarioResult:
+    name: str
+    line: int
+    status: str  # passed, failed or undefined
+    seconds: float
+    detail: str = ""
+
+def run_scenario(background: Tuple[Step, ...], scenario: Scenario) -> ScenarioResult:
+    """Run one scenario; undefined steps are reported before anything runs."""
+    started = time.perf_counter()
+    steps = background + scenario.steps
+    bound = [(step, find_step(step.text)) for step in steps]
+    undefined = [step for step, found in bound if found is None]
+    if undefined:
+        return ScenarioResult(scenario.name, scenario.line, "undefined", time.perf_counter() - started,
+                              f"line {undefined[0].line}: {undefined[0].keyword} {undefined[0].text}")
+    
+    ctx = ScenarioContext()
+    for step, (fn, args) in bound:
+        try:
+            fn(ctx, *args)
+        except Exception as e:
+            return ScenarioResult(scenario.name, scenario.line, "failed", time.perf_counter() - started,
+                                  f"line {step.line}: {step.keyword} {step.text}: {e}")
+    return ScenarioResult(scenario.name, scenario.line, "passed", time.perf_counter() - started)
+
+def _run_chunk(background: Tuple[Step, ...], scenarios: List[Scenario]) -> List[ScenarioResult]:
+    return [run_scenario(background, scenario) for scenario in scenarios]
+
+def run_feature(feature: Feature, workers: Optional[int] = None) -> List[ScenarioResult]:
+    """Run every scenario, split across worker processes when there is more than one."""
+    workers = min(workers or os.cpu_count() or 1, len(feature.scenarios))
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        return _run_chunk(feature.background, list(feature.scenarios))
+    
+    # Load content before forking so every worker inherits the parsed objects
+    cached_content()
+    chunks = [list(feature.scenarios[i::workers]) for i in range(workers)]
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork")) as pool:
+        results = [r for chunk in pool.map(_run_chunk, [feature.background] * workers, chunks) for r in chunk]
+    return sorted(results, key=lambda r: r.line)
+
+def format_report(results: List[ScenarioResult], elapsed: float) -> str:
+    lines = [f"{r.status.upper():9} {r.seconds * 1000:7.2f} ms  {r.name}" +
+             (f"\n          {r.detail}" if r.detail else "")
+             for r in results]
+    counts = {status: sum(r.status == status for r in results) for status in ("passed", "failed", "undefined")}
+    lines.append(f"\n{len(results)} scenarios ({', '.join(f'{n} {s}' for s, n in counts.items())}) "
+                 f"in {elapsed:.3f}s")
+    return "\n".join(lines)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the Gherkin acceptance scenarios against the engine.")
+    parser.add_argument("feature", nargs="?", default="features/tower_trial.feature")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+    
+    started = time.perf_counter()
+    results = run_feature(parse_feature(Path(args.feature).read_text()), args.workers)
+    print(format_report(results, time.perf_counter() - started))
+    sys.exit(1 if any(r.status == "failed" for r in results) else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+import sys
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set
+from game_data import GameState, Player, Room
+
+def _shallow_size(obj: object) -> int:
+    """Size of an object plus its attribute dict, excluding referenced objects."""
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+def _children(obj: object) -> Iterable[object]:
+    """Per-game objects a snapshot keeps alive; static content is not counted."""
+    if isinstance(obj, GameState):
+        return (obj.player, obj.rooms, obj.visited_rooms, obj.game_flags)
+    if isinstance(obj, Player):
+        return (obj.inventory, obj.flags, obj.spells)
+    if isinstance(obj, Room):
+        return (obj.items, obj.exits) + ((obj.guardian,) if obj.guardian else ())
+    if isinstance(obj, dict):
+        return obj.values()
+    return ()
+
+def _walk_bytes(roots: Iterable[object], skip: Callable[[object], bool]) -> int:
+    seen: Set[int] = set()
+    pending: List[object] = list(roots)
+    total = 0
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen or skip(obj):
+            continue
+        seen.add(id(obj))
+        total += _shallow_size(obj)
+        pending.extend(_children(obj))
+    return total
+
+def rooms_bytes(rooms: Dict[str, Room], shared_rooms: Dict[str, Room]) -> int:
+    """Estimated bytes of a state's rooms dict and the rooms in it not shared with content."""
+    if rooms is shared_rooms:
+        return 0
+    return sys.getsizeof(rooms) + _walk_bytes(
+        (room for room in rooms.values() if shared_rooms.get(room.id) is not room), lambda obj: False)
+
+def state_bytes(state: GameState, shared_rooms: Dict[str, Room], rooms_cost: Optional[int] = None) -> int:
+    """Estimated bytes one live GameState holds beyond the shared content.
+    
+    Rooms identical to `shared_rooms` and the rooms dict itself when it is
+    the shared one are free. Pass `rooms_cost` (from `rooms_bytes`) to skip
+    walking a rooms dict that was already measured.
+    """
+    if rooms_cost is None:
+        rooms_cost = rooms_bytes(state.rooms, shared_rooms)
+    return rooms_cost + _walk_bytes([state], lambda obj: obj is state.rooms)
+
+class StateHistory:
+    """Bounded undo/redo history of immutable game states.
+
+    Snapshots are the GameState objects themselves, so recording and undoing
+    are O(1). Memory is accounted with reference counts over the objects each
+    snapshot keeps alive: a rooms dict or room shared with another snapshot is
+    counted once, and a shared rooms dict is not even walked.
+    """
+
+    def __init__(self, depth: int = 50, max_bytes: Optional[int] = None):
+        self.depth = depth
+        self.max_bytes = max_bytes
+        self._undo: Deque[GameState] = deque()
+        self._redo: List[GameState] = []
+        self._refs: Dict[int, int] = {}
+        self._bytes = 0
+
+    def memory_bytes(self) -> int:
+        """Estimated bytes retained by all undo and redo snapshots."""
+        return self._bytes
+
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def __len__(self) -> int:
+        return len(self._undo)
+
+    def record(self, previous: GameState) -> None:
+        """Remember the state a command is moving away from; clears redo."""
+        while self._redo:
+            self._release(self._redo.pop())
+        self._push_undo(previous)
+
+    def undo(self, current: GameState) -> Optional[GameState]:
+        """Step back one state, or None if the history is empty."""
+        if not self._undo:
+            return None
+        previous = self._undo.pop()
+        self._redo.append(current)
+        self._retain(current)
+        self._release(previous)
+        return previous
+
+    def redo(self, current: GameState) -> Optional[GameState]:
+        """Step forward again after an undo, or None if there is nothing to redo."""
+        if not self._redo:
+            return None
+        following = self._redo.pop()
+        self._push_undo(current)
+        self._release(following)
+        return following
+
+    def _push_undo(self, state: GameState) -> None:
+        self._undo.append(state)
+        self._retain(state)
+        while len(self._undo) > self.depth or (
+                self.max_bytes is not None and self._bytes > self.max_bytes and len(self._undo) > 1):
+            self._release(self._undo.popleft())
+
+    def _retain(self, obj: object) -> None:
+        key = id(obj)
+        count = self._refs.get(key, 0)
+        self._refs[key] = count + 1
+        if count == 0:
+            self._bytes += _shallow_size(obj)
+            for child in _children(obj):
+                self._retain(child)
+
+    def _release(self, obj: object) -> None:
+        key = id(obj)
+        count = self._refs[key] - 1
+        if count:
+            self._refs[key] = count
+            return
+        del self._refs[key]
+        self._bytes -= _shallow_size(obj)
+        for child in _children(obj):
+            self._release(child)
@@ -0,0 +1,300 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+from game_data import Direction, EFFECT_KINDS, Result, safe_call
+from content import CONTENT_FILES, file_stamp
+
+START_ROOM = "entrance"
+DIRECTIONS = frozenset(d.value for d in Direction)
+# Below this many entries the process pool costs more than it saves
+PARALLEL_THRESHOLD = 20_000
+CHUNK_SIZE = 5_000
+
+# The id sets each kind's entries refer to; an entry is re-checked when one changes
+DEPENDS_ON = {"rooms": ("rooms", "items", "spells"), "items": ("spells",), "spells": ("spells",)}
+
+@dataclass(frozen=True)
+class Finding:
+    severity: str  # error or warning
+    file: str
+    entry: Optional[str]
+    message: str
+
+    def __str__(self) -> str:
+        where = f"{self.file}[{self.entry}]" if self.entry is not None else self.file
+        return f"{self.severity} {where}: {self.message}"
+
+Ids = Dict[str, FrozenSet[str]]
+
+def expect(findings: List[Finding], filename: str, key: str, value: Any, kind: type, field: str) -> Any:
+    """`value` when it is missing or of the expected type; otherwise record an error and return None."""
+    if value is None or isinstance(value, kind):
+        return value
+    findings.append(Finding("error", filename, key, f"{field} is not {'an object' if kind is dict else 'a list'}"))
+    return None
+
+def room_exits(data: Any) -> Dict[str, str]:
+    """A raw room's well-formed exits; malformed ones add no graph edges."""
+    exits = data.get("exits") if isinstance(data, dict) else None
+    if not isinstance(exits, dict):
+        return {}
+    return {direction: target for direction, target in exits.items() if isinstance(target, str)}
+
+def check_effects(kind: str, key: str, data: dict, ids: Ids) -> List[Finding]:
+    filename = CONTENT_FILES[kind][0]
+    findings: List[Finding] = []
+    for effect in expect(findings, filename, key, data.get("effects"), list, "effects") or []:
+        if not isinstance(effect, dict):
+            findings.append(Finding("error", filename, key, f"effect {effect!r} is not an object"))
+        elif effect.get("kind") not in EFFECT_KINDS:
+            findings.append(Finding("error", filename, key, f"unknown effect kind {effect.get('kind')!r}"))
+        elif effect.get("kind") == "teach_spell" and not (
+                isinstance(effect.get("spell"), str) and effect["spell"] in ids["spells"]):
+            findings.append(Finding("error", filename, key, f"teaches unknown spell {effect.get('spell')!r}"))
+    return findings
+
+def check_room(key: str, data: dict, ids: Ids) -> List[Finding]:
+    filename = CONTENT_FILES["rooms"][0]
+    findings: List[Finding] = []
+    for direction, target in (expect(findings, filename, key, data.get("exits"), dict, "exits") or {}).items():
+        if direction not in DIRECTIONS:
+            findings.append(Finding("error", filename, key, f"unknown exit direction {direction!r}"))
+        if not isinstance(target, str) or target not in ids["rooms"]:
+            findings.append(Finding("error", filename, key, f"exit {direction!r} leads to unknown room {target!r}"))
+    for item_id in expect(findings, filename, key, data.get("items"), list, "items") or []:
+        if not isinstance(item_id, str) or item_id not in ids["items"]:
+            findings.append(Finding("error", filename, key, f"holds unknown item {item_id!r}"))
+    puzzle = expect(findings, filename, key, data.get("puzzle"), dict, "puzzle") or {}
+    for item_id in expect(findings, filename, key, puzzle.get("required_items"), list, "puzzle required_items") or []:
+        if not isinstance(item_id, str) or item_id not in ids["items"]:
+            findings.append(Finding("error", filename, key, f"puzzle requires unknown item {item_id!r}"))
+    if puzzle and not (isinstance(puzzle.get("reward"), str) and puzzle["reward"] in ids["spells"]):
+        findings.append(Finding("error", filename, key, f"puzzle rewards unknown spell {puzzle.get('reward')!r}"))
+    return findings
+
+def check_entry(kind: str, key: str, data: Any, ids: Ids) -> List[Finding]:
+    """Everything that can be checked about one entry given only the id sets."""
+    filename, parse = CONTENT_FILES[kind]
+    if not isinstance(data, dict):
+        return [Finding("error", filename, key, "entry is not an object")]
+    findings = []
+    parsed = safe_call(parse, data)
+    if parsed.error:
+        findings.append(Finding("error", filename, key, f"does not parse: {parsed.error}"))
+    if data.get("id") != key:
+        findings.append(Finding("error", filename, key, f"id {data.get('id')!r} does not match its key"))
+    if kind == "rooms":
+        findings.extend(check_room(key, data, ids))
+    else:
+        findings.extend(check_effects(kind, key, data, ids))
+    return findings
+
+def _check_chunk(kind: str, entries: List[Tuple[str, Any]], ids: Ids) -> List[Tuple[str, Tuple[Finding, ...]]]:
+    return [(key, tuple(check_entry(kind, key, data, ids))) for key, data in entries]
+
+def check_entries(kind: str, entries: List[Tuple[str, Any]], ids: Ids,
+                  workers: Optional[int] = None) -> Dict[str, Tuple[Finding, ...]]:
+    """Check entries, split across processes when there are enough of them."""
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(entries) < PARALLEL_THRESHOLD:
+        return dict(_check_chunk(kind, entries, ids))
+    chunks = [entries[i:i + CHUNK_SIZE] for i in range(0, len(entries), CHUNK_SIZE)]
+    context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+    with ProcessPoolExecutor(workers, mp_context=context) as pool:
+        return {key: findings for chunk in pool.map(_check_chunk, [kind] * len(chunks), chunks, [ids] * len(chunks))
+                for key, findings in chunk}
+
+def strongly_connected_components(graph: Dict[str, List[str]]) -> Dict[str, int]:
+    """Iterative Tarjan over int-numbered rooms: each room's component, in O(rooms + exits)."""
+    names = list(graph)
+    number = {name: i for i, name in enumerate(names)}
+    edges = [[number[target] for target in graph[name]] for name in names]
+    size = len(names)
+    index = [-1] * size
+    low = [0] * size
+    component = [-1] * size
+    on_stack = bytearray(size)
+    stack: List[int] = []
+    counter = components = 0
+    for root in range(size):
+        if index[root] >= 0:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        work = [(root, 0)]
+        while work:
+            node, position = work[-1]
+            targets = edges[node]
+            if position < len(targets):
+                work[-1] = (node, position + 1)
+                target = targets[position]
+                if index[target] < 0:
+                    index[target] = low[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack[target] = 1
+                    work.append((target, 0))
+                elif on_stack[target] and index[target] < low[node]:
+                    low[node] = index[target]
+                continue
+            work.pop()
+            if work and low[node] < low[work[-1][0]]:
+                low[work[-1][0]] = low[node]
+            if low[node] == index[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = 0
+                    component[member] = components
+                    if member == node:
+                        break
+                components += 1
+    return dict(zip(names, component))
+
+def check_graph(rooms: Dict[str, Any]) -> List[Finding]:
+    """Reachability from the entrance, one-way exits and rooms with no way back, in linear time."""
+    filename = CONTENT_FILES["rooms"][0]
+    graph = {key: [target for target in room_exits(data).values() if target in rooms]
+             for key, data in rooms.items()}
+    if START_ROOM not in graph:
+        return [Finding("error", filename, None, f"there is no {START_ROOM!r} room")]
+    findings = []
+    
+    reachable = {START_ROOM}
+    frontier = [START_ROOM]
+    while frontier:
+        for target in graph[frontier.pop()]:
+            if target not in reachable:
+                reachable.add(target)
+                frontier.append(target)
+    
+    component = strongly_connected_components(graph)
+    home = component[START_ROOM]
+    for key, targets in graph.items():
+        if key not in reachable:
+            findings.append(Finding("warning", filename, key, f"unreachable from {START_ROOM!r}"))
+            continue
+        if not targets:
+            findings.append(Finding("warning", filename, key, "dead end: no exits"))
+        elif component[key] != home:
+            findings.append(Finding("warning", filename, key, f"dead end: no way back to {START_ROOM!r}"))
+        for target in targets:
+            if key not in graph[target]:
+                findings.append(Finding("warning", filename, key, f"one-way exit to {target!r}"))
+    return findings
+
+@dataclass(frozen=True)
+class LintReport:
+    """Findings for one content snapshot, kept so the next run only re-checks what changed."""
+    raw: Dict[str, Dict[str, Any]]
+    stamps: Dict[str, Tuple[int, int]]
+    ids: Ids
+    entry_findings: Dict[str, Dict[str, Tuple[Finding, ...]]]
+    graph_findings: Tuple[Finding, ...]
+    file_findings: Tuple[Finding, ...]
+    checked: int  # entries checked by this run
+
+    @property
+    def findings(self) -> List[Finding]:
+        return (list(self.file_findings) +
+                [f for kind in CONTENT_FILES for findings in self.entry_findings[kind].values() for f in findings] +
+                list(self.graph_findings))
+
+    @property
+    def errors(self) -> List[Finding]:
+        return [f for f in self.findings if f.severity == "error"]
+
+def read_raw(path: Path) -> Tuple[Dict[str, Any], Optional[Finding]]:
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError) as e:
+        return {}, Finding("error", path.name, None, f"cannot be read: {e}")
+    if not isinstance(data, dict):
+        return {}, Finding("error", path.name, None, "must be an object keyed by id")
+    return data, None
+
+def lint_content(data_dir: Path = Path("data"), previous: Optional[LintReport] = None,
+                 workers: Optional[int] = None) -> Result[LintReport]:
+    """Validate content; with `previous`, only changed files and entries are re-checked.
+    
+    An entry is re-checked when its own source changed or when an id set it
+    refers to did; the graph checks run again whenever rooms.json changed.
+    """
+    def lint() -> LintReport:
+        raw: Dict[str, Dict[str, Any]] = {}
+        stamps: Dict[str, Tuple[int, int]] = {}
+        file_findings: List[Finding] = []
+        for kind, (filename, _) in CONTENT_FILES.items():
+            path = data_dir / filename
+            stamps[kind] = file_stamp(path) if path.exists() else (0, 0)
+            if previous and previous.stamps[kind] == stamps[kind]:
+                raw[kind] = previous.raw[kind]
+                file_findings.extend(f for f in previous.file_findings if f.file == filename)
+                continue
+            raw[kind], problem = read_raw(path)
+            if problem:
+                file_findings.append(problem)
+        ids = {kind: frozenset(entries) for kind, entries in raw.items()}
+        
+        entry_findings: Dict[str, Dict[str, Tuple[Finding, ...]]] = {}
+        stale: Dict[str, List[Tuple[str, Any]]] = {}
+        for kind, entries in raw.items():
+            ids_changed = previous is None or any(previous.ids[dep] != ids[dep] for dep in DEPENDS_ON[kind])
+            old_raw = previous.raw[kind] if previous else {}
+            stale[kind] = [(key, data) for key, data in entries.items()
+                           if ids_changed or old_raw.get(key) != data]
+            fresh = check_entries(kind, stale[kind], ids, workers)
+            entry_findings[kind] = {key: fresh[key] if key in fresh else previous.entry_findings[kind][key]
+                                    for key in entries}
+        
+        # The graph only depends on which rooms exist and where their exits lead
+        old_rooms = previous.raw["rooms"] if previous else {}
+        exits_changed = previous is None or previous.ids["rooms"] != ids["rooms"] or any(
+            not isinstance(data, dict) or not isinstance(old_rooms[key], dict) or
+            data.get("exits") != old_rooms[key].get("exits")
+            for key, data in stale["rooms"])
+        graph_findings = tuple(check_graph(raw["rooms"])) if exits_changed else previous.graph_findings
+        checked = sum(map(len, stale.values()))
+        return LintReport(raw, stamps, ids, entry_findings, graph_findings, tuple(file_findings), checked)
+    return safe_call(lint)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Validate the tower content files.")
+    parser.add_argument("data_dir", nargs="?", type=Path, default=Path("data"))
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--watch", action="store_true", help="re-validate changed files until interrupted")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between checks with --watch")
+    args = parser.parse_args()
+    
+    report = None
+    while True:
+        started = time.perf_counter()
+        result = lint_content(args.data_dir, report, args.workers)
+        if result.error:
+            print(f"Validation failed: {result.error}")
+            sys.exit(2)
+        if report is None or result.value.checked or result.value.stamps != report.stamps:
+            findings = result.value.findings
+            for finding in findings:
+                print(finding)
+            errors = len(result.value.errors)
+            print(f"{errors} errors, {len(findings) - errors} warnings "
+                  f"({result.value.checked} entries checked in {time.perf_counter() - started:.3f}s)")
+        report = result.value
+        if not args.watch:
+            sys.exit(1 if report.errors else 0)
+        try:
+            time.sleep(args.interval)
+        except KeyboardInterrupt:
+            return
+
+if __name__ == '__main__':
+    main()
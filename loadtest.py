@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from game_data import Direction, load_game_data
+
+# Markov model of what a player does next, by the kind of command just sent
+COMMAND_MODEL: Dict[str, Tuple[Tuple[str, int], ...]] = {
+    "start": (("look", 5), ("move", 4), ("take", 1)),
+    "move": (("move", 4), ("look", 3), ("take", 2), ("cast", 2), ("status", 1)),
+    "look": (("move", 5), ("take", 3), ("cast", 1), ("inventory", 1)),
+    "take": (("move", 4), ("look", 2), ("inventory", 2), ("use", 1)),
+    "cast": (("cast", 4), ("move", 3), ("status", 2)),
+    "use": (("move", 3), ("look", 2), ("status", 1)),
+    "status": (("move", 4), ("look", 2), ("cast", 1)),
+    "inventory": (("use", 2), ("move", 3), ("look", 1))
+}
+
+class MarkovPlayer:
+    """Generates a realistic, reproducible command mix from COMMAND_MODEL."""
+
+    def __init__(self, rng: random.Random, items: Sequence[str]):
+        self.rng = rng
+        self.items = list(items)
+        self.kind = "start"
+
+    def next_command(self) -> str:
+        choices, weights = zip(*COMMAND_MODEL[self.kind])
+        self.kind = self.rng.choices(choices, weights)[0]
+        if self.kind == "move":
+            return f"go {self.rng.choice(list(Direction)).value}"
+        if self.kind in ("take", "use"):
+            return f"{self.kind} {self.rng.choice(self.items)}"
+        if self.kind == "cast":
+            return "cast fireball guardian"
+        return self.kind
+
+class ScriptPlayer:
+    """Replays recorded commands (one per line), starting at a random offset."""
+
+    def __init__(self, rng: random.Random, commands: Sequence[str]):
+        self.commands = list(commands)
+        self.position = rng.randrange(len(self.commands))
+
+    def next_command(self) -> str:
+        command = self.commands[self.position]
+        self.position = (self.position + 1) % len(self.commands)
+        return command
+
+def percentile(ordered: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not ordered:
+        return 0.0
+    rank = math.ceil(q * len(ordered))
+    return ordered[min(max(rank - 1, 0), len(ordered) - 1)]
+
+@dataclass
+class Window:
+    """Latencies (seconds) and errors recorded during one reporting interval."""
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+
+@dataclass(frozen=True)
+class WindowStats:
+    elapsed: float
+    turns: int
+    throughput: float
+    p50: float
+    p99: float
+    p999: float
+    errors: int
+
+def summarize(window: Window, seconds: float, elapsed: float) -> WindowStats:
+    ordered = sorted(window.latencies)
+    return WindowStats(elapsed, len(ordered), len(ordered) / seconds if seconds else 0.0,
+                       percentile(ordered, 0.5), percentile(ordered, 0.99), percentile(ordered, 0.999),
+                       window.errors)
+
+def format_stats(stats: WindowStats, players: int) -> str:
+    return (f"t={stats.elapsed:6.1f}s players={players:5d} turns/s={stats.throughput:9.1f} "
+            f"p50={stats.p50 * 1000:7.2f}ms p99={stats.p99 * 1000:7.2f}ms "
+            f"p999={stats.p999 * 1000:7.2f}ms errors={stats.errors}")
+
+@dataclass
+class LoadTest:
+    """N simulated players against one JSON-lines game server.
+    
+    Each player keeps one connection, sends a command, waits for the reply
+    and thinks for an exponentially distributed time before the next one.
+    Finished games reconnect as a fresh player.
+    """
+    host: str
+    port: int
+    players: int
+    new_player: Callable[[random.Random], object]
+    think: float = 0.0
+    ramp: float = 0.0
+    seed: int = 0
+    window: Window = field(default_factory=Window)
+    total: Window = field(default_factory=Window)
+    connected: int = 0
+
+    async def _play(self, index: int, deadline: float) -> None:
+        rng = random.Random(self.seed * 1_000_003 + index)
+        await asyncio.sleep(self.ramp * index / max(self.players, 1))
+        while time.perf_counter() < deadline:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError:
+                self.window.errors += 1
+                self.total.errors += 1
+                await asyncio.sleep(0.1)
+                continue
+            self.connected += 1
+            try:
+                await reader.readline()
+                player = self.new_player(rng)
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    writer.write(player.next_command().encode() + b"\n")
+                    line = await reader.readline()
+                    if not line:
+                        raise ConnectionError("Server closed the connection")
+                    latency = time.perf_counter() - started
+                    self.window.latencies.append(latency)
+                    self.total.latencies.append(latency)
+                    reply = json.loads(line)
+                    if "error" in reply:
+                        self.window.errors += 1
+                        self.total.errors += 1
+                    if reply.get("finished"):
+                        break
+                    if self.think:
+                        await asyncio.sleep(rng.expovariate(1 / self.think))
+            except (ConnectionError, ValueError):
+                self.window.errors += 1
+                self.total.errors += 1
+            finally:
+                self.connected -= 1
+                writer.close()
+
+    async def run(self, duration: float, interval: float = 1.0,
+                  on_window: Optional[Callable[[WindowStats, int], None]] = None) -> WindowStats:
+        """Play for `duration` seconds, reporting every `interval`; returns whole-run stats."""
+        started = time.perf_counter()
+        deadline = started + duration
+        tasks = [asyncio.create_task(self._play(i, deadline)) for i in range(self.players)]
+        last = started
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(min(interval, max(deadline - time.perf_counter(), 0)))
+            now = time.perf_counter()
+            window, self.window = self.window, Window()
+            if on_window:
+                on_window(summarize(window, now - last, now - started), self.connected)
+            last = now
+        await asyncio.gather(*tasks)
+        return summarize(self.total, time.perf_counter() - started, time.perf_counter() - started)
+
+def raise_open_file_limit() -> None:
+    """Thousands of sockets need more descriptors than the usual soft limit of 1024."""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulate concurrent players against server.py.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4000)
+    parser.add_argument("--players", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between reports")
+    parser.add_argument("--think", type=float, default=0.0, help="mean think time between commands, in seconds")
+    parser.add_argument("--ramp", type=float, default=5.0, help="seconds over which players connect")
+    parser.add_argument("--script", type=Path, default=None, help="recorded commands to replay instead of the Markov model")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    if args.script:
+        commands = [line.strip() for line in args.script.read_text().splitlines() if line.strip()]
+        new_player = lambda rng: ScriptPlayer(rng, commands)
+    else:
+        result = load_game_data()
+        if result.error:
+            parser.error(f"Error loading game data: {result.error}")
+        items = list(result.value[1])
+        new_player = lambda rng: MarkovPlayer(rng, items)
+    
+    raise_open_file_limit()
+    test = LoadTest(args.host, args.port, args.players, new_player, args.think, args.ramp, args.seed)
+    total = asyncio.run(test.run(args.duration, args.interval,
+                                 lambda stats, connected: print(format_stats(stats, connected))))
+    print("total  " + format_stats(total, args.players))
+
+if __name__ == '__main__':
+    main()
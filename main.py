@@ -1,19 +1,47 @@
 import os
 import sys
-from typing import Optional, Callable, List, Tuple
+from typing import Optional, List, Tuple
 from functools import partial
 from dataclasses import dataclass
-from game_data import GameState, load_game_data, save_game_state, load_game_state, Result
-from game_engine import process_command, update_guardians
+from game_data import GameState, load_game_data, Result
+from game_engine import GuardianUpdate, format_room_display, split_commands, run_batch, update_guardians
+from autosave import AutosaveService
+from history import StateHistory
+from save_store import SaveBackend, open_save_backend
+from events import EventLog
+from tracing import TRACER
+from zones import GuardianScheduler
+from terminal import TerminalRenderer, BOLD, CYAN, YELLOW
+
+# Saves go to loose JSON files unless a SQLite database is configured;
+# opened on first use so importing this module never touches the database
+SAVE_BACKEND: Optional[SaveBackend] = None
+
+AUTOSAVE_FILENAME = "autosave.json"
+HISTORY_DEPTH = 50
+
+# Per-turn analytics events are appended here when set
+EVENT_LOG = os.environ.get("WIZARD_EVENT_LOG")
+# Turn spans are exported here as Chrome trace-event JSON when set
+TRACE_FILE = os.environ.get("WIZARD_TRACE")
+
+# All terminal output is buffered and written once per turn
+RENDERER = TerminalRenderer()
 
 # Pure functions for terminal operations
 def clear_screen() -> None:
     """Clear the terminal screen."""
-    os.system('cls' if os.name == 'nt' else 'clear')
+    RENDERER.clear()
 
 def print_message(message: str) -> None:
-    """Print a message to the terminal."""
-    print(message)
+    """Queue a message for the terminal; it is written at the next prompt."""
+    RENDERER.write(message)
+
+def prompt(text: str) -> str:
+    """Write all queued output, then ask the player for input."""
+    with TRACER.span("flush"):
+        RENDERER.flush()
+    return RENDERER.prompt(text)
 
 # Pure functions for game messages
 def get_welcome_message() -> str:
@@ -52,6 +80,8 @@ def get_help_message() -> str:
     Game:
         save
         load
+        undo
+        redo
         quit
     
     Examples:
@@ -61,65 +91,37 @@ def get_help_message() -> str:
         cast fireball guardian
         look
         examine tome_basic
-    """
-
-def get_victory_message() -> str:
-    """Get the victory message."""
-    return """
-    🎉 Congratulations! 🎉
-    
-    You have defeated the Archmage and become the new master of the tower!
-    Your journey to master the arcane arts is complete.
     
-    Thank you for playing the Wizard's Tower Trial!
+    Chain several commands with ';':
+        go north; cast fireball guardian; go up
     """
 
-def get_game_over_message() -> str:
-    """Get the game over message."""
-    return "\nYou have been defeated! Game over."
-
 # Pure functions for game state display
-def format_room_display(state: GameState) -> str:
-    """Format the current room display."""
-    current_room = state.get_current_room()
-    messages = [
-        f"\n{current_room.name}",
-        "=" * len(current_room.name),
-        current_room.description
-    ]
-    
-    if current_room.items:
-        messages.extend([
-            "\nItems here:",
-            *[f"- {state.items[item_id].name}" for item_id in current_room.items]
-        ])
-    
-    messages.extend([
-        "\nExits:",
-        *[f"- {direction.value}: {state.rooms[room_id].name}"
-          for direction, room_id in current_room.exits.items()]
-    ])
-    
-    if current_room.guardian:
-        messages.extend([
-            f"\nA {current_room.guardian.name} blocks your path!",
-            f"Health: {current_room.guardian.health}"
-        ])
-    
-    return "\n".join(messages)
+def render_room_display(state: GameState) -> str:
+    """Room display for the terminal, with the room name highlighted."""
+    name = state.get_current_room().name
+    return format_room_display(state).replace(name, RENDERER.style(name, BOLD, CYAN), 1)
 
 # Pure functions for game state management
 def get_save_filename() -> str:
     """Get the save filename from user input."""
-    filename = input("Enter save filename (default: save.json): ").strip()
+    filename = prompt("Enter save filename (default: save.json): ").strip()
     if not filename:
         return "save.json"
     return filename if filename.endswith('.json') else f"{filename}.json"
 
+def get_save_backend() -> SaveBackend:
+    """The configured save backend, opened on first use."""
+    global SAVE_BACKEND
+    if SAVE_BACKEND is None:
+        SAVE_BACKEND = open_save_backend(os.environ.get("WIZARD_SAVE_DB"))
+    return SAVE_BACKEND
+
 def handle_save(state: GameState) -> Result[None]:
     """Handle saving the game."""
     filename = get_save_filename()
-    result = save_game_state(state, filename)
+    with TRACER.span("save", filename=filename):
+        result = get_save_backend().save_game_state(state, filename)
     if result.error:
         print_message(f"Error saving game: {result.error}")
     else:
@@ -129,7 +131,7 @@ def handle_save(state: GameState) -> Result[None]:
 def handle_load() -> Result[GameState]:
     """Handle loading the game."""
     filename = get_save_filename()
-    result = load_game_state(filename)
+    result = get_save_backend().load_game_state(filename)
     if result.error:
         print_message(f"Error loading game: {result.error}")
     elif result.value:
@@ -138,20 +140,14 @@ def handle_load() -> Result[GameState]:
         print_message("No save file found.")
     return result
 
-# Pure functions for game flow control
-def is_game_over(state: GameState) -> bool:
-    """Check if the game is over."""
-    return state.player.health <= 0
-
-def is_victory(state: GameState) -> bool:
-    """Check if the player has won."""
-    return (state.player.current_room == "tower_crown" and
-            state.has_game_flag("archmage_defeated"))
+# Commands handled by the CLI itself rather than the engine
+SPECIAL_COMMANDS = ('quit', 'exit', 'help', 'save', 'load')
+HISTORY_COMMANDS = ('undo', 'redo')
 
 def handle_special_command(command: str, state: GameState) -> Optional[Tuple[GameState, bool]]:
     """Handle special game commands."""
     if command.lower() in ('quit', 'exit'):
-        if input("Save game before quitting? (y/n) ").lower() == 'y':
+        if prompt("Save game before quitting? (y/n) ").lower() == 'y':
             handle_save(state)
         return state, True
     
@@ -170,49 +166,94 @@ def handle_special_command(command: str, state: GameState) -> Optional[Tuple[Gam
     
     return None
 
-def process_game_turn(state: GameState, command: str) -> Tuple[GameState, bool]:
-    """Process a single game turn."""
-    # Handle special commands
-    special_result = handle_special_command(command, state)
-    if special_result:
-        return special_result
-    
-    # Process regular command
-    new_state, response = process_command(state, command)
-    print_message(f"\n{response}")
-    
-    # Update guardians
-    new_state = update_guardians(new_state)
+def handle_history_command(command: str, state: GameState, history: StateHistory) -> GameState:
+    """Step backwards or forwards through the history, one input line at a time."""
+    if command == 'undo':
+        previous = history.undo(state)
+        print_message("\nYou rewind time to before your last command line." if previous else "\nNothing to undo.")
+        return previous or state
     
-    # Check game state
-    if is_game_over(new_state):
-        print_message(get_game_over_message())
-        return new_state, True
+    following = history.redo(state)
+    print_message("\nTime flows forward again." if following else "\nNothing to redo.")
+    return following or state
+
+def process_game_turn(state: GameState, command: str, history: Optional[StateHistory] = None,
+                      events: Optional[EventLog] = None,
+                      guardians: GuardianUpdate = update_guardians) -> Tuple[GameState, bool]:
+    """Process one input line; several commands may be chained with ';'.
     
-    if is_victory(new_state):
-        print_message(get_victory_message())
-        return new_state, True
+    Consecutive regular commands run as one batch and their responses are
+    printed as a single combined message. Special commands run in order
+    between batches. With `events`, every regular turn is logged.
+    """
+    special_commands = SPECIAL_COMMANDS + (HISTORY_COMMANDS if history is not None else ())
+    finished = False
+    batch: List[str] = []
+    with TRACER.span("line", line=command):
+        for part in split_commands(command) + [None]:
+            if part is not None and part.lower() not in special_commands:
+                batch.append(part)
+                continue
+            
+            # Run the pending batch of regular commands
+            if batch:
+                new_state, messages, finished = run_batch(state, batch, events.record if events else None, guardians)
+                with TRACER.span("render"):
+                    print_message("".join(messages))
+                if history is not None and new_state is not state:
+                    history.record(state)
+                state, batch = new_state, []
+            if finished or part is None:
+                break
+            
+            # Handle undo/redo
+            if part.lower() in HISTORY_COMMANDS:
+                with TRACER.span(part.lower()):
+                    state = handle_history_command(part.lower(), state, history)
+                continue
+            
+            # Handle special commands
+            with TRACER.span(part.lower()):
+                special_result = handle_special_command(part, state)
+            if special_result:
+                state, finished = special_result
+                if finished:
+                    break
     
-    return new_state, False
+    return state, finished
 
-def game_loop(initial_state: GameState) -> None:
-    """Main game loop using functional style."""
-    def loop(state: GameState) -> None:
+def report_autosave_errors(autosave: Optional[AutosaveService]) -> None:
+    """Print autosave failures reported by the writer thread since the last turn."""
+    if autosave:
+        for error in autosave.drain_errors():
+            print_message(RENDERER.style(f"Autosave failed: {error}", YELLOW))
+
+def game_loop(initial_state: GameState, autosave: Optional[AutosaveService] = None,
+              history: Optional[StateHistory] = None, events: Optional[EventLog] = None) -> None:
+    """Main game loop; only the bounded history keeps earlier states alive."""
+    history = history if history is not None else StateHistory(HISTORY_DEPTH)
+    # Guardians are only simulated on floors near the player
+    guardians = GuardianScheduler.for_rooms(initial_state.rooms)
+    state = initial_state
+    while True:
+        report_autosave_errors(autosave)
+        
         # Display current room
-        print_message(format_room_display(state))
+        print_message(render_room_display(state))
         
         try:
-            command = input("\nWhat will you do? ").strip()
+            command = prompt("\nWhat will you do? ").strip()
         except (KeyboardInterrupt, EOFError):
             print_message("\nGame interrupted. Saving...")
             handle_save(state)
             return
         
-        new_state, should_exit = process_game_turn(state, command)
-        if not should_exit:
-            loop(new_state)
-    
-    loop(initial_state)
+        new_state, should_exit = process_game_turn(state, command, history, events, guardians.update)
+        if autosave and new_state is not state:
+            autosave.submit(new_state)
+        if should_exit:
+            return
+        state = new_state
 
 def initialize_game() -> Result[GameState]:
     """Initialize or load the game state."""
@@ -225,7 +266,7 @@ def initialize_game() -> Result[GameState]:
     
     # Get initial state
     while True:
-        choice = input("Start new game (n) or load saved game (l)? ").lower()
+        choice = prompt("Start new game (n) or load saved game (l)? ").lower()
         if choice == 'l':
             result = handle_load()
             if result.value:
@@ -244,10 +285,24 @@ def main() -> None:
     result = initialize_game()
     if result.error:
         print_message(result.error)
+        RENDERER.flush()
         sys.exit(1)
     
-    # Start game loop
-    game_loop(result.value)
+    # Start game loop with autosave running in the background
+    autosave = AutosaveService(AUTOSAVE_FILENAME, backend=get_save_backend()).start()
+    events = EventLog(EVENT_LOG) if EVENT_LOG else None
+    if TRACE_FILE:
+        TRACER.enable()
+    try:
+        game_loop(result.value, autosave, events=events)
+    finally:
+        autosave.close()
+        if events:
+            events.close()
+        if TRACE_FILE:
+            TRACER.export(TRACE_FILE)
+        report_autosave_errors(autosave)
+        RENDERER.flush()
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file
@@ -0,0 +1,198 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+import zlib
+from dataclasses import asdict, dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+from game_data import write_atomically
+from save_schema import SAVE_VERSION, migrate_save, save_version
+
+MIGRATED, CURRENT, FAILED = "migrated", "current", "failed"
+
+# Keys every save format has had; other JSON documents are never rewritten
+SAVE_KEYS = ("player", "visited_rooms", "game_flags")
+
+def is_save(data: object) -> bool:
+    return (isinstance(data, dict) and all(key in data for key in SAVE_KEYS)
+            and isinstance(data["player"], dict) and "current_room" in data["player"])
+
+def migrate_text(text: str, indent: Optional[int] = None) -> Tuple[str, Optional[str]]:
+    """Migrate one serialized save: (status, new text or error message)."""
+    try:
+        data = json.loads(text)
+        if not is_save(data):
+            return FAILED, "not a saved game"
+        if save_version(data) == SAVE_VERSION:
+            return CURRENT, None
+        return MIGRATED, json.dumps(migrate_save(data), indent=indent)
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        return FAILED, f"{type(e).__name__}: {e}"
+
+def migrate_file(path: str) -> Tuple[str, str, Optional[str]]:
+    """Migrate a save file in place (atomically); returns (path, status, error)."""
+    try:
+        # Keep the layout save_game_state writes
+        status, result = migrate_text(Path(path).read_text(), indent=2)
+        if status == MIGRATED:
+            write_atomically(Path(path), result)
+            return path, status, None
+        return path, status, result
+    except OSError as e:
+        return path, FAILED, str(e)
+
+def migrate_row(row: Tuple[str, str, str]) -> Tuple[str, str, str, Optional[str]]:
+    user, slot, text = row
+    status, result = migrate_text(text)
+    return user, slot, status, result
+
+@dataclass
+class Checkpoint:
+    """Progress of one migration run; saved after every batch so a rerun resumes.
+    
+    A checkpoint only resumes a run from the same source towards the same
+    save format, and is deleted once the run completes.
+    """
+    source: str
+    target: int = SAVE_VERSION
+    shards: Optional[int] = None  # name-hash shards of a directory run
+    cursor: Optional[list] = None  # [shard, last file name], or [user, slot], fully handled
+    counts: dict = field(default_factory=lambda: {MIGRATED: 0, CURRENT: 0, FAILED: 0})
+    failures: List[str] = field(default_factory=list)  # the first few, for the report
+
+    @classmethod
+    def load(cls, path: Optional[Path], source: str, shards: Optional[int] = None) -> "Checkpoint":
+        if path and path.exists():
+            data = json.loads(path.read_text())
+            if (data["source"] == source and data.get("target") == SAVE_VERSION
+                    and data.get("shards") == shards):
+                return cls(**data)
+        return cls(source, shards=shards)
+
+    def save(self, path: Optional[Path]) -> None:
+        if path:
+            write_atomically(path, json.dumps(asdict(self)))
+
+    def finish(self, path: Optional[Path]) -> None:
+        if path:
+            path.unlink(missing_ok=True)
+
+    def record(self, status: str, name: str, error: Optional[str]) -> None:
+        self.counts[status] += 1
+        if status == FAILED and len(self.failures) < 100:
+            self.failures.append(f"{name}: {error}")
+
+def batches(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def name_shard(name: str, shards: int) -> int:
+    """A file name's shard; stable across processes and runs, unlike hash()."""
+    return zlib.crc32(name.encode()) % shards
+
+def save_files(directory: Path, shard: int, shards: int, after: Optional[str],
+               exclude: Optional[Path] = None) -> Iterator[str]:
+    """One shard's save files in name order, starting after the checkpoint's cursor.
+    
+    The directory is streamed; only the shard's names are kept and sorted.
+    """
+    skip = exclude.resolve() if exclude else None
+    with os.scandir(directory) as entries:
+        names = sorted(entry.name for entry in entries
+                       if entry.name.endswith(".json") and not entry.name.startswith(".")
+                       and name_shard(entry.name, shards) == shard and (after is None or entry.name > after)
+                       and entry.is_file() and (directory / entry.name).resolve() != skip)
+    return (str(directory / name) for name in names)
+
+def pool_context():
+    return multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+
+def migrate_directory(directory: Path, checkpoint_path: Optional[Path] = None, workers: Optional[int] = None,
+                      batch_size: int = 1000, shards: int = 64) -> Checkpoint:
+    """Migrate every *.json save in a directory, shard by shard and batch by batch across a process pool.
+    
+    Files are split into `shards` by a hash of their name and each shard
+    is listed on its own, so no listing of the whole directory is ever
+    held or sorted, and only one batch of saves is in flight at a time.
+    """
+    checkpoint = Checkpoint.load(checkpoint_path, str(directory.resolve()), shards)
+    start, after = checkpoint.cursor if checkpoint.cursor else (0, None)
+    with pool_context().Pool(workers or os.cpu_count() or 1) as pool:
+        for shard in range(start, shards):
+            for batch in batches(save_files(directory, shard, shards, after, checkpoint_path), batch_size):
+                for path, status, error in pool.imap(migrate_file, batch, chunksize=max(len(batch) // 32, 1)):
+                    checkpoint.record(status, Path(path).name, error)
+                checkpoint.cursor = [shard, Path(batch[-1]).name]
+                checkpoint.save(checkpoint_path)
+            after = None
+    checkpoint.finish(checkpoint_path)
+    return checkpoint
+
+def migrate_store(database: str, checkpoint_path: Optional[Path] = None, workers: Optional[int] = None,
+                  batch_size: int = 1000) -> Checkpoint:
+    """Migrate saves in a SqliteSaveStore database, paging by (user, slot).
+    
+    Each batch is migrated across the pool and written back in one
+    transaction before the checkpoint moves past it.
+    """
+    checkpoint = Checkpoint.load(checkpoint_path, str(Path(database).resolve()))
+    conn = sqlite3.connect(database, timeout=30)
+    try:
+        with pool_context().Pool(workers or os.cpu_count() or 1) as pool:
+            while True:
+                cursor = checkpoint.cursor or ["", ""]
+                rows = conn.execute(
+                    "SELECT user, slot, data FROM saves WHERE (user, slot) > (?, ?) ORDER BY user, slot LIMIT ?",
+                    (cursor[0], cursor[1], batch_size)).fetchall()
+                if not rows:
+                    break
+                updates = []
+                for user, slot, status, result in pool.imap(migrate_row, rows, chunksize=max(len(rows) // 32, 1)):
+                    checkpoint.record(status, f"{user}/{slot}", result if status == FAILED else None)
+                    if status == MIGRATED:
+                        updates.append((result, user, slot))
+                with conn:
+                    conn.executemany("UPDATE saves SET data = ? WHERE user = ? AND slot = ?", updates)
+                checkpoint.cursor = list(rows[-1][:2])
+                checkpoint.save(checkpoint_path)
+    finally:
+        conn.close()
+    checkpoint.finish(checkpoint_path)
+    return checkpoint
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=f"Upgrade saved games to save format {SAVE_VERSION}.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dir", type=Path, help="directory of JSON save files")
+    source.add_argument("--db", help="SQLite save store database")
+    parser.add_argument("--checkpoint", type=Path, default=Path("migration.checkpoint.json"),
+                        help="progress file; an interrupted run resumes from it, a completed run deletes it")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--shards", type=int, default=64,
+                        help="name-hash shards a directory is listed in; more shards hold fewer names at once")
+    args = parser.parse_args()
+    
+    started = time.perf_counter()
+    if args.dir:
+        checkpoint = migrate_directory(args.dir, args.checkpoint, args.workers, args.batch_size, args.shards)
+    else:
+        checkpoint = migrate_store(args.db, args.checkpoint, args.workers, args.batch_size)
+    for failure in checkpoint.failures:
+        print(f"failed {failure}")
+    counts = checkpoint.counts
+    print(f"{counts[MIGRATED]} migrated, {counts[CURRENT]} already current, {counts[FAILED]} failed "
+          f"in {time.perf_counter() - started:.1f}s")
+    sys.exit(1 if counts[FAILED] else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+from dataclasses import replace
+from typing import Dict, List, Optional, Tuple
+from game_data import GameState, Player, Room, Item, Spell
+from game_engine import (
+    process_command, split_commands, format_room_display, is_game_over, is_victory,
+    get_game_over_message, get_victory_message
+)
+from zones import GuardianScheduler
+
+class SharedTower:
+    """One tower instance shared by many players.
+
+    The world - rooms, guardians and world flags - lives in a single
+    GameState; each player keeps a GameState view that shares the world's
+    rooms dict and differs only in `player` and `visited_rooms`. Commands run
+    through the ordinary engine handlers against a player's view, and any
+    world changes they make are published back to the shared world.
+    Guardians are only simulated in zones within `interest_radius` floors
+    of a player.
+    """
+
+    def __init__(self, rooms: Dict[str, Room], items: Dict[str, Item], spells: Dict[str, Spell],
+                 interest_radius: int = 1):
+        self.world = GameState.new_game(rooms, items, spells)
+        self.scheduler = GuardianScheduler.for_rooms(rooms, interest_radius)
+        self._views: Dict[str, GameState] = {}
+
+    def join(self, player_id: str, start_room: str = "entrance") -> GameState:
+        """Add a player at `start_room`; rejoining keeps the existing player."""
+        if player_id not in self._views:
+            self._views[player_id] = replace(
+                self.world,
+                player=Player(current_room=start_room),
+                visited_rooms={start_room}
+            )
+        return self.view(player_id)
+
+    def leave(self, player_id: str) -> Optional[Player]:
+        view = self._views.pop(player_id, None)
+        return view.player if view else None
+
+    def player_ids(self) -> List[str]:
+        return list(self._views)
+
+    def view(self, player_id: str) -> GameState:
+        """The player's state, synchronised with the current world."""
+        view = self._views[player_id]
+        if view.rooms is not self.world.rooms or view.game_flags is not self.world.game_flags:
+            view = replace(view, rooms=self.world.rooms, game_flags=self.world.game_flags)
+            self._views[player_id] = view
+        return view
+
+    def command(self, player_id: str, command: str) -> str:
+        """Run one player's command and publish any world changes."""
+        view = self.view(player_id)
+        new_view, response = process_command(view, command)
+        if new_view.rooms is not view.rooms or new_view.game_flags is not view.game_flags:
+            self.world = replace(self.world, rooms=new_view.rooms, game_flags=new_view.game_flags)
+        self._views[player_id] = new_view
+        return response
+
+    def tick(self) -> None:
+        """Advance guardians once: each pursuer chases its nearest player."""
+        targets = {view.player.current_room for view in self._views.values()}
+        if targets:
+            self.world = self.scheduler.tick(self.world, targets)
+
+class SharedTowers:
+    """Named shared towers over one loaded content, for the session server.
+
+    A tower is created by its first player and dropped with its last. Each
+    command a player sends is one turn: it runs against their view and then
+    advances the tower's guardians once.
+    """
+
+    def __init__(self, rooms: Dict[str, Room], items: Dict[str, Item], spells: Dict[str, Spell]):
+        self.content = (rooms, items, spells)
+        self.towers: Dict[str, SharedTower] = {}
+        self._tower_of: Dict[str, str] = {}
+
+    def __contains__(self, player_id: str) -> bool:
+        return player_id in self._tower_of
+
+    def join(self, name: str, player_id: str) -> str:
+        """Put a player into the named tower and return their room display."""
+        if not name:
+            raise ValueError("Name the shared tower to join")
+        self.leave(player_id)
+        tower = self.towers.get(name)
+        if tower is None:
+            tower = self.towers[name] = SharedTower(*self.content)
+        self._tower_of[player_id] = name
+        return format_room_display(tower.join(player_id))
+
+    def command(self, player_id: str, line: str) -> Tuple[str, bool]:
+        """Run one input line for a player; a finished player leaves the tower."""
+        tower = self.towers[self._tower_of[player_id]]
+        messages: List[str] = []
+        for command in split_commands(line):
+            messages.append(f"\n{tower.command(player_id, command)}")
+            tower.tick()
+            view = tower.view(player_id)
+            if is_game_over(view) or is_victory(view):
+                messages.append(get_game_over_message() if is_game_over(view) else get_victory_message())
+                self.leave(player_id)
+                return "".join(messages), True
+        return "".join(messages), False
+
+    def leave(self, player_id: str) -> None:
+        name = self._tower_of.pop(player_id, None)
+        if name is None:
+            return
+        tower = self.towers[name]
+        tower.leave(player_id)
+        if not tower.player_ids():
+            del self.towers[name]
@@ -0,0 +1,99 @@
+import re
+from typing import Collection, Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, Tuple
+
+STOPWORDS = frozenset({"the", "a", "an", "of", "my", "some"})
+# Scoring every id in scope beats walking postings until the scope gets this big
+SCOPE_SCAN_LIMIT = 64
+TOKEN_SIMILARITY = 0.35
+
+def normalize(text: str) -> str:
+    """Lowercase, treat '_' and '-' as spaces and collapse whitespace."""
+    return " ".join(re.sub(r"[_\-]+", " ", text.lower()).split())
+
+def tokenize(text: str) -> Tuple[str, ...]:
+    return tuple(t for t in normalize(text).split() if t not in STOPWORDS)
+
+def trigrams(token: str) -> FrozenSet[str]:
+    padded = f" {token} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+def similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+def token_score(query: str, query_grams: FrozenSet[str], token: str, token_grams: FrozenSet[str]) -> float:
+    """1 for the same word, 0.9 for a prefix of at least 3 letters, else trigram similarity."""
+    if token == query:
+        return 1.0
+    if len(query) >= 3 and token.startswith(query):
+        return 0.9
+    return similarity(query_grams, token_grams)
+
+class NameIndex:
+    """Load-time inverted index from name tokens to ids, and trigrams to tokens.
+    
+    A reference resolves to an id when every word in it matches a word of
+    the id or display name exactly, as a prefix, or with a typo (trigram
+    similarity). Lookups are scoped to the ids the player can actually
+    refer to: small scopes are scored directly, large ones by intersecting
+    the postings of the words that match.
+    """
+
+    def __init__(self, names: Mapping[str, str]):
+        self.exact: Dict[str, List[str]] = {}
+        self.tokens: Dict[str, Tuple[str, ...]] = {}
+        self.token_grams: Dict[str, FrozenSet[str]] = {}
+        self.by_token: Dict[str, Set[str]] = {}
+        self.tokens_by_gram: Dict[str, Set[str]] = {}
+        for entity_id, name in names.items():
+            for key in {normalize(entity_id), normalize(name)}:
+                self.exact.setdefault(key, []).append(entity_id)
+            tokens = tuple(dict.fromkeys(tokenize(name) + tokenize(entity_id)))
+            self.tokens[entity_id] = tokens
+            for token in tokens:
+                self.by_token.setdefault(token, set()).add(entity_id)
+                if token not in self.token_grams:
+                    self.token_grams[token] = trigrams(token)
+                    for gram in self.token_grams[token]:
+                        self.tokens_by_gram.setdefault(gram, set()).add(token)
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def _entity_score(self, query: str, query_grams: FrozenSet[str], entity_id: str) -> float:
+        return max(token_score(query, query_grams, token, self.token_grams[token])
+                   for token in self.tokens[entity_id])
+
+    def _matching_ids(self, query: str, query_grams: FrozenSet[str]) -> Set[str]:
+        words = {token for gram in query_grams for token in self.tokens_by_gram.get(gram, ())}
+        return set().union(*(self.by_token[token] for token in words
+                             if token_score(query, query_grams, token, self.token_grams[token]) >= TOKEN_SIMILARITY))
+
+    def candidates(self, query_tokens: Tuple[str, ...], query_grams: List[FrozenSet[str]],
+                   scope: Collection[str]) -> Iterable[str]:
+        if len(scope) <= SCOPE_SCAN_LIMIT:
+            return [entity_id for entity_id in scope if entity_id in self.tokens]
+        matches = sorted((self._matching_ids(token, grams) for token, grams in zip(query_tokens, query_grams)), key=len)
+        return [entity_id for entity_id in matches[0].intersection(*matches[1:]) if entity_id in scope]
+
+    def resolve(self, phrase: str, scope: Collection[str]) -> Optional[str]:
+        """The single id in `scope` that `phrase` refers to, or None if none or several match."""
+        key = normalize(phrase)
+        exact = [entity_id for entity_id in self.exact.get(key, ()) if entity_id in scope]
+        if len(exact) == 1:
+            return exact[0]
+        query_tokens = tokenize(phrase)
+        if not query_tokens:
+            return None
+        
+        query_grams = [trigrams(token) for token in query_tokens]
+        scored = []
+        for entity_id in self.candidates(query_tokens, query_grams, scope):
+            scores = [self._entity_score(token, grams, entity_id) for token, grams in zip(query_tokens, query_grams)]
+            if min(scores) >= TOKEN_SIMILARITY:
+                scored.append((sum(scores), entity_id))
+        if not scored:
+            return None
+        scored.sort(reverse=True)
+        if len(scored) > 1 and scored[0][0] == scored[1][0]:
+            return None
+        return scored[0][1]
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import re
+import threading
+from itertools import count
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from game_data import Result
+from content import CONTENT_FILES, ContentVersion, load_content
+
+PACKS_DIR = Path("packs")
+# The shipped tower in data/ is always available under this name
+DEFAULT_PACK = "tower"
+PACK_NAME = re.compile(r"[A-Za-z0-9_-]+")
+
+def entry_digest(kind: str, raw: dict) -> bytes:
+    """Content hash of one raw rooms/items/spells entry."""
+    text = json.dumps(raw, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(f"{kind}\0{text}".encode(), digest_size=16).digest()
+
+@dataclass
+class LoadedPack:
+    """One loaded version of a pack and the shared objects it holds references to."""
+    name: str
+    version: ContentVersion
+    entries: Dict[str, List[bytes]]
+    tables: Dict[str, bytes]
+    refs: int = 0
+
+class PackRegistry:
+    """Named content packs loaded on first use and unloaded with their last session.
+
+    Packs live in `packs/<name>/` with the same three JSON files as `data/`,
+    which is served as the pack named "tower". A session pins the version it
+    acquired; `refresh` publishes a newer version to later sessions only.
+
+    Entries with identical JSON in different packs (or versions) are parsed
+    into one shared object, and a whole rooms/items/spells dict identical to
+    one already loaded is shared too, so a seasonal tower that reskins a few
+    rooms costs only those rooms. Shared objects are reference counted per
+    loaded version and dropped when no loaded version uses them.
+    """
+
+    def __init__(self, root: Path = PACKS_DIR, default_dir: Path = Path("data")):
+        self.root = Path(root)
+        self.default_dir = Path(default_dir)
+        self._lock = threading.Lock()
+        self._current: Dict[str, LoadedPack] = {}
+        self._loaded: Dict[Tuple[str, int], LoadedPack] = {}
+        # Registry-wide numbering, so a pack reloaded after unloading never reuses a pinned number
+        self._numbers = count()
+        # digest -> [raw entry, parsed object, loaded versions using it]
+        self._shared: Dict[bytes, List[Any]] = {}
+        # digest of a dict's entry digests -> [dict, loaded versions using it]
+        self._tables: Dict[bytes, List[Any]] = {}
+
+    def pack_dir(self, name: str) -> Path:
+        if name == DEFAULT_PACK:
+            return self.default_dir
+        if not PACK_NAME.fullmatch(name):
+            raise ValueError(f"Invalid pack name: {name!r}")
+        return self.root / name
+
+    def available(self) -> List[str]:
+        """Names of all packs on disk, loaded or not."""
+        found = [path.name for path in self.root.iterdir()
+                 if path.is_dir() and PACK_NAME.fullmatch(path.name)] if self.root.is_dir() else []
+        return sorted({DEFAULT_PACK, *found})
+
+    def loaded(self) -> Dict[Tuple[str, int], int]:
+        """Session count of every loaded (pack, version number)."""
+        with self._lock:
+            return {key: pack.refs for key, pack in self._loaded.items()}
+
+    def acquire(self, name: str) -> Result[ContentVersion]:
+        """Pin the newest loaded version of a pack, loading it first if needed."""
+        with self._lock:
+            pack = self._current.get(name)
+            if pack is None:
+                result = self._load(name, None)
+                if result.error:
+                    return Result.failure(result.error)
+                pack = result.value
+            pack.refs += 1
+            return Result.success(pack.version)
+
+    def release(self, name: str, version: ContentVersion) -> None:
+        """Drop one session's pin; a version nobody uses is unloaded."""
+        with self._lock:
+            pack = self._loaded[(name, version.number)]
+            pack.refs -= 1
+            if pack.refs == 0:
+                self._unload(pack)
+
+    def refresh(self, name: str) -> Result[bool]:
+        """Reload a loaded pack's edited files; True when a new version was published."""
+        with self._lock:
+            pack = self._current.get(name)
+            if pack is None:
+                return Result.success(False)
+            result = self._load(name, pack)
+            if result.error:
+                return Result.failure(result.error)
+            published = result.value is not pack
+            if published and pack.refs == 0:
+                self._unload(pack)
+            return Result.success(published)
+
+    def _load(self, name: str, previous: Optional[LoadedPack]) -> Result[LoadedPack]:
+        try:
+            data_dir = self.pack_dir(name)
+        except ValueError as e:
+            return Result.failure(str(e))
+        if not data_dir.is_dir():
+            return Result.failure(f"Unknown tower pack: {name}")
+        result = load_content(data_dir, previous.version if previous else None)
+        if result.error:
+            return Result.failure(f"Error loading pack {name}: {result.error}")
+        version = result.value
+        if previous and version.number == previous.version.number:
+            previous.version = version
+            return Result.success(previous)
+
+        parsed: Dict[str, Dict[str, Any]] = {}
+        raw: Dict[str, Dict[str, dict]] = {}
+        entries: Dict[str, List[bytes]] = {}
+        tables: Dict[str, bytes] = {}
+        for kind in CONTENT_FILES:
+            parsed[kind], raw[kind], entries[kind] = {}, {}, []
+            for key, data in version.raw[kind].items():
+                digest = entry_digest(kind, data)
+                shared = self._shared.setdefault(digest, [data, getattr(version, kind)[key], 0])
+                shared[2] += 1
+                raw[kind][key], parsed[kind][key] = shared[0], shared[1]
+                entries[kind].append(digest)
+            table_digest = hashlib.blake2b(
+                b"".join(key.encode() + b"\0" + digest for key, digest in zip(raw[kind], entries[kind])),
+                digest_size=16).digest()
+            table = self._tables.setdefault(table_digest, [parsed[kind], 0])
+            table[1] += 1
+            parsed[kind] = table[0]
+            tables[kind] = table_digest
+
+        pack = LoadedPack(name, replace(version, number=next(self._numbers), raw=raw, **parsed), entries, tables)
+        self._loaded[(name, pack.version.number)] = pack
+        self._current[name] = pack
+        return Result.success(pack)
+
+    def _unload(self, pack: LoadedPack) -> None:
+        del self._loaded[(pack.name, pack.version.number)]
+        if self._current.get(pack.name) is pack:
+            del self._current[pack.name]
+        for digests in pack.entries.values():
+            for digest in digests:
+                shared = self._shared[digest]
+                shared[2] -= 1
+                if shared[2] == 0:
+                    del self._shared[digest]
+        for table_digest in pack.tables.values():
+            table = self._tables[table_digest]
+            table[1] -= 1
+            if table[1] == 0:
+                del self._tables[table_digest]
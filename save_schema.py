@@ -0,0 +1,31 @@
+from typing import Callable, Dict
+
+# The save format written by GameState.to_dict
+SAVE_VERSION = 2
+
+def stamp_version(data: dict) -> dict:
+    """Version 1 saves predate the version field; their layout is otherwise the same."""
+    return {**data, "version": 2}
+
+# Saves at version N are upgraded to N + 1 by MIGRATIONS[N]; add a step for every format change
+MIGRATIONS: Dict[int, Callable[[dict], dict]] = {
+    1: stamp_version
+}
+
+def save_version(data: dict) -> int:
+    return data.get("version", 1)
+
+def migrate_save(data: dict) -> dict:
+    """Upgrade saved data to SAVE_VERSION one registered step at a time."""
+    version = save_version(data)
+    if version > SAVE_VERSION:
+        raise ValueError(f"Save format {version} is newer than this game supports ({SAVE_VERSION})")
+    while version < SAVE_VERSION:
+        step = MIGRATIONS.get(version)
+        if step is None:
+            raise ValueError(f"No migration from save format {version}")
+        data = step(data)
+        if save_version(data) != version + 1:
+            raise ValueError(f"Migration from save format {version} did not produce format {version + 1}")
+        version += 1
+    return data
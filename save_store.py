@@ -0,0 +1,176 @@
+import json
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Protocol, Tuple
+from game_data import (
+    GameState, Room, Item, Spell, Result, safe_call,
+    load_game_data, save_game_state, load_game_state
+)
+
+Content = Tuple[Dict[str, Room], Dict[str, Item], Dict[str, Spell]]
+
+class SaveBackend(Protocol):
+    """Where saved games live; mirrors the save_game_state/load_game_state API."""
+
+    def save_game_state(self, state: GameState, slot: str = "save.json") -> Result[None]: ...
+
+    def load_game_state(self, slot: str = "save.json") -> Result[GameState]: ...
+
+class FileSaveStore:
+    """The original backend: one JSON file per slot in the working directory."""
+
+    def save_game_state(self, state: GameState, slot: str = "save.json") -> Result[None]:
+        return save_game_state(state, slot)
+
+    def load_game_state(self, slot: str = "save.json") -> Result[GameState]:
+        return load_game_state(slot)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS saves (
+    user TEXT NOT NULL,
+    slot TEXT NOT NULL,
+    saved_at REAL NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (user, slot)
+);
+CREATE INDEX IF NOT EXISTS saves_by_user_time ON saves (user, saved_at DESC);
+CREATE INDEX IF NOT EXISTS saves_by_time ON saves (saved_at);
+"""
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections shared between threads."""
+
+    def __init__(self, path: str, size: int = 4):
+        self.path = path
+        self.size = size
+        self._idle: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            if self._idle.empty() and self._created < self.size:
+                self._created += 1
+                self._idle.put(self._connect())
+        conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        with self._lock:
+            while not self._idle.empty():
+                self._idle.get_nowait().close()
+            self._created = 0
+
+class SqliteSaveStore:
+    """Save backend on SQLite in WAL mode, keyed by (user, slot).
+
+    Lookups by slot, a user's recent saves and age-based cleanup are all
+    index range scans. Connections come from a small pool, and `batch()`
+    groups many saves into a single transaction.
+    """
+
+    def __init__(self, path: str = "saves.db", user: str = "local",
+                 pool_size: int = 4, content: Optional[Content] = None):
+        self.user = user
+        self.pool = ConnectionPool(path, pool_size)
+        self._content = content
+        # Rows collected by a `batch()` block, per thread so concurrent savers stay out of it
+        self._local = threading.local()
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def content(self) -> Result[Content]:
+        """Static game data used to rebuild loaded states; loaded once."""
+        if self._content is None:
+            result = load_game_data()
+            if result.error:
+                return result
+            self._content = result.value
+        return Result.success(self._content)
+
+    def save_game_state(self, state: GameState, slot: str = "save.json",
+                        user: Optional[str] = None) -> Result[None]:
+        row = (user or self.user, slot, time.time(), json.dumps(state.to_dict()))
+        pending = getattr(self._local, "pending", None)
+        if pending is not None:
+            pending.append(row)
+            return Result.success(None)
+        return self._write([row])
+
+    def save_many(self, saves: List[Tuple[str, str, GameState]]) -> Result[None]:
+        """Write (user, slot, state) saves in one transaction."""
+        now = time.time()
+        return self._write([(user, slot, now, json.dumps(state.to_dict())) for user, slot, state in saves])
+
+    @contextmanager
+    def batch(self) -> Iterator['SqliteSaveStore']:
+        """Collect this thread's saves made inside the block and commit them together.
+        
+        Nothing is written if the block raises.
+        """
+        self._local.pending = []
+        try:
+            yield self
+        finally:
+            rows, self._local.pending = self._local.pending, None
+        if rows:
+            result = self._write(rows)
+            if result.error:
+                raise sqlite3.DatabaseError(result.error)
+
+    def _write(self, rows: List[Tuple[str, str, float, str]]) -> Result[None]:
+        def write() -> None:
+            with self.pool.connection() as conn, conn:
+                conn.executemany(
+                    "INSERT INTO saves (user, slot, saved_at, data) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (user, slot) DO UPDATE SET saved_at = excluded.saved_at, data = excluded.data",
+                    rows)
+        return safe_call(write)
+
+    def load_game_state(self, slot: str = "save.json", user: Optional[str] = None) -> Result[GameState]:
+        def read() -> str:
+            with self.pool.connection() as conn:
+                row = conn.execute("SELECT data FROM saves WHERE user = ? AND slot = ?",
+                                   (user or self.user, slot)).fetchone()
+            if row is None:
+                raise KeyError(f"No save in slot {slot}")
+            return row[0]
+        return (safe_call(read)
+                .bind(lambda data: self.content()
+                      .map(lambda content: GameState.from_dict(json.loads(data), *content))))
+
+    def list_slots(self, user: Optional[str] = None, limit: int = 100) -> Result[List[Tuple[str, float]]]:
+        """A user's saves as (slot, saved_at), most recent first."""
+        def query() -> List[Tuple[str, float]]:
+            with self.pool.connection() as conn:
+                return conn.execute(
+                    "SELECT slot, saved_at FROM saves WHERE user = ? ORDER BY saved_at DESC LIMIT ?",
+                    (user or self.user, limit)).fetchall()
+        return safe_call(query)
+
+    def delete_older_than(self, timestamp: float) -> Result[int]:
+        """Remove saves last written before `timestamp`; returns how many."""
+        def delete() -> int:
+            with self.pool.connection() as conn, conn:
+                return conn.execute("DELETE FROM saves WHERE saved_at < ?", (timestamp,)).rowcount
+        return safe_call(delete)
+
+    def close(self) -> None:
+        self.pool.close()
+
+def open_save_backend(database: Optional[str] = None, user: str = "local") -> SaveBackend:
+    """SQLite store when a database path is given, loose JSON files otherwise."""
+    return SqliteSaveStore(database, user) if database else FileSaveStore()
@@ -0,0 +1,211 @@
+import argparse
+import asyncio
+import json
+import signal
+import time
+import uuid
+from itertools import count
+from pathlib import Path
+from typing import Optional, Tuple
+from game_data import Result, load_game_data, safe_call
+from sessions import SWEEP_INTERVAL, SessionTable
+from shards import ShardRouter
+from content import ContentWatcher
+from tracing import TRACER
+from packs import PackRegistry
+from events import EventLog
+from multiplayer import SharedTowers
+
+class LocalBackend:
+    """In-process session backend: every session runs in the server process.
+
+    A session may also leave its own game for a named shared tower, where
+    every player who joined the same name plays in one world.
+    """
+
+    def __init__(self, table: SessionTable):
+        self.table = table
+        self.towers = SharedTowers(table.rooms, table.items, table.spells)
+
+    async def open(self, session_id: str, saved: Optional[dict] = None,
+                   pack: Optional[str] = None) -> Result[str]:
+        return safe_call(self.table.open, session_id, saved, pack)
+
+    async def join(self, session_id: str, tower: str) -> Result[str]:
+        joined = safe_call(self.towers.join, tower, session_id)
+        if not joined.error:
+            self.table.close(session_id)
+        return joined
+
+    async def command(self, session_id: str, command: str) -> Result[Tuple[str, bool]]:
+        if session_id in self.towers:
+            return safe_call(self.towers.command, session_id, command)
+        return safe_call(self.table.command, session_id, command)
+
+    async def close(self, session_id: str) -> Result[Optional[dict]]:
+        if session_id in self.towers:
+            self.towers.leave(session_id)
+            return Result.success(None)
+        return safe_call(self.table.close, session_id)
+
+    def close_all(self) -> None:
+        self.table.sessions.clear()
+        self.table.hibernated.clear()
+        if self.table.events:
+            self.table.events.close()
+
+def encode_reply(result: Result) -> bytes:
+    """One JSON object per line: {"text", "finished"} or {"error"}."""
+    if result.error:
+        reply = {"error": result.error}
+    elif isinstance(result.value, tuple):
+        reply = {"text": result.value[0], "finished": result.value[1]}
+    else:
+        reply = {"text": result.value, "finished": False}
+    return (json.dumps(reply) + "\n").encode()
+
+async def handle_connection(backend, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Serve one player: each input line is a command, each reply a JSON line."""
+    session_id = uuid.uuid4().hex
+    opened = await backend.open(session_id)
+    writer.write(encode_reply(opened))
+    try:
+        while not opened.error:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode(errors="replace").strip()
+            if not command:
+                continue
+            if command.lower() in ("quit", "exit"):
+                break
+            if command.lower().startswith("join "):
+                # Leave this game for a shared tower other connections can join too
+                joined = await backend.join(session_id, command[5:].strip())
+                writer.write(encode_reply(joined))
+                await writer.drain()
+                continue
+            if command.lower().startswith("tower "):
+                # Start over in another tower pack; the current game is only
+                # left once the new one has opened
+                new_id = uuid.uuid4().hex
+                switched = await backend.open(new_id, pack=command[6:].strip())
+                if not switched.error:
+                    await backend.close(session_id)
+                    session_id = new_id
+                writer.write(encode_reply(switched))
+                await writer.drain()
+                continue
+            result = await backend.command(session_id, command)
+            writer.write(encode_reply(result))
+            await writer.drain()
+            if result.value and result.value[1]:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        await backend.close(session_id)
+        writer.close()
+
+async def start_server(backend, host: str = "127.0.0.1", port: int = 4000) -> asyncio.AbstractServer:
+    return await asyncio.start_server(
+        lambda reader, writer: handle_connection(backend, reader, writer), host, port)
+
+def create_backend(shards: int, watch: bool = False, idle_after: Optional[float] = None,
+                   events: Optional[str] = None):
+    """Shard across worker processes, or run in-process when `shards` is 0.
+    
+    With `watch`, in-process sessions pick up content edits at their next turn.
+    With `idle_after`, in-process sessions idle that many seconds are hibernated.
+    With `events`, every turn is logged there, or to one numbered log per shard.
+    In-process servers also host the tower packs under packs/.
+    """
+    if shards:
+        return ShardRouter(shards, events=Path(events) if events else None).start()
+    log = EventLog(events) if events else None
+    if watch:
+        watcher = ContentWatcher(on_error=lambda error: print(f"Content reload failed: {error}")).start()
+        return LocalBackend(SessionTable(*watcher.current.as_tuple(), watcher=watcher,
+                                         idle_after=idle_after, packs=PackRegistry(), events=log))
+    result = load_game_data()
+    if result.error:
+        raise RuntimeError(f"Error loading game data: {result.error}")
+    return LocalBackend(SessionTable(*result.value, idle_after=idle_after, packs=PackRegistry(), events=log))
+
+async def sweep_sessions(table: SessionTable, interval: float) -> None:
+    """Hibernate idle sessions on a timer, so a quiet server still sheds them."""
+    while True:
+        await asyncio.sleep(interval)
+        table.sweep()
+
+def dump_trace_on_signal(path: str) -> None:
+    """On SIGUSR1, write the spans recorded since the previous dump to `<path stem>.<n><suffix>`.
+    
+    Lets an operator look at a slow stretch without stopping the server.
+    """
+    numbers = count(1)
+    since = time.time()
+    
+    def dump() -> None:
+        nonlocal since
+        now = time.time()
+        target = Path(path).with_name(f"{Path(path).stem}.{next(numbers)}{Path(path).suffix}")
+        written = TRACER.export(target, start=since, end=now)
+        since = now
+        print(f"Wrote {written} trace spans to {target}")
+    
+    asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, dump)
+
+async def serve(host: str, port: int, shards: int, watch: bool = False,
+                idle_after: Optional[float] = None, trace: Optional[str] = None,
+                events: Optional[str] = None) -> None:
+    backend = create_backend(shards, watch, idle_after, events)
+    server = await start_server(backend, host, port)
+    if trace and hasattr(signal, "SIGUSR1"):
+        dump_trace_on_signal(trace)
+    sweeper = (asyncio.create_task(sweep_sessions(backend.table, min(idle_after / 4, SWEEP_INTERVAL)))
+               if idle_after and isinstance(backend, LocalBackend) else None)
+    print(f"Serving the Wizard's Tower on {host}:{port} ({shards or 'no'} shards)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if sweeper:
+            sweeper.cancel()
+        backend.close_all()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Wizard's Tower session server (JSON lines over TCP).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4000)
+    parser.add_argument("--shards", type=int, default=0,
+                        help="worker processes to shard sessions across (0 runs in-process)")
+    parser.add_argument("--watch", action="store_true",
+                        help="hot reload edited content files into live sessions (in-process only)")
+    parser.add_argument("--idle-after", type=float, metavar="SECONDS",
+                        help="hibernate sessions idle this long into compressed deltas (in-process only)")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="record turn spans and write them as Chrome trace-event JSON on exit, "
+                             "and those since the last dump on SIGUSR1 (in-process only)")
+    parser.add_argument("--events", metavar="PATH",
+                        help="append one JSON line per turn of every session (one numbered log per shard)")
+    args = parser.parse_args()
+    if args.watch and args.shards:
+        parser.error("--watch is only supported without --shards")
+    if args.trace and args.shards:
+        parser.error("--trace is only supported without --shards")
+    if args.idle_after and args.shards:
+        parser.error("--idle-after is only supported without --shards")
+    if args.trace:
+        TRACER.enable()
+    try:
+        asyncio.run(serve(args.host, args.port, args.shards, args.watch, args.idle_after, args.trace,
+                          args.events))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.trace:
+            TRACER.export(args.trace)
+
+if __name__ == '__main__':
+    main()
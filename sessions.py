@@ -0,0 +1,292 @@
+import pickle
+import time
+import zlib
+from dataclasses import fields, replace
+from functools import partial
+from typing import Any, Dict, Optional, Tuple
+from game_data import GameState, Room, Item, Spell, build_puzzle_index
+from history import rooms_bytes, state_bytes
+from game_engine import run_batch, split_commands, format_room_display
+from content import ContentVersion, ContentWatcher, upgrade_state
+from packs import DEFAULT_PACK, PackRegistry
+from events import EventLog
+from tracing import TRACER
+from zones import GuardianScheduler
+
+# How often (seconds) idle sessions and the memory cap are checked without an idle_after
+SWEEP_INTERVAL = 1.0
+
+ROOM_FIELDS = tuple(field.name for field in fields(Room))
+
+def room_delta(room: Room, base: Optional[Room]) -> Dict[str, Any]:
+    """The fields of `room` that differ from its content version (all of them if it is new)."""
+    if base is None:
+        return {name: getattr(room, name) for name in ROOM_FIELDS}
+    return {name: getattr(room, name) for name in ROOM_FIELDS if getattr(room, name) != getattr(base, name)}
+
+def hibernate_state(state: GameState, rooms: Dict[str, Room]) -> bytes:
+    """Compress a session to its save data plus per-field room deltas from `rooms`."""
+    deltas = {room_id: room_delta(room, rooms.get(room_id)) for room_id, room in state.rooms.items()
+              if room is not rooms.get(room_id)}
+    payload = (state.to_dict(), {room_id: delta for room_id, delta in deltas.items() if delta})
+    return zlib.compress(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+
+def rehydrate_state(blob: bytes, rooms: Dict[str, Room], items: Dict[str, Item],
+                    spells: Dict[str, Spell]) -> GameState:
+    """Rebuild a session from `hibernate_state` against the same content."""
+    data, deltas = pickle.loads(zlib.decompress(blob))
+    puzzle_index = build_puzzle_index(rooms)
+    if deltas:
+        rooms = {**rooms, **{room_id: replace(rooms[room_id], **delta) if room_id in rooms else Room(**delta)
+                             for room_id, delta in deltas.items()}}
+    return GameState.from_dict(data, rooms, items, spells, puzzle_index)
+
+class SessionTable:
+    """Headless game sessions owned by one process, keyed by session id.
+
+    All sessions share the same loaded content; each holds only its own
+    GameState. With a `watcher`, each session is pinned to the content
+    version it last played on and moved to the newest one at its next turn.
+
+    Sessions idle for `idle_after` seconds, or the least recently active
+    ones once live states exceed `max_resident_bytes`, are hibernated into
+    compressed deltas from their content and rehydrated on their next command.
+    Both are checked by `sweep`, which commands run every so often and a
+    server can run on a timer. Memory is measured lazily, re-walking a
+    session's rooms only when its rooms dict changed since it was measured.
+
+    With `packs`, a session may be opened on a named tower pack instead; it
+    stays on the pack version it opened with and releases it when it ends.
+    With `events`, every turn of every session is appended to that log.
+    """
+
+    def __init__(self, rooms: Dict[str, Room], items: Dict[str, Item], spells: Dict[str, Spell],
+                 watcher: Optional[ContentWatcher] = None, idle_after: Optional[float] = None,
+                 max_resident_bytes: Optional[int] = None, packs: Optional[PackRegistry] = None,
+                 events: Optional[EventLog] = None):
+        self.rooms = rooms
+        self.items = items
+        self.spells = spells
+        self.watcher = watcher
+        self.idle_after = idle_after
+        self.max_resident_bytes = max_resident_bytes
+        self.packs = packs
+        self.events = events
+        self.sessions: Dict[str, GameState] = {}
+        self.hibernated: Dict[str, bytes] = {}
+        self._pinned: Dict[str, ContentVersion] = {}
+        self._pack_of: Dict[str, str] = {}
+        # Insertion order is least recently active first
+        self._last_active: Dict[str, float] = {}
+        # session -> (state, its rooms dict, rooms bytes, total bytes) as last measured
+        self._measured: Dict[str, Tuple[GameState, Dict[str, Room], int, int]] = {}
+        # session -> (content rooms, guardian scheduler over them)
+        self._schedulers: Dict[str, Tuple[Dict[str, Room], GuardianScheduler]] = {}
+        self._next_sweep = 0.0
+
+    def __len__(self) -> int:
+        return len(self.sessions) + len(self.hibernated)
+
+    def _content_of(self, session_id: str) -> Tuple[Dict[str, Room], Dict[str, Item], Dict[str, Spell]]:
+        pinned = self._pinned.get(session_id)
+        return pinned.as_tuple() if pinned is not None else (self.rooms, self.items, self.spells)
+
+    def _track(self, session_id: str, state: GameState) -> None:
+        """Store a live state and mark the session active."""
+        self.sessions[session_id] = state
+        self._last_active.pop(session_id, None)
+        self._last_active[session_id] = time.monotonic()
+
+    def _forget(self, session_id: str) -> None:
+        self.sessions.pop(session_id, None)
+        self.hibernated.pop(session_id, None)
+        pinned = self._pinned.pop(session_id, None)
+        pack = self._pack_of.pop(session_id, None)
+        if pack is not None:
+            self.packs.release(pack, pinned)
+        self._last_active.pop(session_id, None)
+        self._measured.pop(session_id, None)
+        self._schedulers.pop(session_id, None)
+        if self.events:
+            self.events.end(session_id)
+
+    def state(self, session_id: str) -> GameState:
+        """The session's live state, rehydrating it if it was hibernated."""
+        blob = self.hibernated.pop(session_id, None)
+        if blob is not None:
+            self._track(session_id, rehydrate_state(blob, *self._content_of(session_id)))
+        return self.sessions[session_id]
+
+    def hibernate(self, session_id: str) -> None:
+        """Replace a live session with its compressed delta encoding."""
+        state = self.sessions.pop(session_id)
+        self.hibernated[session_id] = hibernate_state(state, self._content_of(session_id)[0])
+        self._measured.pop(session_id, None)
+        self._last_active.pop(session_id, None)
+
+    def hibernate_idle(self, now: Optional[float] = None) -> int:
+        """Hibernate sessions idle longer than `idle_after`; returns how many were."""
+        if self.idle_after is None:
+            return 0
+        cutoff = (time.monotonic() if now is None else now) - self.idle_after
+        idle = []
+        for session_id, last_active in self._last_active.items():
+            if last_active > cutoff:
+                break
+            idle.append(session_id)
+        for session_id in idle:
+            self.hibernate(session_id)
+        return len(idle)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Hibernate idle sessions, then the least recently active ones over the memory cap.
+        
+        The most recently active session is never hibernated for the cap.
+        Returns how many sessions were hibernated.
+        """
+        now = time.monotonic() if now is None else now
+        self._next_sweep = now + (min(self.idle_after / 4, SWEEP_INTERVAL) if self.idle_after else SWEEP_INTERVAL)
+        hibernated = self.hibernate_idle(now)
+        if self.max_resident_bytes is not None:
+            resident = self.resident_bytes()
+            for session_id in list(self._last_active)[:-1]:
+                if resident <= self.max_resident_bytes:
+                    break
+                resident -= self._measure(session_id)
+                self.hibernate(session_id)
+                hibernated += 1
+        return hibernated
+
+    def _sweep_if_due(self) -> None:
+        if (self.idle_after is not None or self.max_resident_bytes is not None) and time.monotonic() >= self._next_sweep:
+            self.sweep()
+
+    def _measure(self, session_id: str) -> int:
+        state = self.sessions[session_id]
+        measured = self._measured.get(session_id)
+        if measured is not None and measured[0] is state:
+            return measured[3]
+        shared = self._content_of(session_id)[0]
+        rooms_cost = (measured[2] if measured is not None and measured[1] is state.rooms
+                      else rooms_bytes(state.rooms, shared))
+        total = state_bytes(state, shared, rooms_cost)
+        self._measured[session_id] = (state, state.rooms, rooms_cost, total)
+        return total
+
+    def memory_bytes(self, session_id: str) -> int:
+        """Estimated bytes a session holds: its live state, or its hibernated encoding."""
+        if session_id in self.hibernated:
+            return len(self.hibernated[session_id])
+        return self._measure(session_id)
+
+    def resident_bytes(self) -> int:
+        """Estimated bytes held by live (not hibernated) sessions beyond shared content."""
+        return sum(map(self._measure, list(self.sessions)))
+
+    def hibernated_bytes(self) -> int:
+        return sum(map(len, self.hibernated.values()))
+
+    def _latest_content(self) -> Optional[ContentVersion]:
+        if self.watcher is None:
+            return None
+        latest = self.watcher.current
+        self.rooms, self.items, self.spells = latest.as_tuple()
+        return latest
+
+    def _at_turn_boundary(self, session_id: str) -> GameState:
+        """Move the session onto the newest content version if one was published."""
+        state = self.state(session_id)
+        if session_id in self._pack_of:
+            return state
+        latest = self._latest_content()
+        pinned = self._pinned.get(session_id)
+        if latest is not None and pinned is not None and pinned.number != latest.number:
+            state = upgrade_state(state, pinned, latest)
+            self._pinned[session_id] = latest
+            self._track(session_id, state)
+        return state
+
+    def _guardians(self, session_id: str) -> GuardianScheduler:
+        """The session's guardian scheduler, rebuilt when it moves to other content."""
+        rooms = self._content_of(session_id)[0]
+        held = self._schedulers.get(session_id)
+        if held is None or held[0] is not rooms:
+            held = self._schedulers[session_id] = (rooms, GuardianScheduler.for_rooms(rooms))
+        return held[1]
+
+    def _pin(self, session_id: str, pack: Optional[str]) -> None:
+        """Pin a session to a pack's current version, or to the table's own content.
+        
+        A session id that is already open is replaced, releasing its old pin.
+        The default pack is the table's own content rather than a second copy.
+        """
+        self._forget(session_id)
+        if pack is not None and pack != DEFAULT_PACK:
+            if self.packs is None:
+                raise ValueError("This server has no tower packs")
+            result = self.packs.acquire(pack)
+            if result.error:
+                raise ValueError(result.error)
+            self._pinned[session_id] = result.value
+            self._pack_of[session_id] = pack
+            return
+        latest = self._latest_content()
+        if latest is not None:
+            self._pinned[session_id] = latest
+
+    def open(self, session_id: str, saved: Optional[dict] = None, pack: Optional[str] = None) -> str:
+        """Start a new game (or resume a saved one) and return the first room display."""
+        self._pin(session_id, pack)
+        content = self._content_of(session_id)
+        try:
+            state = GameState.from_dict(saved, *content) if saved else GameState.new_game(*content)
+        except Exception:
+            self._forget(session_id)
+            raise
+        self._track(session_id, state)
+        self._sweep_if_due()
+        return format_room_display(state)
+
+    def command(self, session_id: str, command: str) -> Tuple[str, bool]:
+        """Run one input line, which may chain commands with ';'.
+        
+        Finished sessions are closed automatically.
+        """
+        on_turn = partial(self.events.record, session=session_id) if self.events else None
+        with TRACER.session(session_id), TRACER.span("line", line=command):
+            state = self._at_turn_boundary(session_id)
+            new_state, messages, finished = run_batch(state, split_commands(command), on_turn,
+                                                      self._guardians(session_id).update)
+        if finished:
+            self._forget(session_id)
+        else:
+            self._track(session_id, new_state)
+            self._sweep_if_due()
+        return "".join(messages), finished
+
+    def export(self, session_id: str) -> bytes:
+        """Remove a session and serialize it for another process to restore.
+        
+        Only the rooms that differ from the shared content are shipped; the
+        receiving process holds identical content, or the same pack.
+        """
+        state = self._at_turn_boundary(session_id)
+        rooms, pack = self._content_of(session_id)[0], self._pack_of.get(session_id)
+        self._forget(session_id)
+        changed_rooms = {room_id: room for room_id, room in state.rooms.items()
+                         if room is not rooms.get(room_id)}
+        return pickle.dumps((state.to_dict(), changed_rooms, pack), protocol=pickle.HIGHEST_PROTOCOL)
+
+    def restore(self, session_id: str, payload: bytes) -> None:
+        """Adopt a session serialized by `export`."""
+        data, changed_rooms, pack = pickle.loads(payload)
+        self._pin(session_id, pack)
+        rooms, items, spells = self._content_of(session_id)
+        self._track(session_id, GameState.from_dict(data, {**rooms, **changed_rooms}, items, spells,
+                                                    build_puzzle_index(rooms)))
+
+    def close(self, session_id: str) -> Optional[dict]:
+        """End a session, returning its save data if it was open."""
+        state = self.state(session_id) if session_id in self.hibernated else self.sessions.get(session_id)
+        self._forget(session_id)
+        return state.to_dict() if state else None
@@ -0,0 +1,115 @@
+import asyncio
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from game_data import Result
+from zygote import ZygotePool, WorkerHandle
+
+class ShardRouter:
+    """Front-end router over N session worker processes (shards).
+
+    Sessions hash to a shard with a stable CRC32, so no routing table is
+    needed except for sessions that were migrated away from their home
+    shard. Each shard is driven from its own single-thread executor: calls to
+    one shard keep their order, while different shards run their CPU-bound
+    turns in parallel in separate processes.
+    """
+
+    def __init__(self, shards: Optional[int] = None, pool: Optional[ZygotePool] = None,
+                 events: Optional[Path] = None):
+        self.pool = pool or ZygotePool(workers=shards, events=events)
+        self.shards: List[WorkerHandle] = []
+        self._executors: List[ThreadPoolExecutor] = []
+        self._moved: Dict[str, int] = {}
+        # Exported sessions that neither shard would take back, kept for a later migrate
+        self._stranded: Dict[str, bytes] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def start(self) -> 'ShardRouter':
+        self.shards = self.pool.start().workers
+        self._executors = [ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"shard-{i}")
+                           for i in range(len(self.shards))]
+        return self
+
+    def home_shard(self, session_id: str) -> int:
+        return zlib.crc32(session_id.encode()) % len(self.shards)
+
+    def shard_for(self, session_id: str) -> int:
+        return self._moved.get(session_id, self.home_shard(session_id))
+
+    async def _call(self, shard: int, operation: str, session_id: str, argument: Any = None) -> Result[Any]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executors[shard], self.shards[shard].request, operation, session_id, argument)
+
+    async def open(self, session_id: str, saved: Optional[dict] = None,
+                   pack: Optional[str] = None) -> Result[str]:
+        if pack is not None:
+            return Result.failure("Tower packs are only served without --shards")
+        self._locks.setdefault(session_id, asyncio.Lock())
+        shard = self.shard_for(session_id)
+        result = await self._call(shard, "open", session_id, saved)
+        if not result.error:
+            self.pool.assign(session_id, self.shards[shard])
+        return result
+
+    async def join(self, session_id: str, tower: str) -> Result[str]:
+        return Result.failure("Shared towers are only served without --shards")
+
+    async def command(self, session_id: str, command: str) -> Result[Tuple[str, bool]]:
+        async with self._locks.setdefault(session_id, asyncio.Lock()):
+            result = await self._call(self.shard_for(session_id), "command", session_id, command)
+        if result.value and result.value[1]:
+            self._forget(session_id)
+        return result
+
+    async def close(self, session_id: str) -> Result[Optional[dict]]:
+        async with self._locks.setdefault(session_id, asyncio.Lock()):
+            result = await self._call(self.shard_for(session_id), "close", session_id)
+        self._forget(session_id)
+        return result
+
+    async def migrate(self, session_id: str, shard: int) -> Result[int]:
+        """Move a live session to `shard` by shipping its serialized GameState.
+
+        If neither `shard` nor the source takes the session, its payload is
+        kept and the next migrate of that session retries with it.
+        """
+        async with self._locks.setdefault(session_id, asyncio.Lock()):
+            source = self.shard_for(session_id)
+            payload = self._stranded.pop(session_id, None)
+            if payload is None:
+                if source == shard:
+                    return Result.success(shard)
+                exported = await self._call(source, "export", session_id)
+                if exported.error:
+                    return Result.failure(exported.error)
+                payload = exported.value
+            restored = await self._call(shard, "restore", session_id, payload)
+            if restored.error:
+                # Put the session back where it came from rather than lose it
+                rolled_back = await self._call(source, "restore", session_id, payload)
+                if rolled_back.error:
+                    self._stranded[session_id] = payload
+                    self.pool.release(session_id)
+                    return Result.failure(f"{restored.error}; restoring it on shard {source} "
+                                          f"also failed: {rolled_back.error}")
+                return Result.failure(restored.error)
+            self.pool.assign(session_id, self.shards[shard])
+            if shard == self.home_shard(session_id):
+                self._moved.pop(session_id, None)
+            else:
+                self._moved[session_id] = shard
+            return Result.success(shard)
+
+    def _forget(self, session_id: str) -> None:
+        self.pool.release(session_id)
+        self._moved.pop(session_id, None)
+        self._stranded.pop(session_id, None)
+        self._locks.pop(session_id, None)
+
+    def close_all(self) -> None:
+        for executor in self._executors:
+            executor.shutdown(wait=True)
+        self.pool.close()
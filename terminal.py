@@ -0,0 +1,65 @@
+import os
+import sys
+from typing import List, Optional, TextIO
+
+# ANSI control sequences
+CLEAR_SCREEN = "\x1b[2J\x1b[H"
+RESET = "\x1b[0m"
+BOLD = "1"
+RED = "31"
+GREEN = "32"
+YELLOW = "33"
+CYAN = "36"
+
+def enable_windows_ansi() -> None:
+    """Let older Windows consoles interpret ANSI sequences when colorama is installed."""
+    if os.name != 'nt':
+        return
+    try:
+        import colorama
+    except ImportError:
+        return
+    colorama.just_fix_windows_console()
+
+class TerminalRenderer:
+    """Buffers a turn's output and writes it to the terminal in one call.
+
+    Screen clearing and colour use ANSI escape sequences instead of spawning
+    a shell. When the stream is not a TTY (piped or scripted runs) escapes
+    are skipped entirely and text is passed through unchanged.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None, color: Optional[bool] = None):
+        self.stream = stream or sys.stdout
+        self.is_tty = hasattr(self.stream, "isatty") and self.stream.isatty()
+        self.color = color if color is not None else self.is_tty and "NO_COLOR" not in os.environ
+        self._buffer: List[str] = []
+        if self.color:
+            enable_windows_ansi()
+
+    def write(self, text: str) -> None:
+        """Queue a line of output for the next flush."""
+        self._buffer.append(text)
+        self._buffer.append("\n")
+
+    def clear(self) -> None:
+        if self.is_tty:
+            self._buffer.append(CLEAR_SCREEN)
+
+    def style(self, text: str, *codes: str) -> str:
+        """Wrap text in SGR codes when colour output is enabled."""
+        if not self.color or not codes:
+            return text
+        return f"\x1b[{';'.join(codes)}m{text}{RESET}"
+
+    def flush(self) -> None:
+        """Write everything queued with a single write call."""
+        if self._buffer:
+            self.stream.write("".join(self._buffer))
+            self._buffer.clear()
+        self.stream.flush()
+
+    def prompt(self, text: str) -> str:
+        """Flush pending output, then read a line of input."""
+        self.flush()
+        return input(text)
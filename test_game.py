@@ -1,13 +1,51 @@
+import asyncio
+import io
+import json
+import os
+import pickle
+import random
+import shutil
+import signal
+import tempfile
+import threading
+import time
 import unittest
+from unittest import mock
+from dataclasses import replace
+from pathlib import Path
 from game_data import (
-    GameState, Player, Room, Item, Spell, Direction,
-    ItemType, Guardian, Hazard, Puzzle, Result
+    GameState, Player, Room, Item, Spell, Direction, load_game_data,
+    ItemType, Guardian, Hazard, Puzzle, Result, Effect
 )
 from game_engine import (
     move_player, look_around, take_item, use_item,
     cast_spell, show_inventory, show_status, get_hint,
-    process_command, update_guardians
+    process_command, run_turn, update_guardians, READ_ONLY_MEMO
 )
+from autosave import AutosaveService
+from history import StateHistory, rooms_bytes
+from multiplayer import SharedTower
+from zones import build_zone_map
+from sessions import SessionTable
+from zygote import ZygotePool
+from shards import ShardRouter
+from server import LocalBackend, dump_trace_on_signal, start_server, sweep_sessions
+from save_store import SqliteSaveStore
+from content import ContentWatcher
+from main import RENDERER, split_commands, run_batch, process_game_turn, print_message, prompt
+from terminal import TerminalRenderer, CLEAR_SCREEN
+from gherkin_runner import parse_feature, run_feature
+from loadtest import LoadTest, MarkovPlayer, ScriptPlayer, percentile
+from events import EventLog, read_events, worker_log_path
+from analytics import rollup_files, write_columnar, read_columnar
+from names import NameIndex
+from save_schema import SAVE_VERSION, migrate_save
+from migrate_saves import migrate_directory, migrate_store, name_shard, save_files
+from lint import lint_content, strongly_connected_components
+from fuzzer import fuzz, run_script, shrink
+from websocket_bridge import start_bridge, state_diff, accept_key, origin_allowed
+from tracing import TRACER, Tracer
+from packs import PackRegistry
 
 class TestGameEngine(unittest.TestCase):
     def setUp(self):
@@ -19,21 +57,24 @@ class TestGameEngine(unittest.TestCase):
                 name="Health Potion",
                 type=ItemType.POTION,
                 effect=30,
-                description="A red potion that restores health."
+                description="A red potion that restores health.",
+                effects=(Effect(kind="heal", amount=30),)
             ),
             "tome_basic": Item(
                 id="tome_basic",
                 name="Basic Spell Tome",
                 type=ItemType.TOME,
                 effect=None,
-                description="A basic spell tome."
+                description="A basic spell tome.",
+                effects=(Effect(kind="teach_spell", spell="fireball"),)
             ),
             "tome_advanced": Item(
                 id="tome_advanced",
                 name="Advanced Spell Tome",
                 type=ItemType.TOME,
                 effect=None,
-                description="An advanced spell tome."
+                description="An advanced spell tome.",
+                effects=(Effect(kind="teach_spell", spell="shield"),)
             )
         }
         
@@ -47,7 +88,8 @@ class TestGameEngine(unittest.TestCase):
                 damage=25,
                 defense=0,
                 effect="A ball of fire.",
-                description="A basic fire spell."
+                description="A basic fire spell.",
+                effects=(Effect(kind="damage"),)
             ),
             "shield": Spell(
                 id="shield",
@@ -57,7 +99,8 @@ class TestGameEngine(unittest.TestCase):
                 damage=0,
                 defense=10,
                 effect="A protective barrier.",
-                description="A defensive spell."
+                description="A defensive spell.",
+                effects=(Effect(kind="buff_flag", flag="shield_active"),)
             )
         }
         
@@ -219,6 +262,15 @@ class TestGameEngine(unittest.TestCase):
         _, message = process_command(self.state, "move north")
         self.assertIn("You enter", message)
     
+    def test_malformed_commands(self):
+        """Test that empty and short or overlong commands are answered instead of crashing."""
+        for command in ("", "   ", "cast", "attack", "cast fireball guardian now", "use a on b on c"):
+            state, message = process_command(self.state, command)
+            self.assertIs(state, self.state)
+            self.assertTrue(message)
+        _, message = process_command(self.state, "cast")
+        self.assertEqual(message, "Cast which spell?")
+    
     def test_update_guardians(self):
         """Test guardian updates."""
         # Move to lobby
@@ -228,5 +280,1500 @@ class TestGameEngine(unittest.TestCase):
         new_state = update_guardians(state)
         self.assertIsNotNone(new_state.rooms["lobby"].guardian)
 
+    def test_transient_state(self):
+        """Test batching several edits into one new state."""
+        # No edits returns the original state
+        self.assertIs(self.state.transient().persistent(), self.state)
+        
+        # Several edits are committed together without touching the base
+        tx = self.state.transient()
+        tx.update_player(lambda p: p.add_item("tome_basic"))
+        tx.update_room("entrance", lambda r: replace(r, items=["tome_advanced"]))
+        tx.update_room("entrance", lambda r: replace(r, items=[]))
+        tx.add_game_flags({"entrance_cleared"}).visit_room("lobby")
+        new_state = tx.persistent()
+        self.assertEqual(new_state.player.inventory, ["tome_basic"])
+        self.assertEqual(new_state.rooms["entrance"].items, [])
+        self.assertIs(new_state.rooms["lobby"], self.state.rooms["lobby"])
+        self.assertIn("entrance_cleared", new_state.game_flags)
+        self.assertIn("lobby", new_state.visited_rooms)
+        self.assertEqual(self.state.rooms["entrance"].items, ["tome_basic", "tome_advanced"])
+        self.assertEqual(self.state.game_flags, set())
+    
+    def test_state_version(self):
+        """Test that every state update bumps the version."""
+        new_state, _ = take_item(self.state, "tome_basic")
+        self.assertNotEqual(new_state.version, self.state.version)
+        self.assertGreater(replace(self.state).version, self.state.version)
+        
+        # Read-only commands keep the same state and version
+        same_state, _ = show_status(self.state)
+        self.assertEqual(same_state.version, self.state.version)
+        
+        # A state from another process may carry a version used here, so it is re-stamped
+        self.assertGreater(pickle.loads(pickle.dumps(self.state)).version, self.state.version)
+    
+    def test_read_only_memo(self):
+        """Test memoization of read-only command responses."""
+        READ_ONLY_MEMO.clear()
+        TRACER.clear()
+        TRACER.enable()
+        self.addCleanup(TRACER.clear)
+        self.addCleanup(TRACER.disable)
+        hits = READ_ONLY_MEMO.hits
+        _, first = process_command(self.state, "look")
+        _, second = process_command(self.state, "look")
+        self.assertEqual(first, second)
+        self.assertEqual(READ_ONLY_MEMO.hits, hits + 1)
+        self.assertEqual([span.args["memo"] for span in TRACER.spans if span.name == "look"], ["miss", "hit"])
+        
+        # A changed state is never answered from a stale entry
+        new_state, _ = process_command(self.state, "take tome_basic")
+        _, message = process_command(new_state, "look")
+        self.assertNotIn("Basic Spell Tome", message)
+    
+    def test_puzzle_index(self):
+        """Test the item to puzzle reverse index and readiness checks."""
+        puzzle = Puzzle(type="spell_combination", required_items=["tome_basic", "tome_advanced"], reward="shield")
+        rooms = {**self.rooms, "entrance": replace(self.rooms["entrance"], puzzle=puzzle)}
+        state = GameState.new_game(rooms, self.items, self.spells)
+        self.assertEqual(state.puzzle_index.puzzles_needing("tome_basic"), ("entrance",))
+        self.assertEqual(state.puzzle_index.puzzles_needing("health_potion"), ())
+        
+        # Readiness follows the inventory
+        state, _ = take_item(state, "tome_basic")
+        self.assertFalse(state.is_puzzle_ready("entrance"))
+        self.assertEqual(state.puzzle_index.ready_after("tome_basic", state.inventory_mask), [])
+        state, _ = take_item(state, "tome_advanced")
+        self.assertTrue(state.is_puzzle_ready("entrance"))
+        self.assertEqual(state.ready_puzzles(), ["entrance"])
+        
+        # Solved puzzles are no longer reported as ready
+        solved = replace(state, game_flags={"entrance_puzzle_solved"})
+        self.assertEqual(solved.ready_puzzles(), [])
+    
+    def test_declared_effects(self):
+        """Test that item and spell behavior comes from declared effects."""
+        # A spell declared in content can be cast without engine changes
+        meteor = Spell(id="meteor", name="Meteor", mana_cost=40, damage=60,
+                       effects=(Effect(kind="damage"),))
+        state = replace(self.state, spells={**self.spells, "meteor": meteor})
+        state = replace(state, player=state.player.add_spell("meteor"))
+        state, _ = move_player(state, "north")
+        new_state, message = cast_spell(state, "meteor", "guardian")
+        self.assertIn("defeat", message)
+        self.assertIsNone(new_state.rooms["lobby"].guardian)
+        self.assertIn("lobby_cleared", new_state.game_flags)
+        self.assertEqual(new_state.player.mana, 60)
+        
+        # Failed effects leave the state untouched, including the mana cost
+        unchanged, message = cast_spell(self.state, "fireball", "guardian")
+        self.assertIs(unchanged, self.state)
+        self.assertIn("no guardian", message)
+        
+        # Buff flags
+        state = replace(self.state, player=self.state.player.add_spell("shield"))
+        new_state, message = cast_spell(state, "shield")
+        self.assertIn("shield_active", new_state.player.flags)
+        self.assertEqual(new_state.player.mana, 85)
+    
+    def test_mana_essence_and_time_stop(self):
+        """Test that Mana Essence restores mana and Time Stop freezes guardians for one turn."""
+        result = load_game_data()
+        self.assertIsNone(result.error)
+        state = GameState.new_game(*result.value)
+        player = replace(state.player, mana=10, inventory=["mana_essence"]).add_spell("time_stop")
+        state, message = use_item(replace(state, player=player), "mana_essence")
+        self.assertIn("restored", message)
+        self.assertEqual(state.player.mana, 60)
+        
+        # The guardians skip the turn after the cast, then move again
+        ticks = []
+        def guardians(tick_state):
+            ticks.append(tick_state.player.current_room)
+            return tick_state
+        for command in ["cast time stop", "look", "look"]:
+            state, _, _ = run_turn(state, command, guardians)
+        self.assertEqual(len(ticks), 2)
+        self.assertNotIn("time_stopped", state.player.flags)
+    
+    def test_load_content_effects(self):
+        """Test that shipped content declares effects for its items and spells."""
+        result = load_game_data()
+        self.assertIsNone(result.error)
+        _, items, spells = result.value
+        self.assertEqual(items["health_potion"].effects, (Effect(kind="heal", amount=30),))
+        self.assertTrue(all(spell.effects for spell in spells.values()))
+
+class TestAutosave(unittest.TestCase):
+    def setUp(self):
+        """Set up a state and a scratch directory."""
+        self.state = GameState.new_game({}, {}, {})
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+    
+    def test_coalesces_to_latest_state(self):
+        """Test that bursts of submissions end with the latest state on disk."""
+        filename = str(Path(self.tmp.name) / "autosave.json")
+        autosave = AutosaveService(filename).start()
+        states = [replace(self.state, player=self.state.player.update_health(h)) for h in (90, 80, 70)]
+        for state in states:
+            autosave.submit(state)
+        autosave.close()
+        
+        saved = json.loads(Path(filename).read_text())
+        self.assertEqual(saved["player"]["health"], 70)
+        self.assertLessEqual(autosave.saves_written, len(states))
+        self.assertEqual(list(Path(self.tmp.name).iterdir()), [Path(filename)])
+    
+    def test_reports_failures(self):
+        """Test that write failures are reported asynchronously."""
+        reported = []
+        filename = str(Path(self.tmp.name) / "missing" / "autosave.json")
+        autosave = AutosaveService(filename, on_error=reported.append).start()
+        autosave.submit(self.state)
+        self.assertTrue(autosave.flush(timeout=5))
+        autosave.close()
+        self.assertEqual(len(autosave.drain_errors()), 1)
+        self.assertEqual(len(reported), 1)
+        self.assertEqual(autosave.drain_errors(), [])
+    
+    def test_configured_backend(self):
+        """Test that autosaves go through the configured save backend."""
+        store = SqliteSaveStore(str(Path(self.tmp.name) / "saves.db"), content=({}, {}, {}))
+        self.addCleanup(store.close)
+        autosave = AutosaveService("autosave.json", backend=store).start()
+        autosave.submit(self.state)
+        autosave.close()
+        self.assertEqual([slot for slot, _ in store.list_slots().value], ["autosave.json"])
+
+class TestStateHistory(unittest.TestCase):
+    def setUp(self):
+        """Set up a small world to record turns in."""
+        rooms = {
+            room_id: Room(id=room_id, name=room_id.title(), description="",
+                          exits={Direction.NORTH: "hall"}, items=["gem"])
+            for room_id in ("entrance", "hall", "vault")
+        }
+        self.state = GameState.new_game(rooms, {}, {})
+    
+    def advance(self, state, health):
+        return replace(state, player=state.player.update_health(health))
+    
+    def test_undo_redo(self):
+        """Test stepping backwards and forwards through states."""
+        history = StateHistory(depth=10)
+        first = self.state
+        second = self.advance(first, 90)
+        history.record(first)
+        
+        self.assertIs(history.undo(second), first)
+        self.assertIsNone(history.undo(first))
+        self.assertIs(history.redo(first), second)
+        self.assertIsNone(history.redo(second))
+        
+        # A new turn after an undo discards the redo branch
+        history.undo(second)
+        history.record(first)
+        self.assertFalse(history.can_redo())
+    
+    def test_bounded_depth(self):
+        """Test that only the configured depth is kept."""
+        history = StateHistory(depth=3)
+        state = self.state
+        for health in range(90, 40, -10):
+            history.record(state)
+            state = self.advance(state, health)
+        self.assertEqual(len(history), 3)
+    
+    def test_memory_accounting_shares_rooms(self):
+        """Test that unchanged rooms are not counted once per snapshot."""
+        history = StateHistory(depth=100)
+        history.record(self.state)
+        one = history.memory_bytes()
+        
+        # Snapshots sharing the rooms dict only add their own small objects
+        state = self.state
+        for health in range(99, 89, -1):
+            state = self.advance(state, health)
+            history.record(state)
+        shared = history.memory_bytes() - one
+        self.assertLess(shared, one * 10)
+        
+        # Dropped snapshots give their bytes back
+        while history.can_undo():
+            state = history.undo(state)
+        history.record(state)
+        self.assertEqual(history.memory_bytes(), one)
+        
+        # A byte cap evicts the oldest snapshots
+        capped = StateHistory(depth=100, max_bytes=one * 2)
+        state = self.state
+        for health in range(99, 49, -1):
+            capped.record(state)
+            state = replace(self.advance(state, health), rooms=dict(state.rooms))
+        self.assertLessEqual(capped.memory_bytes(), one * 2)
+        self.assertGreater(len(capped), 0)
+
+class TestSharedTower(unittest.TestCase):
+    def setUp(self):
+        """Set up a corridor of rooms with a pursuing guardian in the middle."""
+        names = ["west_end", "west", "middle", "east", "east_end", "far_east"]
+        self.rooms = {}
+        for i, room_id in enumerate(names):
+            exits = {}
+            if i > 0:
+                exits[Direction.WEST] = names[i - 1]
+            if i < len(names) - 1:
+                exits[Direction.EAST] = names[i + 1]
+            self.rooms[room_id] = Room(id=room_id, name=room_id, description="", exits=exits)
+        self.rooms["middle"] = replace(
+            self.rooms["middle"],
+            guardian=Guardian(name="Hunter", health=50, attack=10, defense=5)
+        )
+        fireball = Spell(id="fireball", name="Fireball", mana_cost=20, damage=35,
+                         effects=(Effect(kind="damage"),))
+        self.tower = SharedTower(self.rooms, {}, {"fireball": fireball})
+    
+    def guardian_room(self):
+        return next(room_id for room_id, room in self.tower.world.rooms.items() if room.guardian)
+    
+    def test_guardian_chases_nearest_player(self):
+        """Test that one search sends the guardian toward the closest player."""
+        self.tower.join("far", start_room="far_east")
+        self.tower.join("near", start_room="west_end")
+        self.tower.tick()
+        self.assertEqual(self.guardian_room(), "west")
+        self.tower.tick()
+        self.assertEqual(self.guardian_room(), "west_end")
+        self.tower.tick()
+        self.assertEqual(self.guardian_room(), "west_end")
+    
+    def test_players_share_the_world(self):
+        """Test that world changes made by one player are seen by the others."""
+        self.tower.join("alice", start_room="west")
+        self.tower.join("bob", start_room="east")
+        self.tower.command("alice", "go east")
+        self.assertEqual(self.tower.view("alice").player.current_room, "middle")
+        self.assertEqual(self.tower.view("bob").player.current_room, "east")
+        
+        for _ in range(2):
+            self.tower.command("alice", "cast fireball guardian")
+        self.assertIsNone(self.tower.view("bob").rooms["middle"].guardian)
+        self.assertIn("middle_cleared", self.tower.view("bob").game_flags)
+        self.assertNotIn("middle", self.tower.view("bob").visited_rooms)
+        self.assertIsNotNone(self.tower.leave("bob"))
+        self.assertEqual(self.tower.player_ids(), ["alice"])
+
+class TestZones(unittest.TestCase):
+    def setUp(self):
+        """Set up three floors joined by stairs, with a guardian on the top floor."""
+        layout = {
+            "a1": {Direction.EAST: "a2"},
+            "a2": {Direction.WEST: "a1", Direction.UP: "b1"},
+            "b1": {Direction.DOWN: "a2", Direction.EAST: "b2"},
+            "b2": {Direction.WEST: "b1", Direction.UP: "c1"},
+            "c1": {Direction.DOWN: "b2", Direction.EAST: "c2"},
+            "c2": {Direction.WEST: "c1", Direction.EAST: "c3"},
+            "c3": {Direction.WEST: "c2"}
+        }
+        self.rooms = {room_id: Room(id=room_id, name=room_id, description="", exits=exits)
+                      for room_id, exits in layout.items()}
+        self.rooms["c3"] = replace(self.rooms["c3"], guardian=Guardian(name="Sentinel", health=50, attack=5, defense=5))
+    
+    def guardian_room(self, tower):
+        return next(room_id for room_id, room in tower.world.rooms.items() if room.guardian)
+    
+    def test_zone_map(self):
+        """Test that same-floor rooms share a zone and stairs link zones."""
+        zones = build_zone_map(self.rooms)
+        self.assertEqual(len(zones.rooms_in), 3)
+        self.assertEqual(zones.zone_of["a1"], zones.zone_of["a2"])
+        self.assertNotEqual(zones.zone_of["a2"], zones.zone_of["b1"])
+        a, c = zones.zone_of["a1"], zones.zone_of["c1"]
+        self.assertNotIn(c, zones.zones_within([a], 1))
+        self.assertIn(c, zones.zones_within([a], 2))
+    
+    def test_dormant_zones_fast_forward(self):
+        """Test that far guardians park and catch up when a player approaches."""
+        tower = SharedTower(self.rooms, {}, {}, interest_radius=1)
+        tower.join("hero", start_room="a1")
+        for _ in range(3):
+            tower.tick()
+        self.assertEqual(self.guardian_room(tower), "c3")
+        self.assertTrue(tower.scheduler.is_parked(tower.scheduler.zones.zone_of["c3"]))
+        
+        # Climbing one floor wakes the top floor, which catches up at once
+        tower.command("hero", "go east")
+        tower.command("hero", "go up")
+        tower.tick()
+        self.assertIn(self.guardian_room(tower), ("b2", "b1"))
+    
+    def test_catch_up_budget(self):
+        """Test that catch-up steps are capped per tick and the rest is owed to later ticks."""
+        tower = SharedTower(self.rooms, {}, {}, interest_radius=1)
+        tower.scheduler.catch_up_steps = 1
+        tower.join("hero", start_room="a1")
+        for _ in range(3):
+            tower.tick()
+        tower.command("hero", "go east")
+        tower.command("hero", "go up")
+        tower.tick()
+        self.assertEqual(self.guardian_room(tower), "c1")
+        top = tower.scheduler.zones.zone_of["c3"]
+        for _ in range(2):
+            self.assertTrue(tower.scheduler.is_parked(top))
+            tower.tick()
+        self.assertFalse(tower.scheduler.is_parked(top))
+
+class TestSessions(unittest.TestCase):
+    def setUp(self):
+        """Set up shared content for headless sessions."""
+        result = load_game_data()
+        self.assertIsNone(result.error)
+        self.content = result.value
+    
+    def test_session_table(self):
+        """Test running independent sessions over shared content."""
+        table = SessionTable(*self.content)
+        self.assertIn("Tower Entrance", table.open("a"))
+        table.open("b")
+        response, finished = table.command("a", "take tome_basic")
+        self.assertIn("You take", response)
+        self.assertFalse(finished)
+        self.assertEqual(table.sessions["b"].player.inventory, [])
+        self.assertEqual(table.close("a")["player"]["inventory"], ["tome_basic"])
+        self.assertEqual(len(table), 1)
+    
+    def test_sessions_schedule_guardians_by_zone(self):
+        """Test that session turns only simulate guardians on floors near the player."""
+        table = SessionTable(*self.content)
+        table.open("a")
+        table.open("b")
+        table.command("a", "go north")
+        self.assertIsNotNone(table.sessions["a"].rooms["laboratory"].guardian)
+        self.assertIs(table._guardians("a").zones, table._guardians("b").zones)
+        with mock.patch("zones.build_zone_map") as built:
+            table.open("c")
+            table.command("c", "look")
+        built.assert_not_called()
+    
+    def test_zygote_pool(self):
+        """Test sessions served by workers forked from a warm zygote."""
+        pool = ZygotePool(workers=2, loader=lambda: Result.success(self.content)).start()
+        self.addCleanup(pool.close)
+        self.assertEqual(len(pool.workers), 2)
+        
+        for session_id in ("a", "b"):
+            self.assertIn("Tower Entrance", pool.open_session(session_id).value)
+        self.assertEqual({w.sessions for w in pool.workers}, {1})
+        
+        result = pool.command("a", "go north")
+        self.assertIn("Grand Lobby", result.value[0])
+        self.assertIsNotNone(pool.command("missing", "look").error)
+        self.assertEqual(pool.close_session("a").value["player"]["current_room"], "lobby")
+    
+    def test_session_export_restore(self):
+        """Test shipping a session, including changed rooms, to another table."""
+        source, target = SessionTable(*self.content), SessionTable(*self.content)
+        source.open("a")
+        source.command("a", "take tome_basic")
+        target.restore("a", source.export("a"))
+        self.assertNotIn("a", source.sessions)
+        self.assertEqual(target.sessions["a"].rooms["entrance"].items, [])
+        self.assertIs(target.sessions["a"].rooms["lobby"], self.content[0]["lobby"])
+    
+    def test_session_hibernation(self):
+        """Test hibernating idle sessions to compact deltas and resuming them transparently."""
+        table = SessionTable(*self.content, idle_after=60)
+        table.open("a")
+        table.open("b")
+        table.command("a", "take tome_basic; go north")
+        live = table.memory_bytes("a")
+        self.assertGreater(live, table.memory_bytes("b"))
+        
+        self.assertEqual(table.hibernate_idle(now=time.monotonic() + 120), 2)
+        self.assertEqual((table.resident_bytes(), len(table)), (0, 2))
+        self.assertLess(table.memory_bytes("a"), live / 4)
+        
+        self.assertIn("Basic Spell Tome", table.command("a", "inventory")[0])
+        state = table.sessions["a"]
+        self.assertEqual(state.player.current_room, "lobby")
+        self.assertEqual(state.rooms["entrance"].items, [])
+        self.assertIs(state.rooms["lobby"], self.content[0]["lobby"])
+        self.assertIs(state.puzzle_index, GameState.new_game(*self.content).puzzle_index)
+        self.assertIn("b", table.hibernated)
+        self.assertEqual(table.close("b")["player"]["current_room"], "entrance")
+    
+    def test_idle_sessions_swept_on_timer(self):
+        """Test that the server's sweeper hibernates idle sessions without any traffic."""
+        table = SessionTable(*self.content, idle_after=0.05)
+        table.open("a")
+        
+        async def scenario():
+            sweeper = asyncio.create_task(sweep_sessions(table, 0.02))
+            await asyncio.sleep(0.2)
+            sweeper.cancel()
+        
+        asyncio.run(scenario())
+        self.assertIn("a", table.hibernated)
+        self.assertEqual(table.resident_bytes(), 0)
+    
+    def test_resident_memory_cap(self):
+        """Test hibernating the least recently active sessions past the memory cap."""
+        table = SessionTable(*self.content, max_resident_bytes=5000)
+        for session_id in "abcd":
+            table.open(session_id)
+            table.command(session_id, "take tome_basic")
+        self.assertGreater(table.sweep(), 0)
+        self.assertLessEqual(table.resident_bytes(), 5000)
+        self.assertIn("d", table.sessions)
+        self.assertIn("a", table.hibernated)
+        table.command("a", "look")
+        self.assertIn("a", table.sessions)
+        table.sweep()
+        self.assertLessEqual(table.resident_bytes(), 5000)
+    
+    def test_memory_measured_lazily(self):
+        """Test that a session's rooms are only re-measured when its rooms dict changed."""
+        table = SessionTable(*self.content)
+        table.open("a")
+        table.command("a", "take tome_basic")
+        with mock.patch("sessions.rooms_bytes", wraps=rooms_bytes) as measured:
+            for _ in range(5):
+                table.command("a", "look")
+            first = table.memory_bytes("a")
+            table.command("a", "go north")
+            self.assertEqual(table.memory_bytes("a"), first)
+            self.assertEqual(measured.call_count, 1)
+    
+    def test_shard_router(self):
+        """Test hashing sessions to shards and migrating between them."""
+        pool = ZygotePool(workers=2, loader=lambda: Result.success(self.content))
+        router = ShardRouter(pool=pool).start()
+        self.addCleanup(router.close_all)
+        
+        async def scenario():
+            await router.open("player-1")
+            await router.command("player-1", "take tome_basic")
+            home = router.shard_for("player-1")
+            self.assertEqual(pool.workers[home].sessions, 1)
+            moved = await router.migrate("player-1", 1 - home)
+            self.assertEqual(moved.value, 1 - home)
+            self.assertEqual(router.shard_for("player-1"), 1 - home)
+            self.assertEqual(pool.workers[home].sessions, 0)
+            self.assertEqual(pool.workers[1 - home].sessions, 1)
+            response = await router.command("player-1", "inventory")
+            self.assertIn("Basic Spell Tome", response.value[0])
+            saved = await router.close("player-1")
+            self.assertEqual(saved.value["player"]["inventory"], ["tome_basic"])
+            self.assertEqual([worker.sessions for worker in pool.workers], [0, 0])
+        
+        asyncio.run(scenario())
+    
+    def test_shard_migrate_keeps_stranded_session(self):
+        """Test that a session neither shard would restore is kept for a retried migrate."""
+        pool = ZygotePool(workers=2, loader=lambda: Result.success(self.content))
+        router = ShardRouter(pool=pool).start()
+        self.addCleanup(router.close_all)
+        call = router._call
+        
+        async def failing_restore(shard, operation, session_id, argument=None):
+            if operation == "restore":
+                return Result.failure(f"shard {shard} is full")
+            return await call(shard, operation, session_id, argument)
+        
+        async def scenario():
+            await router.open("player-1")
+            await router.command("player-1", "take tome_basic")
+            home = router.shard_for("player-1")
+            with mock.patch.object(router, "_call", failing_restore):
+                moved = await router.migrate("player-1", 1 - home)
+            self.assertIn(f"shard {1 - home} is full", moved.error)
+            self.assertIn(f"shard {home} is full", moved.error)
+            self.assertEqual([worker.sessions for worker in pool.workers], [0, 0])
+            moved = await router.migrate("player-1", 1 - home)
+            self.assertEqual(moved.value, 1 - home)
+            response = await router.command("player-1", "inventory")
+            self.assertIn("Basic Spell Tome", response.value[0])
+        
+        asyncio.run(scenario())
+    
+    def test_server(self):
+        """Test the JSON lines protocol of the session server."""
+        async def scenario():
+            server = await start_server(LocalBackend(SessionTable(*self.content)), port=0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                self.assertIn("Tower Entrance", json.loads(await reader.readline())["text"])
+                writer.write(b"go north\n")
+                reply = json.loads(await reader.readline())
+                self.assertIn("Grand Lobby", reply["text"])
+                self.assertFalse(reply["finished"])
+                writer.close()
+        
+        asyncio.run(scenario())
+    
+    def test_server_shared_tower(self):
+        """Test two connections joining one shared tower through the server."""
+        backend = LocalBackend(SessionTable(*self.content))
+        
+        async def scenario():
+            server = await start_server(backend, port=0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                players = [await asyncio.open_connection("127.0.0.1", port) for _ in range(2)]
+                for reader, writer in players:
+                    await reader.readline()
+                    writer.write(b"join guild\n")
+                    self.assertIn("Tower Entrance", json.loads(await reader.readline())["text"])
+                (alice_reader, alice), (bob_reader, bob) = players
+                alice.write(b"take tome_basic\n")
+                self.assertIn("You take", json.loads(await alice_reader.readline())["text"])
+                # Bob shares Alice's world, so the tome is gone for him too
+                bob.write(b"take tome_basic\n")
+                self.assertNotIn("You take", json.loads(await bob_reader.readline())["text"])
+                bob.write(b"inventory\n")
+                self.assertIn("empty", json.loads(await bob_reader.readline())["text"])
+                for _, writer in players:
+                    writer.close()
+                await asyncio.sleep(0.05)
+        
+        asyncio.run(scenario())
+        self.assertEqual(backend.towers.towers, {})
+        self.assertEqual(len(backend.table), 0)
+    
+    def test_state_diff(self):
+        """Test that diffs carry only changed player stats, room items and guardian positions."""
+        state = GameState.new_game(*self.content)
+        self.assertEqual(state_diff(state, state), {})
+        taken, _ = take_item(state, "tome_basic")
+        diff = state_diff(state, taken)
+        self.assertEqual(diff["player"], {"inventory": ["tome_basic"]})
+        self.assertEqual(diff["rooms"], {"entrance": {"items": []}})
+    
+    def test_websocket_bridge(self):
+        """Test the handshake, the initial snapshot and a per-turn diff."""
+        def client_frame(text):
+            payload, mask = text.encode(), b"\x01\x02\x03\x04"
+            return bytes([0x81, 0x80 | len(payload)]) + mask + bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        
+        async def read_message(reader):
+            header = await reader.readexactly(2)
+            length = header[1] if header[1] < 126 else int.from_bytes(await reader.readexactly(2), "big")
+            return json.loads(await reader.readexactly(length))
+        
+        async def scenario():
+            server = await start_bridge(SessionTable(*self.content), port=0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(b"GET / HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                             b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\n\r\n")
+                self.assertIn(b"s3pPLMBiTxaQ9kYGzzhZRbK+xOo=", await reader.readuntil(b"\r\n\r\n"))
+                opened = await read_message(reader)
+                self.assertEqual(opened["state"]["player"]["room"], "entrance")
+                writer.write(client_frame("go north"))
+                reply = await read_message(reader)
+                self.assertIn("Grand Lobby", reply["text"])
+                self.assertEqual(reply["diff"]["player"], {"room": "lobby"})
+                # The pursuing guardian two floors up is parked, so no room changed
+                self.assertNotIn("rooms", reply["diff"])
+                writer.write(bytes([0x88, 0x80]) + b"\x00" * 4)
+                await reader.read()
+                writer.close()
+        
+        asyncio.run(scenario())
+    
+    def test_websocket_origin(self):
+        """Test that only local pages and configured origins may open a browser session."""
+        self.assertTrue(all(origin_allowed(origin) for origin in
+                            [None, "null", "file://", "http://localhost:8000", "http://127.0.0.1", "http://[::1]:3000"]))
+        self.assertFalse(origin_allowed("http://localhost.evil.example"))
+        self.assertTrue(origin_allowed("https://tower.example", {"https://tower.example"}))
+        
+        async def handshake(port, origin):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET / HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                         b"Origin: " + origin + b"\r\nSec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n\r\n")
+            status = await reader.readline()
+            writer.close()
+            return status
+        
+        async def scenario():
+            table = SessionTable(*self.content)
+            server = await start_bridge(table, port=0, allowed_origins=["https://Tower.example/"])
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                self.assertIn(b"403", await handshake(port, b"https://evil.example"))
+                self.assertIn(b"101", await handshake(port, b"https://tower.example"))
+                self.assertIn(b"101", await handshake(port, b"null"))
+        
+        asyncio.run(scenario())
+    
+    def test_accept_key(self):
+        """Test the RFC 6455 handshake example."""
+        self.assertEqual(accept_key("dGhlIHNhbXBsZSBub25jZQ=="), "s3pPLMBiTxaQ9kYGzzhZRbK+xOo=")
+
+class TestLoadTest(unittest.TestCase):
+    def setUp(self):
+        """Set up shared content for the server under load."""
+        result = load_game_data()
+        self.assertIsNone(result.error)
+        self.content = result.value
+    
+    def test_load_test(self):
+        """Test simulated players against an in-process server."""
+        items = list(self.content[1])
+        async def scenario():
+            server = await start_server(LocalBackend(SessionTable(*self.content)), port=0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                test = LoadTest("127.0.0.1", port, 5, lambda rng: MarkovPlayer(rng, items))
+                return await test.run(0.3, interval=0.1)
+        
+        total = asyncio.run(scenario())
+        self.assertGreater(total.turns, 0)
+        self.assertEqual(total.errors, 0)
+        self.assertLessEqual(total.p50, total.p99)
+        self.assertLessEqual(total.p99, total.p999)
+    
+    def test_load_test_players(self):
+        """Test the Markov and recorded-script command sources and percentiles."""
+        first, second = MarkovPlayer(random.Random(1), ["tome_basic"]), MarkovPlayer(random.Random(1), ["tome_basic"])
+        commands = [first.next_command() for _ in range(50)]
+        self.assertEqual(commands, [second.next_command() for _ in range(50)])
+        self.assertTrue(all(c.split()[0] in ("go", "look", "take", "use", "cast", "status", "inventory")
+                            for c in commands))
+        player = ScriptPlayer(random.Random(1), ["look", "go north"])
+        self.assertEqual({player.next_command() for _ in range(4)}, {"look", "go north"})
+        self.assertEqual(percentile(list(range(1000)), 0.999), 998)
+        self.assertEqual(percentile(list(range(100)), 0.5), 49)
+        self.assertEqual(percentile([1.0, 2.0], 0.0), 1.0)
+        self.assertEqual(percentile([1.0, 2.0], 1.0), 2.0)
+
+class TestSqliteSaveStore(unittest.TestCase):
+    def setUp(self):
+        """Set up a store in a scratch directory."""
+        result = load_game_data()
+        self.assertIsNone(result.error)
+        self.content = result.value
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = SqliteSaveStore(str(Path(self.tmp.name) / "saves.db"), user="alice", content=self.content)
+        self.addCleanup(self.store.close)
+        self.state = GameState.new_game(*self.content)
+    
+    def test_save_and_load(self):
+        """Test the save_game_state/load_game_state Result API."""
+        state, _ = take_item(self.state, "tome_basic")
+        self.assertIsNone(self.store.save_game_state(state, "slot1").error)
+        loaded = self.store.load_game_state("slot1")
+        self.assertEqual(loaded.value.player.inventory, ["tome_basic"])
+        
+        # Slots are per user, and overwriting keeps one row per slot
+        self.assertIsNotNone(self.store.load_game_state("slot1", user="bob").error)
+        self.store.save_game_state(self.state, "slot1")
+        self.assertEqual(self.store.load_game_state("slot1").value.player.inventory, [])
+        self.assertEqual(len(self.store.list_slots().value), 1)
+    
+    def test_batched_writes_and_cleanup(self):
+        """Test batching saves into one transaction and age-based cleanup."""
+        with self.store.batch():
+            for i in range(5):
+                self.store.save_game_state(self.state, f"slot{i}")
+            self.assertEqual(self.store.list_slots().value, [])
+        self.assertEqual(len(self.store.list_slots().value), 5)
+        
+        self.store.save_many([("bob", "auto", self.state)])
+        self.assertEqual(self.store.delete_older_than(time.time() + 1).value, 6)
+    
+    def test_batch_isolation(self):
+        """Test that batches only hold their own thread's saves and are dropped on errors."""
+        with self.assertRaises(RuntimeError), self.store.batch():
+            self.store.save_game_state(self.state, "lost")
+            raise RuntimeError("boom")
+        self.assertEqual(self.store.list_slots().value, [])
+        
+        with self.store.batch():
+            self.store.save_game_state(self.state, "batched")
+            other = threading.Thread(target=self.store.save_game_state, args=(self.state, "direct"))
+            other.start()
+            other.join()
+            self.assertEqual([slot for slot, _ in self.store.list_slots().value], ["direct"])
+        self.assertEqual(len(self.store.list_slots().value), 2)
+
+class TestSaveMigration(unittest.TestCase):
+    def setUp(self):
+        """Set up legacy (unversioned) save data and a scratch directory."""
+        result = load_game_data()
+        self.assertIsNone(result.error)
+        self.content = result.value
+        state, _ = take_item(GameState.new_game(*self.content), "tome_basic")
+        self.legacy = {key: value for key, value in state.to_dict().items() if key != "version"}
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+    
+    def test_versioned_saves(self):
+        """Test that saves carry a version and legacy saves still load."""
+        self.assertEqual(GameState.new_game(*self.content).to_dict()["version"], SAVE_VERSION)
+        self.assertEqual(migrate_save(self.legacy)["version"], SAVE_VERSION)
+        state = GameState.from_dict(self.legacy, *self.content)
+        self.assertEqual(state.player.inventory, ["tome_basic"])
+        with self.assertRaises(ValueError):
+            migrate_save({**self.legacy, "version": SAVE_VERSION + 1})
+    
+    def test_migrate_directory_resumes(self):
+        """Test migrating save files in shards and batches, resuming from the checkpoint."""
+        saves = self.dir / "saves"
+        saves.mkdir()
+        for n in range(25):
+            (saves / f"save{n:02}.json").write_text(json.dumps(self.legacy))
+        (saves / "unreadable.json").write_text("{")
+        checkpoint = self.dir / "checkpoint.json"
+        
+        # Interrupt an earlier run when it reaches the third shard
+        def interrupted(directory, shard, *args):
+            if shard == 2:
+                raise KeyboardInterrupt
+            return save_files(directory, shard, *args)
+        with mock.patch("migrate_saves.save_files", interrupted), self.assertRaises(KeyboardInterrupt):
+            migrate_directory(saves, checkpoint, workers=2, batch_size=4, shards=4)
+        shard, name = json.loads(checkpoint.read_text())["cursor"]
+        self.assertEqual(shard, 1)
+        self.assertEqual(name, max(path.name for path in saves.iterdir() if name_shard(path.name, 4) == 1))
+        
+        resumed = migrate_directory(saves, checkpoint, workers=2, batch_size=4, shards=4)
+        self.assertEqual(resumed.counts, {"migrated": 25, "current": 0, "failed": 1})
+        self.assertTrue(resumed.failures[0].startswith("unreadable.json"))
+        self.assertEqual(json.loads((saves / "save24.json").read_text())["version"], SAVE_VERSION)
+        self.assertFalse(checkpoint.exists())
+        
+        # A completed run starts over, and so do ones checkpointed for another save format or shard count
+        self.assertEqual(migrate_directory(saves, checkpoint, workers=2).counts["current"], 25)
+        checkpoint.write_text(json.dumps({"source": str(saves.resolve()), "target": SAVE_VERSION - 1,
+                                          "shards": 64, "cursor": [63, "save24.json"]}))
+        self.assertEqual(migrate_directory(saves, checkpoint, workers=2).counts["current"], 25)
+        checkpoint.write_text(json.dumps({"source": str(saves.resolve()), "target": SAVE_VERSION,
+                                          "shards": 4, "cursor": [3, "save24.json"]}))
+        self.assertEqual(migrate_directory(saves, checkpoint, workers=2).counts["current"], 25)
+    
+    def test_migrate_only_saves(self):
+        """Test that JSON files that are not saves, and the checkpoint itself, are left alone."""
+        (self.dir / "save.json").write_text(json.dumps(self.legacy))
+        package = {"name": "tower", "version": "1.0", "player": "none"}
+        (self.dir / "package.json").write_text(json.dumps(package))
+        checkpoint = self.dir / "migration.checkpoint.json"
+        with mock.patch("migrate_saves.Checkpoint.finish"):
+            report = migrate_directory(self.dir, checkpoint, workers=2, shards=1)
+        self.assertEqual(report.counts, {"migrated": 1, "current": 0, "failed": 1})
+        self.assertIn("not a saved game", report.failures[0])
+        self.assertEqual(json.loads((self.dir / "package.json").read_text()), package)
+        self.assertEqual(json.loads(checkpoint.read_text())["cursor"], [0, "save.json"])
+    
+    def test_migrate_store(self):
+        """Test migrating a SQLite save store page by page."""
+        database = str(self.dir / "saves.db")
+        store = SqliteSaveStore(database, content=self.content)
+        store._write([(f"user{n % 3}", f"slot{n}", 0.0, json.dumps(self.legacy)) for n in range(10)])
+        store.close()
+        
+        report = migrate_store(database, self.dir / "checkpoint.json", workers=2, batch_size=3)
+        self.assertEqual(report.counts["migrated"], 10)
+        store = SqliteSaveStore(database, user="user1", content=self.content)
+        self.addCleanup(store.close)
+        self.assertEqual(store.load_game_state("slot1").value.player.inventory, ["tome_basic"])
+
+class TestContentReload(unittest.TestCase):
+    def setUp(self):
+        """Copy the shipped content into a scratch directory we can edit."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.data_dir = Path(self.tmp.name)
+        for path in Path("data").glob("*.json"):
+            shutil.copy(path, self.data_dir / path.name)
+        self.watcher = ContentWatcher(self.data_dir)
+    
+    def edit_rooms(self, edit):
+        path = self.data_dir / "rooms.json"
+        rooms = json.loads(path.read_text())
+        edit(rooms)
+        path.write_text(json.dumps(rooms))
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    
+    def test_reload_shares_unchanged_objects(self):
+        """Test that only edited entries are re-parsed."""
+        old = self.watcher.current
+        self.assertFalse(self.watcher.poll())
+        self.edit_rooms(lambda rooms: rooms["library"].update(description="Dusty shelves."))
+        self.assertTrue(self.watcher.poll())
+        new = self.watcher.current
+        self.assertEqual(new.number, old.number + 1)
+        self.assertEqual(new.rooms["library"].description, "Dusty shelves.")
+        self.assertIs(new.rooms["lobby"], old.rooms["lobby"])
+        self.assertIs(new.items, old.items)
+    
+    def test_broken_edit_keeps_current_version(self):
+        """Test that invalid content is reported and not published."""
+        errors = []
+        self.watcher.on_error = errors.append
+        old = self.watcher.current
+        (self.data_dir / "spells.json").write_text("{ not json")
+        self.assertFalse(self.watcher.poll())
+        self.assertFalse(self.watcher.poll())
+        self.assertIs(self.watcher.current, old)
+        self.assertEqual(len(errors), 1)
+    
+    def test_removed_content_leaves_sessions(self):
+        """Test that items and spells removed from the content are dropped from live sessions."""
+        table = SessionTable(*self.watcher.current.as_tuple(), watcher=self.watcher)
+        table.open("a")
+        table.command("a", "take tome_basic")
+        path = self.data_dir / "items.json"
+        items = json.loads(path.read_text())
+        del items["tome_basic"]
+        path.write_text(json.dumps(items))
+        path = self.data_dir / "spells.json"
+        spells = json.loads(path.read_text())
+        del spells["fireball"]
+        path.write_text(json.dumps(spells))
+        self.assertTrue(self.watcher.poll())
+        
+        self.assertEqual(table.command("a", "inventory")[0], "\nYour inventory is empty.")
+        self.assertNotIn("Fireball", table.command("a", "status")[0])
+    
+    def test_sessions_move_at_turn_boundary(self):
+        """Test that live sessions adopt new content and keep their progress."""
+        table = SessionTable(*self.watcher.current.as_tuple(), watcher=self.watcher)
+        table.open("a")
+        table.command("a", "take tome_basic")
+        self.edit_rooms(lambda rooms: rooms["entrance"].update(name="Old Gate"))
+        self.watcher.poll()
+        
+        response, _ = table.command("a", "look")
+        self.assertIn("Old Gate", response)
+        self.assertEqual(table.sessions["a"].rooms["entrance"].items, [])
+        self.assertIs(table.sessions["a"].rooms["lobby"], self.watcher.current.rooms["lobby"])
+
+class TestContentLint(unittest.TestCase):
+    def setUp(self):
+        """Copy the shipped content into a scratch directory we can break."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.data_dir = Path(self.tmp.name)
+        for path in Path("data").glob("*.json"):
+            shutil.copy(path, self.data_dir / path.name)
+    
+    def edit(self, filename, edit):
+        path = self.data_dir / filename
+        data = json.loads(path.read_text())
+        edit(data)
+        path.write_text(json.dumps(data))
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    
+    def messages(self, report):
+        return {(f.entry, f.message) for f in report.findings}
+    
+    def test_shipped_content_is_clean(self):
+        """Test that the shipped tower has no findings."""
+        result = lint_content(Path("data"))
+        self.assertIsNone(result.error)
+        self.assertEqual(result.value.findings, [])
+    
+    def test_malformed_entries(self):
+        """Test that wrongly typed exits, items, puzzles and effects are findings, not crashes."""
+        def break_rooms(rooms):
+            rooms["garden"]["exits"] = ["north"]
+            rooms["lobby"]["items"] = "tome_basic"
+            rooms["library"]["puzzle"] = ["tome_basic"]
+        self.edit("rooms.json", break_rooms)
+        self.edit("items.json", lambda items: items["health_potion"].update(
+            effects=["heal", {"kind": "teach_spell", "spell": ["x"]}, {"kind": "levitate"}]))
+        result = lint_content(self.data_dir)
+        self.assertIsNone(result.error)
+        messages = self.messages(result.value)
+        self.assertTrue({("garden", "exits is not an object"), ("lobby", "items is not a list"),
+                         ("library", "puzzle is not an object"),
+                         ("health_potion", "effect 'heal' is not an object"),
+                         ("health_potion", "teaches unknown spell ['x']"),
+                         ("health_potion", "unknown effect kind 'levitate'")} <= messages)
+        self.assertIn(("garden", "dead end: no exits"), messages)
+    
+    def test_referential_and_graph_findings(self):
+        """Test broken references, unreachable rooms, one-way exits and dead ends."""
+        def break_rooms(rooms):
+            rooms["lobby"]["exits"]["west"] = "vault"
+            rooms["lobby"]["items"].append("ghost_orb")
+            rooms["library"]["puzzle"]["reward"] = "teleport"
+            rooms["garden"]["exits"] = {}
+            rooms["attic"] = dict(rooms["garden"], id="attic", exits={"down": "entrance"})
+        self.edit("rooms.json", break_rooms)
+        
+        report = lint_content(self.data_dir).value
+        findings = self.messages(report)
+        self.assertIn(("lobby", "exit 'west' leads to unknown room 'vault'"), findings)
+        self.assertIn(("lobby", "holds unknown item 'ghost_orb'"), findings)
+        self.assertIn(("library", "puzzle rewards unknown spell 'teleport'"), findings)
+        self.assertIn(("garden", "dead end: no exits"), findings)
+        self.assertIn(("entrance", "one-way exit to 'garden'"), findings)
+        self.assertIn(("attic", "unreachable from 'entrance'"), findings)
+        self.assertEqual(len(report.errors), 3)
+    
+    def test_incremental_revalidation(self):
+        """Test that only changed entries are re-checked."""
+        report = lint_content(self.data_dir).value
+        self.assertEqual(report.checked, 18)
+        self.assertEqual(lint_content(self.data_dir, report).value.checked, 0)
+        
+        self.edit("rooms.json", lambda rooms: rooms["library"]["items"].append("ghost_orb"))
+        second = lint_content(self.data_dir, report).value
+        self.assertEqual(second.checked, 1)
+        self.assertIs(second.graph_findings, report.graph_findings)
+        self.assertEqual(self.messages(second), {("library", "holds unknown item 'ghost_orb'")})
+        
+        # Removing a spell re-checks everything that can refer to spells
+        self.edit("spells.json", lambda spells: spells.pop("time_stop"))
+        third = lint_content(self.data_dir, second).value
+        self.assertIn(("spell_scroll", "teaches unknown spell 'time_stop'"), self.messages(third))
+    
+    def test_parallel_checks(self):
+        """Test that entries checked across processes give the same findings."""
+        self.edit("rooms.json", lambda rooms: rooms["lobby"]["items"].append("ghost_orb"))
+        with mock.patch("lint.PARALLEL_THRESHOLD", 1), mock.patch("lint.CHUNK_SIZE", 2):
+            parallel = lint_content(self.data_dir, workers=2).value
+        self.assertEqual(self.messages(parallel), self.messages(lint_content(self.data_dir).value))
+    
+    def test_strongly_connected_components(self):
+        """Test Tarjan's components on a small graph."""
+        component = strongly_connected_components({"a": ["b"], "b": ["a", "c"], "c": ["d"], "d": ["c"], "e": []})
+        self.assertEqual(component["a"], component["b"])
+        self.assertEqual(component["c"], component["d"])
+        self.assertEqual(len(set(component.values())), 3)
+
+class TestBatchedCommands(unittest.TestCase):
+    def setUp(self):
+        """Set up a new game on the shipped content."""
+        result = load_game_data()
+        self.assertIsNone(result.error)
+        self.state = GameState.new_game(*result.value)
+    
+    def test_split_commands(self):
+        """Test splitting chained commands."""
+        self.assertEqual(split_commands("go north; take tome_basic;;  go up "),
+                         ["go north", "take tome_basic", "go up"])
+        self.assertEqual(split_commands(" ; "), [])
+    
+    def test_run_batch(self):
+        """Test running a chain of commands in one call."""
+        state, messages, finished = run_batch(self.state, ["take tome_basic", "go north", "inventory"])
+        self.assertEqual(state.player.current_room, "lobby")
+        self.assertEqual(len(messages), 3)
+        self.assertFalse(finished)
+        
+        # Execution stops at game over
+        dying = replace(self.state, player=self.state.player.update_health(0))
+        state, messages, finished = run_batch(dying, ["look", "go north"])
+        self.assertTrue(finished)
+        self.assertEqual(state.player.current_room, "entrance")
+    
+    def test_process_game_turn_prints_once(self):
+        """Test that a chained line produces one combined response."""
+        history = StateHistory()
+        with mock.patch("main.print_message") as printed:
+            state, finished = process_game_turn(self.state, "take tome_basic; go north", history)
+        self.assertEqual(printed.call_count, 1)
+        self.assertIn("You take", printed.call_args[0][0])
+        self.assertIn("Grand Lobby", printed.call_args[0][0])
+        self.assertEqual(state.player.current_room, "lobby")
+        
+        # The whole line is undone as one step, and the message says so
+        with mock.patch("main.print_message") as printed:
+            state, _ = process_game_turn(state, "undo", history)
+        self.assertIs(state, self.state)
+        self.assertIn("before your last command line", printed.call_args[0][0])
+
+class TestTerminalRenderer(unittest.TestCase):
+    def test_buffers_until_flush(self):
+        """Test that output is written with a single call per flush."""
+        stream = mock.Mock(wraps=io.StringIO())
+        stream.isatty.return_value = False
+        renderer = TerminalRenderer(stream)
+        renderer.write("Tower Entrance")
+        renderer.write("You take the Basic Spell Tome.")
+        stream.write.assert_not_called()
+        renderer.flush()
+        stream.write.assert_called_once_with("Tower Entrance\nYou take the Basic Spell Tome.\n")
+    
+    def test_non_tty_fast_path(self):
+        """Test that piped output carries no escape sequences."""
+        stream = io.StringIO()
+        renderer = TerminalRenderer(stream)
+        renderer.clear()
+        renderer.write(renderer.style("Grand Lobby", "1"))
+        renderer.flush()
+        self.assertEqual(stream.getvalue(), "Grand Lobby\n")
+    
+    def test_tty_escapes(self):
+        """Test ANSI clear and colour on a terminal."""
+        stream = io.StringIO()
+        stream.isatty = lambda: True
+        renderer = TerminalRenderer(stream, color=True)
+        renderer.clear()
+        renderer.write(renderer.style("Grand Lobby", "1", "36"))
+        renderer.flush()
+        self.assertEqual(stream.getvalue(), CLEAR_SCREEN + "\x1b[1;36mGrand Lobby\x1b[0m\n")
+
+class TestGherkinRunner(unittest.TestCase):
+    FEATURE = """
+Feature: Tower basics
+  Background:
+    Given I am a novice wizard
+    And I am standing at the tower entrance
+
+  Scenario: Walking in
+    When I go north
+    Then I should enter the Grand Lobby
+
+  Scenario: Wrong turn
+    When I go north
+    Then I should enter the Arcane Library
+
+  Scenario: Dodging
+    When a hazard is triggered
+    Then I should dodge it
+"""
+    
+    def test_parse_feature(self):
+        """Test that Background and And steps are parsed with their keywords."""
+        feature = parse_feature(self.FEATURE)
+        self.assertEqual(feature.name, "Tower basics")
+        self.assertEqual([s.keyword for s in feature.background], ["Given", "Given"])
+        self.assertEqual([s.name for s in feature.scenarios], ["Walking in", "Wrong turn", "Dodging"])
+    
+    def test_run_feature(self):
+        """Test pass, fail and undefined results, serially and across processes."""
+        feature = parse_feature(self.FEATURE)
+        for workers in (1, 2):
+            results = run_feature(feature, workers)
+            self.assertEqual([r.status for r in results], ["passed", "failed", "undefined"])
+            self.assertIn("Arcane Library", results[1].detail)
+            self.assertIn("line 16", results[2].detail)
+    
+    def test_shipped_feature(self):
+        """Test that the whole shipped feature file runs without failures."""
+        feature = parse_feature(Path("features/tower_trial.feature").read_text())
+        results = run_feature(feature, 2)
+        self.assertEqual(len(results), 21)
+        self.assertEqual([r.name for r in results if r.status == "failed"], [])
+        self.assertEqual([r.name for r in results if r.status == "passed"], [
+            "Moving between rooms", "Attempting invalid movement", "Learning new spells",
+            "Guardian pursuit behavior"])
+        managing = next(r for r in results if r.name == "Managing inventory")
+        self.assertIn("potion should be removed", managing.detail)
+    
+    def test_step_definitions(self):
+        """Test the steps of shipped scenarios that stop at a step the engine has no behaviour for."""
+        feature = parse_feature("""
+Feature: Steps
+  Background:
+    Given I have 100 mana points
+    And I know the fireball spell
+
+  Scenario: Fighting
+    Given I am in the Grand Lobby
+    And I encounter the Guardian of the Gate
+    When I cast fireball at the guardian
+    Then the guardian should take damage
+    And my mana should decrease by 20
+    When I defeat the guardian
+    Then I should receive a victory message
+    And the path upward should be revealed
+
+  Scenario: Studying
+    Given I am in the Arcane Library
+    And I have the basic spell tome
+    And I have the advanced spell tome
+    When I use the basic spell tome
+    And I use the advanced spell tome
+    Then I should learn the shield spell
+
+  Scenario: Resting
+    Given I have 50 health points
+    And I have the health potion
+    When I use the health potion
+    Then my health should increase by 30
+    When I check my status
+    Then I should see my current health and mana
+    And I should see my current location
+    And I should see my known spells
+""")
+        results = run_feature(feature, 1)
+        self.assertEqual([r.status for r in results], ["passed"] * 3, [r.detail for r in results])
+    
+    def test_room_with_items(self):
+        """Test that "a room with items" is the room holding the item taken next."""
+        feature = parse_feature("""
+Feature: Items
+  Scenario: Finding a potion
+    Given I am in a room with items
+    When I take a health potion
+    Then it should be added to my inventory
+""")
+        self.assertEqual([r.status for r in run_feature(feature, 1)], ["passed"])
+
+class TestFuzzer(unittest.TestCase):
+    def setUp(self):
+        """Set up a fresh game over the shipped content."""
+        result = load_game_data()
+        self.assertIsNone(result.error)
+        self.state = GameState.new_game(*result.value)
+    
+    def test_fuzz_finds_no_crashes(self):
+        """Test a short coverage-guided run over the engine."""
+        report = fuzz(self.state, seconds=0.3, workers=1, round_seconds=0.3)
+        self.assertGreater(report.turns, 0)
+        self.assertGreater(report.arcs, 0)
+        self.assertEqual(report.crashes, ())
+    
+    def test_fuzz_with_spawned_workers(self):
+        """Test that workers started without fork still receive the initial state."""
+        with mock.patch("multiprocessing.get_all_start_methods", return_value=["spawn"]):
+            report = fuzz(self.state, seconds=0.3, workers=1, round_seconds=0.3)
+        self.assertGreater(report.turns, 0)
+    
+    def test_shrink(self):
+        """Test that a crashing script is reduced to the commands and words that matter."""
+        def fragile_use(state, args):
+            if state.player.has_item("tome_basic"):
+                raise ZeroDivisionError("boom")
+            return state, "Nothing happens."
+        
+        script = ("look", "take tome_basic", "go north", "hint", "use the tome on guardian", "status")
+        with mock.patch.dict("game_engine.COMMAND_HANDLERS", {"use": fragile_use}):
+            _, crash = run_script(self.state, script)
+            self.assertEqual(crash.signature[0], "ZeroDivisionError")
+            self.assertEqual(shrink(self.state, crash).script, ("take tome_basic", "use"))
+
+class TestNameIndex(unittest.TestCase):
+    def setUp(self):
+        """Set up an index over the shipped item names and a new game."""
+        result = load_game_data()
+        self.assertIsNone(result.error)
+        self.state = GameState.new_game(*result.value)
+        self.index = self.state.name_index.items
+    
+    def test_resolve(self):
+        """Test exact, partial, misspelled, ambiguous and out-of-scope references."""
+        tomes = ["tome_basic", "tome_advanced"]
+        potions = ["health_potion", "mana_potion"]
+        self.assertEqual(self.index.resolve("Basic Spell Tome", tomes), "tome_basic")
+        self.assertEqual(self.index.resolve("tome_advanced", tomes), "tome_advanced")
+        self.assertEqual(self.index.resolve("the advanced tome", tomes), "tome_advanced")
+        self.assertEqual(self.index.resolve("helth potion", potions), "health_potion")
+        self.assertIsNone(self.index.resolve("potion", potions))
+        self.assertIsNone(self.index.resolve("Mana Potion", ["health_potion"]))
+        self.assertIsNone(self.index.resolve("", potions))
+    
+    def test_large_scope(self):
+        """Test that big scopes use the postings and still pick the right id."""
+        names = {f"item_{n}": f"Relic {n} of the Owl" for n in range(2000)}
+        names["moon_lens"] = "Lens of the Pale Moon"
+        index = NameIndex(names)
+        self.assertEqual(index.resolve("pale moon lens", set(names)), "moon_lens")
+        self.assertEqual(index.resolve("relic 1234", set(names)), "item_1234")
+    
+    def test_commands_accept_display_names(self):
+        """Test take, examine and cast with display names and guardian names."""
+        state, messages, _ = run_batch(self.state, [
+            "take Basic Spell Tome", "examine the basic tome", "go north",
+            "cast Fireball at the Guardian of the Gate", "cast firebal gate guardian"])
+        self.assertEqual(state.player.inventory, ["tome_basic"])
+        self.assertIn("ancient tome", messages[1])
+        self.assertEqual(sum("You hit the Guardian of the Gate" in m for m in messages), 2)
+    
+    def test_multi_word_spell(self):
+        """Test that a spell name spanning several words is split from its target."""
+        state = replace(self.state, player=self.state.player.add_spell("time_stop"))
+        state, message = process_command(state, "cast time stop")
+        self.assertIn("You cast Time Stop", message)
+        self.assertIn("time_stopped", state.player.flags)
+
+class TestAnalytics(unittest.TestCase):
+    def setUp(self):
+        """Set up a new game and a scratch log directory."""
+        result = load_game_data()
+        self.assertIsNone(result.error)
+        self.state = GameState.new_game(*result.value)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+    
+    def play(self, name, line):
+        path = Path(self.tmp.name) / name
+        events = EventLog(path)
+        with mock.patch("main.print_message"):
+            process_game_turn(self.state, line, events=events)
+        events.close()
+        return path
+    
+    def test_turn_events(self):
+        """Test one structured event per regular turn."""
+        path = self.play("play.jsonl", "look; take tome_basic; go north; go west; hint; help")
+        events = list(read_events(path))
+        self.assertEqual([e["turn"] for e in events], [1, 2, 3, 4, 5])
+        self.assertEqual([e["outcome"] for e in events], ["no_effect", "changed", "moved", "no_effect", "no_effect"])
+        self.assertEqual(events[3]["room"], "lobby")
+        self.assertEqual(events[0]["handler"], "look")
+        self.assertIn("Hint:", events[4]["hint"])
+        self.assertEqual(len({e["session"] for e in events}), 1)
+    
+    def test_server_session_events(self):
+        """Test that a session table logs every session's turns to one shared log."""
+        path = Path(self.tmp.name) / "server.jsonl"
+        events = EventLog(path)
+        table = SessionTable(self.state.rooms, self.state.items, self.state.spells, events=events)
+        table.open("a")
+        table.open("b")
+        table.command("a", "take tome_basic; go north")
+        table.command("b", "look")
+        table.close("a")
+        events.close()
+        logged = [(e["session"], e["turn"], e["command"]) for e in read_events(path)]
+        self.assertEqual(logged, [("a", 1, "take tome_basic"), ("a", 2, "go north"), ("b", 1, "look")])
+        self.assertEqual(events.turns, {"b": 1})
+    
+    def test_shard_events(self):
+        """Test that each shard worker logs its sessions' turns to its own numbered log."""
+        path = Path(self.tmp.name) / "shards.jsonl"
+        content = (self.state.rooms, self.state.items, self.state.spells)
+        router = ShardRouter(pool=ZygotePool(workers=2, loader=lambda: Result.success(content), events=path)).start()
+        
+        async def scenario():
+            await router.open("player-1")
+            await router.command("player-1", "go north")
+            return router.shard_for("player-1")
+        
+        shard = asyncio.run(scenario())
+        router.close_all()
+        logged = list(read_events(worker_log_path(path, shard)))
+        self.assertEqual([(e["session"], e["command"]) for e in logged], [("player-1", "go north")])
+    
+    def test_rollups(self):
+        """Test parallel per-file rollups and the columnar file."""
+        paths = [self.play("a.jsonl", "hint; go north; go west; dance"),
+                 self.play("b.jsonl.gz", "hint; hint; go north")]
+        total = rollup_files(paths, workers=2)
+        self.assertEqual(total.room_turns, {"entrance": 5, "lobby": 2})
+        self.assertEqual(total.room_exits["entrance"], 2)
+        self.assertEqual(total.handler_turns["unknown"], 1)
+        self.assertEqual(sum(total.hint_fires.values()), 3)
+        
+        out = Path(self.tmp.name) / "rollups.wtcol"
+        write_columnar(out, total.tables())
+        rooms = read_columnar(out, "rooms", ["room", "no_effect"])
+        self.assertEqual(rooms, {"room": ["entrance", "lobby"], "no_effect": [3, 2]})
+        self.assertEqual(read_columnar(out, "hints")["fires"], [3])
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        """Set up shared content and a clean, enabled tracer."""
+        result = load_game_data()
+        self.assertIsNone(result.error)
+        self.content = result.value
+        TRACER.clear()
+        TRACER.enable()
+        self.addCleanup(TRACER.clear)
+        self.addCleanup(TRACER.disable)
+    
+    def test_turn_spans_nest(self):
+        """Test that engine stages are recorded inside their turn span."""
+        with mock.patch("main.print_message"):
+            process_game_turn(GameState.new_game(*self.content), "take tome_basic; look")
+        spans = {span.name: span for span in TRACER.spans}
+        self.assertTrue({"line", "turn", "parse", "take", "look", "guardians", "pathfind", "render"} <= set(spans))
+        
+        def inside(inner, outer):
+            return (outer.start_ns <= inner.start_ns and
+                    inner.start_ns + inner.duration_ns <= outer.start_ns + outer.duration_ns)
+        self.assertTrue(inside(spans["take"], spans["line"]))
+        self.assertTrue(inside(spans["pathfind"], spans["guardians"]))
+        self.assertEqual([s.args["command"] for s in TRACER.spans if s.name == "turn"], ["take tome_basic", "look"])
+    
+    def test_prompt_flush_span(self):
+        """Test that writing the buffered terminal output is traced apart from waiting for input."""
+        with mock.patch("builtins.input", return_value="look"), mock.patch.object(RENDERER, "stream", io.StringIO()):
+            print_message("Hello")
+            self.assertEqual(prompt("> "), "look")
+        self.assertEqual([span.name for span in TRACER.spans], ["flush"])
+    
+    @unittest.skipUnless(hasattr(signal, "SIGUSR1"), "needs SIGUSR1")
+    def test_dump_trace_on_signal(self):
+        """Test that SIGUSR1 writes the spans recorded since the previous dump."""
+        path = Path(tempfile.mkdtemp()) / "trace.json"
+        self.addCleanup(shutil.rmtree, path.parent)
+        
+        async def scenario():
+            dump_trace_on_signal(str(path))
+            with TRACER.span("turn"):
+                pass
+            os.kill(os.getpid(), signal.SIGUSR1)
+            await asyncio.sleep(0.05)
+            os.kill(os.getpid(), signal.SIGUSR1)
+            await asyncio.sleep(0.05)
+        
+        with mock.patch("builtins.print"):
+            asyncio.run(scenario())
+        first = json.loads((path.parent / "trace.1.json").read_text())["traceEvents"]
+        self.assertEqual([event["name"] for event in first], ["turn"])
+        self.assertEqual(json.loads((path.parent / "trace.2.json").read_text())["traceEvents"], [])
+    
+    def test_export_filters(self):
+        """Test exporting trace events for one session or a time window."""
+        table = SessionTable(*self.content)
+        table.open("a")
+        table.open("b")
+        table.command("a", "go north")
+        middle = time.time()
+        table.command("b", "look")
+        
+        events = TRACER.chrome_trace(session="a")["traceEvents"]
+        self.assertTrue(events)
+        self.assertEqual({e["args"]["session"] for e in events}, {"a"})
+        self.assertTrue(all(e["ph"] == "X" and e["dur"] >= 0 for e in events))
+        
+        recent = TRACER.chrome_trace(start=middle)["traceEvents"]
+        self.assertEqual({e["args"]["session"] for e in recent}, {"b"})
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "trace.json"
+            self.assertEqual(TRACER.export(path, session="b"), len(json.loads(path.read_text())["traceEvents"]))
+    
+    def test_ring_buffer(self):
+        """Test that only the newest spans are kept and disabled tracers record nothing."""
+        tracer = Tracer(capacity=3, enabled=True)
+        for i in range(5):
+            with tracer.span(f"s{i}"):
+                pass
+        self.assertEqual([s.name for s in tracer.spans], ["s2", "s3", "s4"])
+        tracer.disable()
+        with tracer.span("ignored"):
+            pass
+        self.assertEqual(len(tracer.spans), 3)
+
+class TestContentPacks(unittest.TestCase):
+    def setUp(self):
+        """Set up a packs directory with a winter tower that reskins the entrance."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+        self.winter = self.root / "winter"
+        shutil.copytree("data", self.winter)
+        self.edit_entrance("Snow drifts against the tower doors.")
+        self.registry = PackRegistry(self.root)
+        result = load_game_data()
+        self.assertIsNone(result.error)
+        self.content = result.value
+    
+    def edit_entrance(self, description):
+        path = self.winter / "rooms.json"
+        rooms = json.loads(path.read_text())
+        rooms["entrance"]["description"] = description
+        path.write_text(json.dumps(rooms))
+        # Make sure the reload sees a new file stamp
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+    
+    def test_load_game_data_directory(self):
+        """Test loading content from a directory other than data/."""
+        rooms, _, _ = load_game_data(self.winter).value
+        self.assertEqual(rooms["entrance"].description, "Snow drifts against the tower doors.")
+    
+    def test_shared_objects_and_unloading(self):
+        """Test lazy loading, sharing identical objects across packs and unloading on last release."""
+        self.assertEqual(self.registry.available(), ["tower", "winter"])
+        self.assertEqual(self.registry.loaded(), {})
+        winter = self.registry.acquire("winter").value
+        tower = self.registry.acquire("tower").value
+        again = self.registry.acquire("winter").value
+        self.assertIs(again, winter)
+        self.assertIs(winter.items, tower.items)
+        self.assertIs(winter.rooms["lobby"], tower.rooms["lobby"])
+        self.assertIsNot(winter.rooms["entrance"], tower.rooms["entrance"])
+        self.assertEqual(sorted(self.registry.loaded().values()), [1, 2])
+        
+        self.registry.release("winter", winter)
+        self.registry.release("tower", tower)
+        self.registry.release("winter", again)
+        self.assertEqual(self.registry.loaded(), {})
+        self.assertEqual((self.registry._shared, self.registry._tables), ({}, {}))
+        self.assertIn("Unknown tower pack", self.registry.acquire("summer").error)
+        self.assertIn("Invalid pack name", self.registry.acquire("../data").error)
+    
+    def test_sessions_pin_pack_versions(self):
+        """Test sessions keeping the pack version they opened with across a refresh."""
+        table = SessionTable(*self.content, packs=self.registry)
+        self.assertIn("Snow drifts", table.open("a", pack="winter"))
+        table.open("b")
+        table.command("a", "take tome_basic")
+        
+        self.edit_entrance("Spring rain patters on the tower doors.")
+        self.assertTrue(self.registry.refresh("winter").value)
+        self.assertIn("Spring rain", table.open("c", pack="winter"))
+        self.assertIn("Snow drifts", table.command("a", "look")[0])
+        self.assertEqual(len(self.registry.loaded()), 2)
+        
+        # Hibernated and exported pack sessions come back on their own pack
+        table.hibernate("a")
+        self.assertIn("Basic Spell Tome", table.command("a", "inventory")[0])
+        other = SessionTable(*self.content, packs=self.registry)
+        other.restore("c", table.export("c"))
+        self.assertIn("Spring rain", other.command("c", "look")[0])
+        
+        table.close("a")
+        other.close("c")
+        self.assertEqual(self.registry.loaded(), {})
+        self.assertNotIn("Snow", table.command("b", "look")[0])
+        with self.assertRaises(ValueError):
+            SessionTable(*self.content).open("d", pack="winter")
+    
+    def test_reopen_releases_pack(self):
+        """Test that reopening a session id releases its pack and "tower" uses the table's content."""
+        table = SessionTable(*self.content, packs=self.registry)
+        table.open("x", pack="winter")
+        table.open("x", pack="winter")
+        self.assertEqual(list(self.registry.loaded().values()), [1])
+        table.open("x", pack="tower")
+        self.assertEqual(self.registry.loaded(), {})
+        self.assertIs(table.sessions["x"].rooms, self.content[0])
+        table.close("x")
+        self.assertEqual(len(table), 0)
+    
+    def test_server_tower_command(self):
+        """Test switching a server connection to another tower pack."""
+        table = SessionTable(*self.content, packs=self.registry)
+        
+        async def scenario():
+            server = await start_server(LocalBackend(table), port=0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                await reader.readline()
+                writer.write(b"tower winter\n")
+                self.assertIn("Snow drifts", json.loads(await reader.readline())["text"])
+                writer.write(b"take tome_basic\n")
+                await reader.readline()
+                
+                # A typo keeps the current game
+                writer.write(b"tower summer\n")
+                self.assertIn("Unknown tower pack", json.loads(await reader.readline())["error"])
+                writer.write(b"inventory\n")
+                self.assertIn("Basic Spell Tome", json.loads(await reader.readline())["text"])
+                self.assertEqual(len(table), 1)
+                writer.close()
+        
+        asyncio.run(scenario())
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,105 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, NamedTuple, Optional, Union
+
+# Session whose turn is being traced; set around each session's command
+current_session: ContextVar[Optional[str]] = ContextVar("current_session", default=None)
+
+class Span(NamedTuple):
+    name: str
+    start_ns: int  # perf_counter_ns
+    duration_ns: int
+    session: Optional[str]
+    thread: int
+    args: Optional[Dict[str, Any]]
+
+class Tracer:
+    """Nested timing spans kept in a fixed-size ring buffer.
+    
+    Disabled tracers hand out a shared no-op context, so spans left in hot
+    paths cost one attribute check. Spans nest by time on each thread, the
+    way Chrome and Perfetto draw complete ("X") events.
+    """
+
+    def __init__(self, capacity: int = 65536, enabled: bool = False):
+        self.enabled = enabled
+        self.spans: Deque[Span] = deque(maxlen=capacity)
+        # Anchor perf_counter to wall-clock time so exported timestamps are absolute
+        self._epoch_ns = time.time_ns()
+        self._perf_ns = time.perf_counter_ns()
+
+    def enable(self, capacity: Optional[int] = None) -> "Tracer":
+        if capacity is not None and capacity != self.spans.maxlen:
+            self.spans = deque(self.spans, maxlen=capacity)
+        self.enabled = True
+        return self
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def clear(self) -> None:
+        self.spans.clear()
+
+    @contextmanager
+    def _record(self, name: str, args: Optional[Dict[str, Any]]) -> Iterator[None]:
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.spans.append(Span(name, start, time.perf_counter_ns() - start, current_session.get(),
+                                   threading.get_ident(), args))
+
+    def span(self, name: str, **args: Any):
+        """Time the enclosed block as one span; keyword arguments are shown with it."""
+        if not self.enabled:
+            return nullcontext()
+        return self._record(name, args or None)
+
+    @contextmanager
+    def session(self, session_id: str) -> Iterator[None]:
+        """Attribute spans opened inside the block to `session_id`."""
+        token = current_session.set(session_id)
+        try:
+            yield
+        finally:
+            current_session.reset(token)
+
+    def wall_time(self, perf_ns: int) -> float:
+        return (self._epoch_ns + perf_ns - self._perf_ns) / 1e9
+
+    def chrome_trace(self, session: Optional[str] = None, start: Optional[float] = None,
+                     end: Optional[float] = None) -> Dict[str, Any]:
+        """Trace-event JSON for one session and/or a wall-clock window (epoch seconds)."""
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = []
+        for span in list(self.spans):
+            began = self.wall_time(span.start_ns)
+            if session is not None and span.session != session:
+                continue
+            if (start is not None and began + span.duration_ns / 1e9 < start) or (end is not None and began > end):
+                continue
+            event = {"name": span.name, "cat": "turn", "ph": "X", "ts": round(began * 1e6, 3),
+                     "dur": round(span.duration_ns / 1e3, 3), "pid": pid, "tid": span.thread}
+            args = dict(span.args or {})
+            if span.session is not None:
+                args["session"] = span.session
+            if args:
+                event["args"] = args
+            events.append(event)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path: Union[str, Path], session: Optional[str] = None,
+               start: Optional[float] = None, end: Optional[float] = None) -> int:
+        """Write a trace file to open in chrome://tracing or ui.perfetto.dev; returns the span count."""
+        trace = self.chrome_trace(session, start, end)
+        Path(path).write_text(json.dumps(trace, default=str))
+        return len(trace["traceEvents"])
+
+# Process-wide tracer used by the engine, the CLI and the session server
+TRACER = Tracer()
@@ -0,0 +1,222 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import re
+import struct
+import uuid
+from typing import Any, Dict, Iterable, Optional, Tuple
+from game_data import GameState, Room, load_game_data, safe_call
+from sessions import SessionTable
+from events import EventLog
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_CONTINUATION, OP_TEXT, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x8, 0x9, 0xA
+MAX_MESSAGE_BYTES = 64 * 1024
+
+# Browser origins always allowed: WizardBrowser opened from disk and pages served by this machine
+LOCAL_ORIGIN = re.compile(r"null|file://.*|https?://(localhost|127\.0\.0\.1|\[::1\])(:\d+)?", re.IGNORECASE)
+
+def accept_key(key: str) -> str:
+    """The Sec-WebSocket-Accept value for a client's Sec-WebSocket-Key (RFC 6455 4.2.2)."""
+    return base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+
+def origin_allowed(origin: Optional[str], allowed: Iterable[str] = ()) -> bool:
+    """Whether a browser page from `origin` may open a session.
+    
+    Clients that are not browsers send no Origin and are always allowed.
+    """
+    return origin is None or bool(LOCAL_ORIGIN.fullmatch(origin)) or origin.lower() in allowed
+
+async def handshake(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                    allowed_origins: Iterable[str] = ()) -> bool:
+    """Answer the HTTP upgrade request; False (after a 400 or 403) if it is not a WebSocket request
+    or its page's origin is not allowed."""
+    request = await reader.readuntil(b"\r\n\r\n")
+    headers = {}
+    for line in request.decode("latin-1").split("\r\n")[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    key = headers.get("sec-websocket-key")
+    if headers.get("upgrade", "").lower() != "websocket" or not key:
+        writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+        return False
+    if not origin_allowed(headers.get("origin"), allowed_origins):
+        writer.write(b"HTTP/1.1 403 Forbidden\r\nContent-Length: 0\r\n\r\n")
+        return False
+    writer.write(("HTTP/1.1 101 Switching Protocols\r\n"
+                  "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                  f"Sec-WebSocket-Accept: {accept_key(key)}\r\n\r\n").encode())
+    await writer.drain()
+    return True
+
+def encode_frame(opcode: int, payload: bytes = b"") -> bytes:
+    """A single unmasked, final frame, as servers send them."""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[int, bool, bytes]:
+    """Read one client frame and return (opcode, final, unmasked payload)."""
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length, = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:
+        length, = struct.unpack("!Q", await reader.readexactly(8))
+    if not second & 0x80:
+        raise ValueError("Client frames must be masked")
+    if length > MAX_MESSAGE_BYTES:
+        raise ValueError("Frame too large")
+    mask = await reader.readexactly(4)
+    payload = await reader.readexactly(length)
+    return first & 0x0F, bool(first & 0x80), bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+async def read_message(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> Optional[str]:
+    """The next text message, reassembling fragments and answering pings; None on close."""
+    parts = []
+    while True:
+        opcode, final, payload = await read_frame(reader)
+        if opcode == OP_CLOSE:
+            return None
+        if opcode == OP_PING:
+            writer.write(encode_frame(OP_PONG, payload))
+            continue
+        if opcode in (OP_TEXT, OP_CONTINUATION):
+            parts.append(payload)
+            if sum(map(len, parts)) > MAX_MESSAGE_BYTES:
+                raise ValueError("Message too large")
+            if final:
+                return b"".join(parts).decode(errors="replace")
+
+def player_view(state: GameState) -> Dict[str, Any]:
+    player = state.player
+    return {
+        "health": player.health, "mana": player.mana, "room": player.current_room, "inventory": list(player.inventory),
+        "spells": sorted(player.spells)
+    }
+
+def room_view(room: Room) -> Dict[str, Any]:
+    guardian = room.guardian
+    return {
+        "items": list(room.items),
+        "guardian": {"name": guardian.name, "health": guardian.health} if guardian else None
+    }
+
+def snapshot(state: GameState) -> Dict[str, Any]:
+    """Everything the browser mirrors; sent once when the session opens."""
+    return {"player": player_view(state),
+            "rooms": {room_id: room_view(room) for room_id, room in state.rooms.items()}}
+
+def changed_fields(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in new.items() if old.get(key) != value}
+
+def state_diff(old: GameState, new: GameState) -> Dict[str, Any]:
+    """Only the player stats and room fields that changed between two states.
+    
+    Untouched objects are shared between states, so only players and rooms
+    that were replaced are compared. A guardian that moved shows up as
+    `guardian: null` in the room it left and its details in the room it entered.
+    """
+    diff = {}
+    if new.player is not old.player:
+        player = changed_fields(player_view(old), player_view(new))
+        if player:
+            diff["player"] = player
+    rooms = {}
+    for room_id, room in new.rooms.items():
+        before = old.rooms.get(room_id)
+        if room is not before:
+            fields = changed_fields(room_view(before) if before else {}, room_view(room))
+            if fields:
+                rooms[room_id] = fields
+    if rooms:
+        diff["rooms"] = rooms
+    return diff
+
+def encode_message(message: Dict[str, Any]) -> bytes:
+    return encode_frame(OP_TEXT, json.dumps(message, separators=(",", ":")).encode())
+
+async def handle_websocket(table: SessionTable, reader: asyncio.StreamReader,
+                           writer: asyncio.StreamWriter, allowed_origins: Iterable[str] = ()) -> None:
+    """Serve one browser: each text message is a command, each reply the text and a state diff."""
+    session_id = uuid.uuid4().hex
+    try:
+        if not await handshake(reader, writer, allowed_origins):
+            return
+        opened = safe_call(table.open, session_id)
+        if opened.error:
+            writer.write(encode_message({"error": opened.error}))
+            return
+        writer.write(encode_message({"text": opened.value, "state": snapshot(table.state(session_id))}))
+        await writer.drain()
+        
+        while True:
+            command = await read_message(reader, writer)
+            if command is None:
+                break
+            command = command.strip()
+            if not command:
+                continue
+            before = table.state(session_id)
+            result = safe_call(table.command, session_id, command)
+            if result.error:
+                writer.write(encode_message({"error": result.error}))
+            else:
+                text, finished = result.value
+                reply = {"text": text, "finished": finished}
+                if not finished:
+                    reply["diff"] = state_diff(before, table.state(session_id))
+                writer.write(encode_message(reply))
+                if finished:
+                    break
+            await writer.drain()
+        writer.write(encode_frame(OP_CLOSE, struct.pack("!H", 1000)))
+    except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+        pass
+    finally:
+        table.close(session_id)
+        writer.close()
+
+async def start_bridge(table: SessionTable, host: str = "127.0.0.1", port: int = 4001,
+                       allowed_origins: Iterable[str] = ()) -> asyncio.AbstractServer:
+    """Listen for browsers; pages from local origins or `allowed_origins` may connect."""
+    allowed = frozenset(origin.lower().rstrip("/") for origin in allowed_origins)
+    return await asyncio.start_server(
+        lambda reader, writer: handle_websocket(table, reader, writer, allowed), host, port)
+
+async def serve(host: str, port: int, events: Optional[str] = None, allowed_origins: Iterable[str] = ()) -> None:
+    result = load_game_data()
+    if result.error:
+        raise RuntimeError(f"Error loading game data: {result.error}")
+    log = EventLog(events) if events else None
+    server = await start_bridge(SessionTable(*result.value, events=log), host, port, allowed_origins)
+    print(f"WebSocket bridge listening on ws://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if log:
+            log.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local WebSocket endpoint for the browser UI.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4001)
+    parser.add_argument("--events", metavar="PATH", help="append one JSON line per turn of every session")
+    parser.add_argument("--allow-origin", action="append", default=[], metavar="ORIGIN",
+                        help="also accept browser pages from this origin, e.g. https://example.com (repeatable)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.events, args.allow_origin))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+from game_data import GameState, Room, Direction
+from game_engine import advance_guardians, next_steps_toward, reverse_exits
+from tracing import TRACER
+
+# Exits that lead to another floor; every other exit stays within a zone
+VERTICAL_EXITS = frozenset({Direction.UP, Direction.DOWN})
+
+@dataclass(frozen=True)
+class ZoneMap:
+    """Partition of the exit graph into zones: rooms joined by same-floor exits.
+
+    Zones are linked to each other by up/down exits, so zone distance is the
+    number of floors between two rooms.
+    """
+    zone_of: Dict[str, int]
+    rooms_in: Tuple[Tuple[str, ...], ...]
+    neighbours: Tuple[FrozenSet[int], ...]
+
+    def zones_within(self, zones: Iterable[int], radius: int) -> Set[int]:
+        """Zones at most `radius` up/down links away from any of `zones`."""
+        distance = {zone: 0 for zone in zones}
+        queue = deque(distance)
+        while queue:
+            zone = queue.popleft()
+            if distance[zone] == radius:
+                continue
+            for neighbour in self.neighbours[zone]:
+                if neighbour not in distance:
+                    distance[neighbour] = distance[zone] + 1
+                    queue.append(neighbour)
+        return set(distance)
+
+def build_zone_map(rooms: Dict[str, Room]) -> ZoneMap:
+    """Group rooms into zones in one linear pass over the exits."""
+    same_floor: Dict[str, List[str]] = {room_id: [] for room_id in rooms}
+    for room in rooms.values():
+        for direction, next_room in room.exits.items():
+            if direction not in VERTICAL_EXITS and next_room in rooms:
+                same_floor[room.id].append(next_room)
+                same_floor[next_room].append(room.id)
+    
+    zone_of: Dict[str, int] = {}
+    rooms_in: List[Tuple[str, ...]] = []
+    for room_id in rooms:
+        if room_id in zone_of:
+            continue
+        zone = len(rooms_in)
+        zone_of[room_id] = zone
+        members = [room_id]
+        queue = deque(members)
+        while queue:
+            for next_room in same_floor[queue.popleft()]:
+                if next_room not in zone_of:
+                    zone_of[next_room] = zone
+                    members.append(next_room)
+                    queue.append(next_room)
+        rooms_in.append(tuple(members))
+    
+    neighbours: List[Set[int]] = [set() for _ in rooms_in]
+    for room in rooms.values():
+        for direction, next_room in room.exits.items():
+            if direction in VERTICAL_EXITS and next_room in zone_of:
+                a, b = zone_of[room.id], zone_of[next_room]
+                if a != b:
+                    neighbours[a].add(b)
+                    neighbours[b].add(a)
+    
+    return ZoneMap(zone_of=zone_of, rooms_in=tuple(rooms_in),
+                   neighbours=tuple(frozenset(n) for n in neighbours))
+
+# Zone maps and reversed exits of the most recent contents, keyed on the rooms dict
+_guardian_maps: Dict[int, Tuple[Dict[str, Room], ZoneMap, Dict[str, List[str]]]] = {}
+
+def guardian_map(rooms: Dict[str, Room]) -> Tuple[ZoneMap, Dict[str, List[str]]]:
+    """Zone map and reversed exits of a loaded rooms dict, built once per content, not per game."""
+    cached = _guardian_maps.get(id(rooms))
+    if cached and cached[0] is rooms:
+        return cached[1], cached[2]
+    zones, incoming = build_zone_map(rooms), reverse_exits(rooms)
+    if len(_guardian_maps) >= 16:
+        del _guardian_maps[next(iter(_guardian_maps))]
+    _guardian_maps[id(rooms)] = (rooms, zones, incoming)
+    return zones, incoming
+
+class GuardianScheduler:
+    """Interest management for guardian simulation.
+
+    Each tick only zones within `radius` floors of a player are simulated.
+    Other zones are parked; when a player comes within range, the zone's
+    guardians are fast-forwarded through the ticks they missed (capped at
+    the zone size, after which more steps cannot bring them closer), so the
+    cost of a tick follows player activity rather than tower size. At most
+    `catch_up_steps` catch-up steps run per tick, in zone order; zones left
+    over finish catching up on later ticks.
+    """
+
+    def __init__(self, zones: ZoneMap, incoming: Dict[str, List[str]], radius: int = 1,
+                 catch_up_steps: int = 64):
+        self.zones = zones
+        self.incoming = incoming
+        self.radius = radius
+        self.catch_up_steps = catch_up_steps
+        self.ticks = 0
+        self._last_simulated: Dict[int, int] = {}
+
+    @classmethod
+    def for_rooms(cls, rooms: Dict[str, Room], radius: int = 1) -> 'GuardianScheduler':
+        """A scheduler over loaded content, sharing its cached zone map."""
+        return cls(*guardian_map(rooms), radius)
+
+    def active_zones(self, targets: Iterable[str]) -> Set[int]:
+        player_zones = {self.zones.zone_of[room_id] for room_id in targets if room_id in self.zones.zone_of}
+        return self.zones.zones_within(player_zones, self.radius)
+
+    def is_parked(self, zone: int) -> bool:
+        return self._last_simulated.get(zone, 0) < self.ticks
+
+    def tick(self, state: GameState, targets: Iterable[str]) -> GameState:
+        """Advance one tick of guardian pursuit around the `targets` rooms."""
+        with TRACER.span("guardians"):
+            self.ticks += 1
+            targets = set(targets)
+            active = self.active_zones(targets)
+            active_rooms = {room_id for zone in active for room_id in self.zones.rooms_in[zone]}
+            with TRACER.span("pathfind"):
+                step = next_steps_toward(targets, self.incoming, active_rooms)
+            
+            # Catch up zones that were parked while no player was near
+            with TRACER.span("advance"):
+                budget = self.catch_up_steps
+                for zone in sorted(active):
+                    missed = min(self.ticks - 1 - self._last_simulated.get(zone, 0), len(self.zones.rooms_in[zone]))
+                    steps = min(missed, budget)
+                    for _ in range(steps):
+                        state = advance_guardians(state, step, self.zones.rooms_in[zone])
+                    budget -= steps
+                    # Steps the budget did not cover stay owed for the next tick
+                    self._last_simulated[zone] = self.ticks - (missed - steps)
+                
+                return advance_guardians(state, step, active_rooms)
+
+    def update(self, state: GameState) -> GameState:
+        """One tick toward a single-player state's player; a drop-in for update_guardians."""
+        return self.tick(state, [state.player.current_room])
@@ -0,0 +1,171 @@
+import gc
+import multiprocessing
+import os
+from multiprocessing.connection import Connection
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from game_data import Room, Item, Spell, Result, load_game_data
+from sessions import SessionTable
+from events import EventLog, worker_log_path
+
+Content = Tuple[Dict[str, Room], Dict[str, Item], Dict[str, Spell]]
+
+def serve_sessions(conn: Connection, content: Content, events: Optional[Path] = None) -> None:
+    """Worker loop: answer (operation, session_id, argument) requests over `conn`."""
+    log = EventLog(events) if events else None
+    table = SessionTable(*content, events=log)
+    operations: Dict[str, Callable[[str, Any], Any]] = {
+        "open": table.open,
+        "command": table.command,
+        "export": lambda session_id, _: table.export(session_id),
+        "restore": table.restore,
+        "close": lambda session_id, _: table.close(session_id),
+        "count": lambda *_: len(table)
+    }
+    try:
+        while True:
+            try:
+                operation, session_id, argument = conn.recv()
+            except EOFError:
+                return
+            if operation == "stop":
+                conn.send(("ok", None))
+                return
+            try:
+                conn.send(("ok", operations[operation](session_id, argument)))
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        if log:
+            log.close()
+
+class WorkerHandle:
+    """Parent-side end of one forked session worker."""
+
+    def __init__(self, process: multiprocessing.Process, conn: Connection):
+        self.process = process
+        self.conn = conn
+        self.sessions = 0
+        self._lock = Lock()
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid
+
+    def request(self, operation: str, session_id: str = "", argument: Any = None) -> Result[Any]:
+        with self._lock:
+            self.conn.send((operation, session_id, argument))
+            status, value = self.conn.recv()
+        return Result.success(value) if status == "ok" else Result.failure(value)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self.process.is_alive():
+            try:
+                self.request("stop")
+            except (BrokenPipeError, EOFError, OSError):
+                pass
+        self.process.join(timeout)
+        self.conn.close()
+
+class ZygotePool:
+    """Pre-forked session workers that inherit loaded content copy-on-write.
+
+    The zygote (this process) imports the engine and loads all content once.
+    Each worker is forked with everything allocated so far in the GC's
+    permanent generation, so the workers' collections skip the shared
+    objects instead of copying their pages; reference count updates still
+    copy the pages of the objects a worker actually uses. Workers are forked
+    ahead of time, so a new session only costs a GameState.new_game in an
+    already-warm process.
+    Where fork is unavailable, workers are spawned and receive the content
+    by pickling instead.
+    """
+
+    def __init__(self, workers: Optional[int] = None,
+                 loader: Callable[[], Result[Content]] = load_game_data,
+                 events: Optional[Path] = None):
+        self.size = workers or os.cpu_count() or 1
+        self.loader = loader
+        # Each worker appends its sessions' turns to its own numbered log next to this path
+        self.events = events
+        self.content: Optional[Content] = None
+        self.workers: List[WorkerHandle] = []
+        self._sessions: Dict[str, WorkerHandle] = {}
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context("fork" if "fork" in methods else None)
+
+    def warm(self) -> Result[Content]:
+        """Load the shared content once in the zygote."""
+        if self.content is None:
+            result = self.loader()
+            if result.error:
+                return result
+            self.content = result.value
+            gc.collect()
+        return Result.success(self.content)
+
+    def start(self) -> 'ZygotePool':
+        result = self.warm()
+        if result.error:
+            raise RuntimeError(f"Error loading game data: {result.error}")
+        while len(self.workers) < self.size:
+            self.spawn_worker()
+        return self
+
+    def spawn_worker(self) -> WorkerHandle:
+        """Fork one more worker from the warm zygote."""
+        parent_conn, child_conn = self._context.Pipe()
+        events = worker_log_path(self.events, len(self.workers)) if self.events else None
+        process = self._context.Process(target=serve_sessions, args=(child_conn, self.content, events), daemon=True)
+        # Only the forked child keeps the frozen generation; the zygote's own GC is left as it was
+        gc.freeze()
+        try:
+            process.start()
+        finally:
+            gc.unfreeze()
+        child_conn.close()
+        worker = WorkerHandle(process, parent_conn)
+        self.workers.append(worker)
+        return worker
+
+    def open_session(self, session_id: str, saved: Optional[dict] = None) -> Result[str]:
+        """Start a session on the least loaded worker."""
+        worker = min(self.workers, key=lambda w: w.sessions)
+        result = worker.request("open", session_id, saved)
+        if not result.error:
+            self.assign(session_id, worker)
+        return result
+
+    def command(self, session_id: str, command: str) -> Result[Tuple[str, bool]]:
+        worker = self._sessions.get(session_id)
+        if worker is None:
+            return Result.failure(f"Unknown session: {session_id}")
+        result = worker.request("command", session_id, command)
+        if result.value and result.value[1]:
+            self.release(session_id)
+        return result
+
+    def close_session(self, session_id: str) -> Result[Optional[dict]]:
+        worker = self._sessions.get(session_id)
+        if worker is None:
+            return Result.success(None)
+        self.release(session_id)
+        return worker.request("close", session_id)
+
+    def assign(self, session_id: str, worker: WorkerHandle) -> None:
+        """Record that `worker` now holds the session, e.g. after a shard migration."""
+        self.release(session_id)
+        worker.sessions += 1
+        self._sessions[session_id] = worker
+
+    def release(self, session_id: str) -> None:
+        worker = self._sessions.pop(session_id, None)
+        if worker is not None:
+            worker.sessions -= 1
+
+    def close(self) -> None:
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+        self._sessions = {}